@@ -1,47 +1,50 @@
-import json
-from typing import Annotated
-from uuid import UUID
-from datetime import datetime
+import hmac
+from typing import Annotated, Optional
 from fastapi import Depends, HTTPException, Header
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from config.database import get_db
 from config.redis import get_redis
+from config.settings import settings
 from app.repositories.account_repository import AccountRepository
-from core.models import Account
+from app.services.account_cache import AccountSnapshot, account_cache, redis_account_api_key_key, redis_account_key
 
 
 async def get_current_account(
     x_api_key: Annotated[str, Header()],
     db: AsyncSession = Depends(get_db)
-) -> Account:
+) -> AccountSnapshot:
+    # In-process hit: no network round trip at all
+    snapshot = account_cache.get(x_api_key)
+    if snapshot:
+        return snapshot
+
     redis = await get_redis()
-    cache_key = f"account:apikey:{x_api_key}"
+    cache_key = redis_account_key(x_api_key)
     cached_data = await redis.get(cache_key)
 
     if cached_data:
-        data = json.loads(cached_data)
-        account = Account(
-            id=UUID(data['id']),
-            api_key=data['api_key'],
-            balance=data['balance'],
-            created_at=datetime.fromisoformat(data['created_at'])
-        )
-        # Use merge to attach existing object to session without INSERT
-        return await db.merge(account)
-
-    repo = AccountRepository(db)
-    account = await repo.get_by_api_key(x_api_key)
-
-    if not account:
-        raise HTTPException(status_code=401, detail="Invalid API key")
-
-    account_data = {
-        'id': str(account.id),
-        'api_key': account.api_key,
-        'balance': account.balance,
-        'created_at': account.created_at.isoformat()
-    }
-    await redis.setex(cache_key, 12 * 60 * 60, json.dumps(account_data))
-
-    return account
+        snapshot = AccountSnapshot.from_json(cached_data)
+    else:
+        repo = AccountRepository(db)
+        account = await repo.get_by_api_key(x_api_key)
+
+        if not account:
+            raise HTTPException(status_code=401, detail="Invalid API key")
+
+        snapshot = AccountSnapshot.from_model(account)
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.setex(cache_key, 12 * 60 * 60, snapshot.to_json())
+            pipe.setex(redis_account_api_key_key(snapshot.id), 12 * 60 * 60, x_api_key)
+            await pipe.execute()
+
+    account_cache.put(snapshot)
+    return snapshot
+
+
+async def require_admin(x_admin_key: Annotated[Optional[str], Header()] = None) -> None:
+    # Admin endpoints are off unless ADMIN_API_KEY is configured
+    if not settings.ADMIN_API_KEY:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_key or not hmac.compare_digest(x_admin_key, settings.ADMIN_API_KEY):
+        raise HTTPException(status_code=401, detail="Invalid admin key")
@@ -2,15 +2,25 @@ from fastapi import FastAPI
 from contextlib import asynccontextmanager
 
 from config.settings import settings
+from core.consts import BalanceEngine
 from config.rabbitmq import setup_rabbitmq_queues, close_rabbitmq
 from config.redis import close_redis
-from app.routers import accounts_router, sms_router
+from app.routers import accounts_router, admin_router, sms_router
+from app.services.account_cache import account_cache
+from app.services.balance_quota import quota_manager
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await setup_rabbitmq_queues()
+    await account_cache.start()
+    if settings.BALANCE_ENGINE == BalanceEngine.QUOTA:
+        await quota_manager.start()
     yield
+    if settings.BALANCE_ENGINE == BalanceEngine.QUOTA:
+        # Unspent credits go back to the accounts before the process exits
+        await quota_manager.stop()
+    await account_cache.stop()
     await close_rabbitmq()
     await close_redis()
 
@@ -24,11 +34,13 @@ app = FastAPI(
 
 app.include_router(accounts_router, prefix=settings.API_V1_PREFIX)
 app.include_router(sms_router, prefix=settings.API_V1_PREFIX)
+app.include_router(admin_router, prefix=settings.API_V1_PREFIX)
 
 
 @app.get("/health")
 async def health_check():
     return {
         "status": "healthy",
-        "service": "sms_gateway"
+        "service": "sms_gateway",
+        "account_cache": account_cache.stats()
     }
@@ -1,4 +1,14 @@
 from app.repositories.account_repository import AccountRepository
 from app.repositories.sms_repository import SMSRepository
+from app.repositories.outbox_repository import OutboxRepository
+from app.repositories.stats_repository import StatsRepository
+from app.repositories.dead_letter_repository import DeadLetterRepository, DeadLetterFilter
 
-__all__ = ["AccountRepository", "SMSRepository"]
+__all__ = [
+    "AccountRepository",
+    "SMSRepository",
+    "OutboxRepository",
+    "StatsRepository",
+    "DeadLetterRepository",
+    "DeadLetterFilter"
+]
@@ -5,7 +5,11 @@ from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 
+from config.settings import settings
+from core.consts import BalanceEngine
 from core.models import Account
+from app.services.balance_ledger import get_balance_ledger
+from app.services.balance_quota import quota_manager
 
 
 class AccountRepository:
@@ -45,23 +49,86 @@ class AccountRepository:
         return result.scalar_one_or_none()
 
     async def charge_balance(self, account_id: UUID, amount: int) -> Optional[Account]:
-        # Atomic update: Account.balance + amount generates SQL "SET balance = balance + amount"
-        # This prevents race conditions during concurrent balance updates
-        await self.db.execute(
-            update(Account)
-            .where(Account.id == account_id)
-            .values(balance=Account.balance + amount)
-        )
-        await self.db.commit()
-        return await self.get_by_id(account_id)
+        if settings.BALANCE_ENGINE == BalanceEngine.REDIS:
+            account = await self._charge_ledger_balance(account_id, amount)
+        else:
+            # Atomic update: Account.balance + amount generates SQL "SET balance = balance + amount"
+            # This prevents race conditions during concurrent balance updates
+            await self.db.execute(
+                update(Account)
+                .where(Account.id == account_id)
+                .values(balance=Account.balance + amount)
+            )
+            await self.db.commit()
+            account = await self.get_by_id(account_id)
+
+            if account and settings.BALANCE_ENGINE == BalanceEngine.QUOTA:
+                balance = await quota_manager.spendable_balance(self.db, account_id)
+                self.db.expunge(account)
+                account.balance = balance
+
+        return account
+
+    async def deduct_balance(
+        self, account_id: UUID, amount: int, commit: bool = True
+    ) -> tuple[bool, Optional[int]]:
+        # Returns whether it was deducted and the new balance for the account cache,
+        # None where the engine publishes its own. commit=False leaves the postgres
+        # deduction in the caller's transaction, so the balance must not be published
+        # before that commits; the redis and quota engines settle outside the database
+        # and ignore it
+        if settings.BALANCE_ENGINE == BalanceEngine.REDIS:
+            ledger = await get_balance_ledger()
+            balance = await ledger.deduct(self.db, account_id, amount)
+            return balance is not None, balance
+
+        if settings.BALANCE_ENGINE == BalanceEngine.QUOTA:
+            # Spent from this process's block; the row is only touched once per block
+            return await quota_manager.deduct(account_id, amount), None
 
-    async def deduct_balance(self, account_id: UUID, amount: int) -> bool:
         # Atomic compare-and-swap: checks balance >= amount and deducts in single SQL operation
         # This prevents race conditions and ensures balance never goes negative
         result = await self.db.execute(
             update(Account)
             .where(Account.id == account_id, Account.balance >= amount)
             .values(balance=Account.balance - amount)
+            .returning(Account.balance)
         )
-        await self.db.commit()
-        return result.rowcount > 0
+        balance = result.scalar_one_or_none()
+        if commit:
+            await self.db.commit()
+
+        return balance is not None, balance
+
+    async def refund_deduction(self, account_id: UUID, amount: int) -> None:
+        """
+        Undo a commit=False deduction whose transaction did not commit. The postgres
+        deduction rolls back with it; the redis and quota engines charged outside the
+        database and are credited back.
+        """
+        await self.db.rollback()
+
+        if settings.BALANCE_ENGINE == BalanceEngine.REDIS:
+            ledger = await get_balance_ledger()
+            await ledger.credit(self.db, account_id, amount)
+        elif settings.BALANCE_ENGINE == BalanceEngine.QUOTA and not quota_manager.refund(account_id, amount):
+            await self.db.execute(
+                update(Account)
+                .where(Account.id == account_id)
+                .values(balance=Account.balance + amount)
+            )
+            await self.db.commit()
+
+    async def _charge_ledger_balance(self, account_id: UUID, amount: int) -> Optional[Account]:
+        account = await self.get_by_id(account_id)
+        if not account:
+            return None
+
+        ledger = await get_balance_ledger()
+        balance = await ledger.credit(self.db, account_id, amount)
+
+        # The row only catches up on the next flush; report the ledger balance
+        # without letting the session write it back
+        self.db.expunge(account)
+        account.balance = balance
+        return account
@@ -0,0 +1,82 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+from sqlalchemy import select, update, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.models import DeadLetter
+
+
+@dataclass
+class DeadLetterFilter:
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    account_id: Optional[UUID] = None
+    operator: Optional[str] = None
+    error_class: Optional[str] = None
+    include_replayed: bool = False
+
+
+class DeadLetterRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def add(self, records: list[dict]) -> None:
+        """Insert DLQ records in one statement; a task_id already stored is skipped. No commit."""
+        if not records:
+            return
+        await self.db.execute(
+            insert(DeadLetter).values(records).on_conflict_do_nothing(index_elements=["task_id"])
+        )
+
+    @staticmethod
+    def _filtered(query, filters: DeadLetterFilter):
+        if filters.since:
+            query = query.where(DeadLetter.failed_at >= filters.since)
+        if filters.until:
+            query = query.where(DeadLetter.failed_at < filters.until)
+        if filters.account_id:
+            query = query.where(DeadLetter.account_id == filters.account_id)
+        if filters.operator:
+            query = query.where(DeadLetter.operator == filters.operator)
+        if filters.error_class:
+            query = query.where(DeadLetter.error_class == filters.error_class)
+        if not filters.include_replayed:
+            query = query.where(DeadLetter.replayed_at.is_(None))
+        return query
+
+    async def find(self, filters: DeadLetterFilter, limit: int) -> list[DeadLetter]:
+        result = await self.db.execute(
+            self._filtered(select(DeadLetter), filters)
+            .order_by(DeadLetter.failed_at.desc(), DeadLetter.id.desc())
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
+    async def count(self, filters: DeadLetterFilter) -> int:
+        result = await self.db.execute(
+            self._filtered(select(func.count()).select_from(DeadLetter), filters)
+        )
+        return result.scalar_one()
+
+    async def claim_for_replay(self, filters: DeadLetterFilter, task_name: str, limit: int) -> list[DeadLetter]:
+        # Oldest first; SKIP LOCKED keeps a concurrent replay from claiming the same rows
+        result = await self.db.execute(
+            self._filtered(select(DeadLetter), filters)
+            .where(
+                DeadLetter.replayed_at.is_(None),
+                DeadLetter.sms_id.is_not(None),
+                DeadLetter.task_name == task_name
+            )
+            .order_by(DeadLetter.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        return list(result.scalars().all())
+
+    async def mark_replayed(self, ids: list[int], replayed_at: datetime) -> None:
+        await self.db.execute(
+            update(DeadLetter).where(DeadLetter.id.in_(ids)).values(replayed_at=replayed_at)
+        )
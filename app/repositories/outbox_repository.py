@@ -0,0 +1,42 @@
+from datetime import datetime
+from uuid import UUID
+from sqlalchemy import select, insert, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.models import SMSOutbox
+
+
+class OutboxRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def add(self, entries: list[tuple[str, dict]]) -> None:
+        # No commit: rows must land in the caller's transaction together with the SMS rows
+        created_at = datetime.utcnow()
+        await self.db.execute(
+            insert(SMSOutbox),
+            [
+                {
+                    "sms_id": UUID(payload["sms_id"]),
+                    "queue": queue,
+                    "payload": payload,
+                    "created_at": created_at,
+                }
+                for queue, payload in entries
+            ]
+        )
+
+    async def claim_batch(self, limit: int) -> list[SMSOutbox]:
+        # SKIP LOCKED lets any number of relays drain the table without overlapping
+        result = await self.db.execute(
+            select(SMSOutbox)
+            .order_by(SMSOutbox.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        return list(result.scalars().all())
+
+    async def delete(self, ids: list[int]) -> None:
+        await self.db.execute(
+            delete(SMSOutbox).where(SMSOutbox.id.in_(ids))
+        )
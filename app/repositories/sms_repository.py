@@ -1,11 +1,16 @@
+import json
 from datetime import datetime
-from typing import Optional
+from typing import Iterable, Optional
 from uuid import UUID
-from sqlalchemy import select, update, func
+from sqlalchemy import select, update, insert, func, text, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from config.settings import settings
 from core.models import SMS
 from core.consts import SMSStatus
+from core.ids import uuid7, created_at_range
+from app.repositories.stats_repository import StatsRepository, hour_bucket
+from app.services.sms_stats import SMSStatsService
 
 
 class SMSRepository:
@@ -17,37 +22,83 @@ class SMSRepository:
         account_id: UUID,
         phone_number: str,
         message: str,
-        sms_type: int
+        sms_type: int,
+        commit: bool = True
     ) -> SMS:
+        created_at = datetime.utcnow()
         sms = SMS(
+            id=uuid7(created_at),
             account_id=account_id,
             phone_number=phone_number,
             message=message,
             sms_type=sms_type,
-            status=SMSStatus.PENDING
+            status=SMSStatus.PENDING,
+            created_at=created_at
         )
         self.db.add(sms)
+        if not commit:
+            await self.db.flush()
+            return sms
+
         await self.db.commit()
         await self.db.refresh(sms)
         return sms
 
+    async def bulk_create(
+        self,
+        account_id: UUID,
+        messages: list[tuple[str, str, int]],
+        commit: bool = True
+    ) -> list[SMS]:
+        # One multi-row INSERT ... RETURNING for the whole batch; sort_by_parameter_order
+        # keeps the returned rows aligned with the order of the incoming messages
+        created_at = datetime.utcnow()
+        rows = [
+            {
+                "id": uuid7(created_at),
+                "account_id": account_id,
+                "phone_number": phone_number,
+                "message": message,
+                "sms_type": sms_type,
+                "status": SMSStatus.PENDING,
+                "created_at": created_at,
+            }
+            for phone_number, message, sms_type in messages
+        ]
+        result = await self.db.scalars(
+            insert(SMS).returning(SMS, sort_by_parameter_order=True),
+            rows
+        )
+        sms_list = list(result.all())
+        if commit:
+            await self.db.commit()
+        return sms_list
+
+    @staticmethod
+    def _in_partition(query, sms_id: UUID):
+        # UUIDv7 ids carry their created_at, which prunes the lookup to one partition;
+        # legacy uuid4 ids still have to probe every partition's index
+        window = created_at_range(sms_id)
+        if window is None:
+            return query
+        return query.where(SMS.created_at >= window[0], SMS.created_at < window[1])
+
     async def get_by_id(self, sms_id: UUID) -> Optional[SMS]:
         result = await self.db.execute(
-            select(SMS).where(SMS.id == sms_id)
+            self._in_partition(select(SMS).where(SMS.id == sms_id), sms_id)
         )
         return result.scalar_one_or_none()
 
-    async def list_by_account(
-        self,
+    @staticmethod
+    def _account_query(
+        query,
         account_id: UUID,
         status: Optional[int] = None,
         sms_type: Optional[int] = None,
         start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None,
-        skip: int = 0,
-        limit: int = 100
-    ) -> tuple[list[SMS], int]:
-        query = select(SMS).where(SMS.account_id == account_id)
+        end_date: Optional[datetime] = None
+    ):
+        query = query.where(SMS.account_id == account_id)
 
         if status:
             query = query.where(SMS.status == status)
@@ -57,58 +108,245 @@ class SMSRepository:
             query = query.where(SMS.created_at >= start_date)
         if end_date:
             query = query.where(SMS.created_at <= end_date)
+        return query
+
+    async def list_by_account(
+        self,
+        account_id: UUID,
+        status: Optional[int] = None,
+        sms_type: Optional[int] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        after: Optional[tuple[datetime, UUID]] = None,
+        limit: int = 100
+    ) -> list[SMS]:
+        """
+        Newest-first page of an account's SMS, starting after the (created_at, id) keyset
+        `after`. The created_at bound is an index condition on idx_sms_account_created /
+        idx_sms_account_status, so every page costs the same however deep it is.
+        """
+        query = self._account_query(select(SMS), account_id, status, sms_type, start_date, end_date)
 
-        count_query = select(func.count()).select_from(query.subquery())
-        total = await self.db.scalar(count_query)
+        if after:
+            created_at, sms_id = after
+            query = query.where(
+                SMS.created_at <= created_at,
+                or_(SMS.created_at < created_at, SMS.id < sms_id)
+            )
 
-        query = query.order_by(SMS.created_at.desc()).offset(skip).limit(limit)
+        query = query.order_by(SMS.created_at.desc(), SMS.id.desc()).limit(limit)
         result = await self.db.execute(query)
-        items = list(result.scalars().all())
+        return list(result.scalars().all())
+
+    async def count_by_account(self, account_id: UUID, estimate: bool = False, **filters) -> int:
+        query = self._account_query(select(SMS.id), account_id, **filters)
+
+        if estimate:
+            # Row estimate from the planner's statistics; no rows are read
+            compiled = query.compile(dialect=self.db.get_bind().dialect, compile_kwargs={"literal_binds": True})
+            plan = await self.db.scalar(text(f"EXPLAIN (FORMAT JSON) {compiled}"))
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]["Plan"]["Plan Rows"])
 
-        return items, total or 0
+        total = await self.db.scalar(select(func.count()).select_from(query.subquery()))
+        return total or 0
 
     async def update_status(
         self,
         sms_id: UUID,
         status: int,
-        sent_at: Optional[datetime] = None
+        sent_at: Optional[datetime] = None,
+        created_at: Optional[datetime] = None,
+        operator: Optional[str] = None,
+        operator_message_id: Optional[str] = None
     ) -> Optional[SMS]:
         values = {"status": status}
         if sent_at:
             values["sent_at"] = sent_at
+        if operator:
+            values["operator"] = operator
+        if operator_message_id:
+            values["operator_message_id"] = operator_message_id
 
-        await self.db.execute(
-            update(SMS)
-            .where(SMS.id == sms_id)
-            .values(**values)
+        # Only PENDING rows move, so a repeated result is a no-op and the rollup stays exact
+        query = update(SMS).where(SMS.id == sms_id, SMS.status == SMSStatus.PENDING)
+        if created_at:
+            query = query.where(SMS.created_at == created_at)
+        else:
+            query = self._in_partition(query, sms_id)
+
+        result = await self.db.execute(
+            query.values(**values).returning(SMS.account_id, SMS.sms_type, SMS.created_at)
+        )
+        updated = result.all()
+        await StatsRepository(self.db).record_transitions(
+            (account_id, sms_type, row_created_at, SMSStatus.PENDING, status)
+            for account_id, sms_type, row_created_at in updated
         )
         await self.db.commit()
+        await SMSStatsService.invalidate(
+            (account_id, hour_bucket(row_created_at)) for account_id, _, row_created_at in updated
+        )
         return await self.get_by_id(sms_id)
 
     async def batch_update_status(
         self,
-        sent_ids: list[UUID],
-        failed_ids: list[UUID],
-        sent_at: Optional[datetime] = None
+        updates: list[tuple[UUID, Optional[datetime], int, Optional[datetime], Optional[str], Optional[str]]]
     ) -> tuple[int, int]:
-        sent_count = 0
-        failed_count = 0
+        """
+        Apply (sms_id, created_at, status, sent_at, operator, operator_message_id) updates,
+        each row keeping its own values, in one UPDATE ... FROM per flush.
 
-        if sent_ids:
-            result = await self.db.execute(
-                update(SMS)
-                .where(SMS.id.in_(sent_ids))
-                .values(status=SMSStatus.SENT, sent_at=sent_at)
+        Small flushes pass the rows as unnest() arrays; large ones are staged with COPY
+        into a temp table. Rows are matched on (id, created_at) and the statement carries
+        the batch's created_at bounds as bind parameters, so Postgres prunes to the
+        partitions that can hold them (at plan time, or at executor start-up for a generic
+        plan) instead of probing every partition's index by id.
+
+        Only PENDING rows are updated, which makes redelivered results no-ops; the
+        transitions are added to the stats rollup in the same transaction, and cached
+        stats of settled hours they touched are dropped after the commit.
+        """
+        if not updates:
+            return 0, 0
+
+        if len(updates) >= settings.STATUS_COPY_THRESHOLD:
+            source = await self._stage_status_updates(updates)
+            params = {"pending": SMSStatus.PENDING}
+        else:
+            source = (
+                "unnest(CAST(:ids AS uuid[]), CAST(:created_ats AS timestamp[]), "
+                "CAST(:statuses AS smallint[]), CAST(:sent_ats AS timestamp[]), "
+                "CAST(:operators AS text[]), CAST(:operator_message_ids AS text[])) "
+                "AS staging(id, created_at, status, sent_at, operator, operator_message_id)"
             )
-            sent_count = result.rowcount
+            ids, created_ats, statuses, sent_ats, operators, operator_message_ids = zip(*updates)
+            params = {
+                "pending": SMSStatus.PENDING,
+                "ids": list(ids),
+                "created_ats": list(created_ats),
+                "statuses": list(statuses),
+                "sent_ats": list(sent_ats),
+                "operators": list(operators),
+                "operator_message_ids": list(operator_message_ids),
+            }
+
+        update_from = (
+            "UPDATE sms SET status = staging.status, sent_at = staging.sent_at, "
+            "operator = staging.operator, operator_message_id = staging.operator_message_id "
+            f"FROM {source} "
+            "WHERE sms.status = :pending AND sms.id = staging.id "
+        )
+        returning = "RETURNING sms.account_id, sms.sms_type, sms.created_at, sms.status"
 
-        if failed_ids:
+        updated = []
+        created_ats = [row[1] for row in updates if row[1] is not None]
+        if created_ats:
+            result = await self.db.execute(text(
+                update_from +
+                "AND sms.created_at = staging.created_at "
+                "AND sms.created_at BETWEEN :min_created_at AND :max_created_at " +
+                returning
+            ), {**params, "min_created_at": min(created_ats), "max_created_at": max(created_ats)})
+            updated.extend(result.all())
+
+        if len(created_ats) < len(updates):
+            # Results queued without created_at are matched by id; the windows encoded
+            # in UUIDv7 ids still bound the partitions unless a legacy uuid4 is present
+            windows = [created_at_range(row[0]) for row in updates if row[1] is None]
+            query = "AND staging.created_at IS NULL "
+            bounds = {}
+            if all(windows):
+                query += "AND sms.created_at >= :min_created_at AND sms.created_at < :max_created_at "
+                bounds = {
+                    "min_created_at": min(window[0] for window in windows),
+                    "max_created_at": max(window[1] for window in windows),
+                }
             result = await self.db.execute(
-                update(SMS)
-                .where(SMS.id.in_(failed_ids))
-                .values(status=SMSStatus.FAILED)
+                text(update_from + query + returning),
+                {**params, **bounds}
             )
-            failed_count = result.rowcount
+            updated.extend(result.all())
 
+        await StatsRepository(self.db).record_transitions(
+            (account_id, sms_type, created_at, SMSStatus.PENDING, status)
+            for account_id, sms_type, created_at, status in updated
+        )
         await self.db.commit()
-        return sent_count, failed_count
+        # A late result (backlog, stream lag, retries) can land in an hour that is cached already
+        await SMSStatsService.invalidate(
+            (account_id, hour_bucket(created_at)) for account_id, _, created_at, _ in updated
+        )
+
+        sent_count = sum(1 for row in updated if row[3] == SMSStatus.SENT)
+        return sent_count, len(updated) - sent_count
+
+    async def reset_for_replay(
+        self,
+        rows: list[tuple[UUID, Optional[datetime], datetime]],
+        failed_only: Iterable[UUID] = ()
+    ) -> list:
+        """
+        Put dead-lettered messages, given as (sms_id, created_at, failed_at), back to
+        PENDING so they can be sent again. Returns the reset rows (id, account_id,
+        sms_type, created_at, phone_number, message, previous_status). No commit.
+
+        A SENT message is never reset. A PENDING one is reset only if it is not in
+        `failed_only` and no replay of it happened after this failure, otherwise it is
+        already back in flight.
+        """
+        if not rows:
+            return []
+
+        windows = [
+            (created_at, created_at) if created_at else created_at_range(sms_id)
+            for sms_id, created_at, _ in rows
+        ]
+        bounds = old_bounds = ""
+        params = {
+            "ids": [row[0] for row in rows],
+            "failed_ats": [row[2] for row in rows],
+            "failed_only": list(failed_only),
+            "pending": SMSStatus.PENDING,
+            "failed": SMSStatus.FAILED,
+        }
+        if all(windows):
+            # Same created_at bounds on both scans so each is pruned to the matching partitions
+            old_bounds = "AND created_at BETWEEN :min_created_at AND :max_created_at "
+            bounds = "AND sms.created_at BETWEEN :min_created_at AND :max_created_at "
+            params["min_created_at"] = min(window[0] for window in windows)
+            params["max_created_at"] = max(window[1] for window in windows)
+
+        result = await self.db.execute(text(
+            "UPDATE sms SET status = :pending, sent_at = NULL, operator = NULL, operator_message_id = NULL "
+            "FROM unnest(CAST(:ids AS uuid[]), CAST(:failed_ats AS timestamp[])) AS staging(id, failed_at), "
+            f"(SELECT id, created_at, status FROM sms WHERE id = ANY(CAST(:ids AS uuid[])) {old_bounds}FOR UPDATE) AS old "
+            "WHERE sms.id = staging.id AND sms.id = old.id AND sms.created_at = old.created_at "
+            f"{bounds}"
+            "AND (sms.status = :failed OR (sms.status = :pending "
+            "AND sms.id <> ALL(CAST(:failed_only AS uuid[])) AND NOT EXISTS ("
+            "SELECT 1 FROM dead_letters WHERE dead_letters.sms_id = sms.id "
+            "AND dead_letters.replayed_at >= staging.failed_at))) "
+            "RETURNING sms.id, sms.account_id, sms.sms_type, sms.created_at, sms.phone_number, sms.message, "
+            "old.status AS previous_status"
+        ), params)
+        return list(result.all())
+
+    async def _stage_status_updates(self, updates: list[tuple]) -> str:
+        # The first statement goes through the session so the COPY below runs inside
+        # its transaction; ON COMMIT DELETE ROWS empties the table for the next flush
+        await self.db.execute(text(
+            "CREATE TEMP TABLE IF NOT EXISTS sms_status_staging "
+            "(id uuid, created_at timestamp, status smallint, sent_at timestamp, "
+            "operator text, operator_message_id text) ON COMMIT DELETE ROWS"
+        ))
+
+        connection = await self.db.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            "sms_status_staging",
+            records=updates,
+            columns=["id", "created_at", "status", "sent_at", "operator", "operator_message_id"]
+        )
+        return "sms_status_staging AS staging"
@@ -0,0 +1,95 @@
+import random
+from collections import Counter
+from datetime import datetime
+from typing import Iterable
+from uuid import UUID
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.settings import settings
+from core.models import SMSStatsHourly
+
+# (account_id, bucket, sms_type, status)
+StatsKey = tuple[UUID, datetime, int, int]
+
+
+def hour_bucket(created_at: datetime) -> datetime:
+    return created_at.replace(minute=0, second=0, microsecond=0)
+
+
+class StatsRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def increment(self, deltas: Counter, shard: int = 0) -> None:
+        """
+        Add `deltas` ({StatsKey: n}, n may be negative) to the rollup in one upsert.
+        No commit: counts must change in the same transaction as the SMS rows.
+        """
+        rows = [
+            {
+                "account_id": key[0],
+                "bucket": key[1],
+                "sms_type": key[2],
+                "status": key[3],
+                "shard": shard,
+                "count": n,
+            }
+            for key, n in sorted(deltas.items()) if n
+        ]
+        if not rows:
+            return
+
+        # Sorted keys make concurrent writers lock rollup rows in the same order
+        statement = insert(SMSStatsHourly).values(rows)
+        await self.db.execute(
+            statement.on_conflict_do_update(
+                index_elements=["account_id", "bucket", "sms_type", "status", "shard"],
+                set_={"count": SMSStatsHourly.count + statement.excluded.count}
+            )
+        )
+
+    async def record_created(self, messages: Iterable) -> None:
+        # Concurrent sends of one account land on different shards instead of queueing
+        # on a single row lock until their transactions commit
+        await self.increment(
+            Counter(
+                (sms.account_id, hour_bucket(sms.created_at), sms.sms_type, sms.status)
+                for sms in messages
+            ),
+            shard=random.randrange(settings.SMS_STATS_SHARDS)
+        )
+
+    async def record_transitions(self, transitions: Iterable[tuple[UUID, int, datetime, int, int]]) -> None:
+        """Apply (account_id, sms_type, created_at, old_status, new_status) transitions."""
+        deltas = Counter()
+        for account_id, sms_type, created_at, old_status, new_status in transitions:
+            bucket = hour_bucket(created_at)
+            deltas[(account_id, bucket, sms_type, old_status)] -= 1
+            deltas[(account_id, bucket, sms_type, new_status)] += 1
+        await self.increment(deltas)
+
+    async def list_buckets(
+        self,
+        account_id: UUID,
+        start: datetime,
+        end: datetime
+    ) -> list[tuple[datetime, int, int, int]]:
+        """(bucket, sms_type, status, count) rows for hour buckets in [start, end)."""
+        result = await self.db.execute(
+            select(
+                SMSStatsHourly.bucket,
+                SMSStatsHourly.sms_type,
+                SMSStatsHourly.status,
+                func.sum(SMSStatsHourly.count)
+            )
+            .where(
+                SMSStatsHourly.account_id == account_id,
+                SMSStatsHourly.bucket >= start,
+                SMSStatsHourly.bucket < end
+            )
+            .group_by(SMSStatsHourly.bucket, SMSStatsHourly.sms_type, SMSStatsHourly.status)
+            .order_by(SMSStatsHourly.bucket)
+        )
+        return [(bucket, sms_type, status, int(count)) for bucket, sms_type, status, count in result.all()]
@@ -1,4 +1,5 @@
 from app.routers.accounts_router import router as accounts_router
+from app.routers.admin_router import router as admin_router
 from app.routers.sms_router import router as sms_router
 
-__all__ = ["accounts_router", "sms_router"]
+__all__ = ["accounts_router", "admin_router", "sms_router"]
@@ -7,6 +7,7 @@ from config.database import get_db
 from app.repositories.account_repository import AccountRepository
 from app.schemas.account_schema import AccountCreate, AccountResponse, BalanceResponse, ChargeRequest
 from app.dependencies import get_current_account
+from app.services.account_cache import AccountSnapshot, account_cache
 from core.models import Account
 
 
@@ -26,14 +27,16 @@ async def create_account(
 
     try:
         account = await repo.create_with_generated_key(account_data.account_id)
-        return account
     except IntegrityError:
         raise HTTPException(status_code=500, detail="Failed to generate unique API key")
 
+    await account_cache.publish_change(account.id, account.balance)
+    return account
+
 
 @router.get("/balance", response_model=BalanceResponse)
 async def get_balance(
-    account: Annotated[Account, Depends(get_current_account)]
+    account: Annotated[AccountSnapshot, Depends(get_current_account)]
 ) -> BalanceResponse:
     return BalanceResponse(balance=account.balance)
 
@@ -41,7 +44,7 @@ async def get_balance(
 @router.post("/charge", response_model=BalanceResponse)
 async def charge_balance(
     charge_data: ChargeRequest,
-    account: Annotated[Account, Depends(get_current_account)],
+    account: Annotated[AccountSnapshot, Depends(get_current_account)],
     db: AsyncSession = Depends(get_db)
 ) -> BalanceResponse:
     repo = AccountRepository(db)
@@ -50,4 +53,5 @@ async def charge_balance(
     if not updated_account:
         raise HTTPException(status_code=404, detail="Account not found")
 
+    await account_cache.publish_change(updated_account.id, updated_account.balance)
     return BalanceResponse(balance=updated_account.balance)
@@ -0,0 +1,57 @@
+from datetime import datetime
+from typing import Annotated, Optional
+from uuid import UUID
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.database import get_db
+from app.dependencies import require_admin
+from app.repositories.dead_letter_repository import DeadLetterFilter, DeadLetterRepository
+from app.schemas.dead_letter_schema import (
+    DeadLetterListResponse,
+    DeadLetterReplayRequest,
+    DeadLetterReplayResponse
+)
+from app.services.dead_letter_service import DeadLetterService
+
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/dead-letters", response_model=DeadLetterListResponse)
+async def list_dead_letters(
+    db: AsyncSession = Depends(get_db),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    account_id: Optional[UUID] = None,
+    operator: Optional[str] = None,
+    error_class: Optional[str] = None,
+    include_replayed: bool = False,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 100
+) -> DeadLetterListResponse:
+    filters = DeadLetterFilter(
+        since=since,
+        until=until,
+        account_id=account_id,
+        operator=operator,
+        error_class=error_class,
+        include_replayed=include_replayed
+    )
+    repo = DeadLetterRepository(db)
+    return DeadLetterListResponse(items=await repo.find(filters, limit), total=await repo.count(filters))
+
+
+@router.post("/dead-letters/replay", response_model=DeadLetterReplayResponse)
+async def replay_dead_letters(
+    request: DeadLetterReplayRequest,
+    db: AsyncSession = Depends(get_db)
+) -> DeadLetterReplayResponse:
+    filters = DeadLetterFilter(
+        since=request.since,
+        until=request.until,
+        account_id=request.account_id,
+        operator=request.operator,
+        error_class=request.error_class
+    )
+    result = await DeadLetterService.replay(db, filters, request.limit)
+    return DeadLetterReplayResponse(claimed=result.claimed, replayed=result.replayed, skipped=result.skipped)
@@ -1,26 +1,127 @@
-from datetime import datetime
-from typing import Annotated, Optional
+import logging
+import math
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Annotated, Awaitable, Callable, Literal, Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from config.database import get_db
+from config.settings import settings
 from app.repositories.sms_repository import SMSRepository
 from app.repositories.account_repository import AccountRepository
-from app.schemas.sms_schema import SMSSendRequest, SMSResponse, SMSListResponse
+from app.schemas.sms_schema import (
+    SMSSendRequest,
+    SMSBatchSendRequest,
+    SMSResponse,
+    SMSBatchResponse,
+    SMSListResponse,
+    SMSStatsItem,
+    SMSStatsResponse
+)
 from app.dependencies import get_current_account
+from app.services.account_cache import AccountSnapshot, account_cache
+from app.services.idempotency import IN_PROGRESS, MISMATCH, REPLAY, get_idempotency_store
+from app.services.rate_limiter import get_rate_limiter
+from app.services.sms_export import SMSExporter
 from app.services.sms_service import SMSService
-from core.models import Account, SMS
+from app.services.sms_stats import SMSStatsService
+from core.models import SMS
 
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/sms", tags=["sms"])
 
 
+async def enforce_rate_limit(account: AccountSnapshot, counts: Counter) -> None:
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+
+    limiter = await get_rate_limiter()
+    # Every type is checked before any tokens are taken, so a rejected batch costs nothing
+    for sms_type, count in counts.items():
+        rate = limiter.limit_for(account, sms_type)
+        if rate > 0 and count > limiter.burst_for(rate):
+            # Waiting would never help: the bucket can't hold that many tokens
+            raise HTTPException(
+                status_code=413,
+                detail=f"Batch exceeds the rate limit burst of {limiter.burst_for(rate)} messages for this type; split it"
+            )
+
+    acquired = Counter()
+    for sms_type, count in counts.items():
+        retry_after = await limiter.acquire(account, sms_type, count)
+        if retry_after is not None:
+            await release_rate_limit(account, acquired)
+            raise HTTPException(
+                status_code=429,
+                detail="Rate limit exceeded",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+            )
+        acquired[sms_type] = count
+
+
+async def release_rate_limit(account: AccountSnapshot, counts: Counter) -> None:
+    """Return tokens taken by enforce_rate_limit() for a request that was then rejected."""
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+
+    limiter = await get_rate_limiter()
+    for sms_type, count in counts.items():
+        await limiter.release(account, sms_type, count)
+
+
 @router.post("/send", response_model=SMSResponse, status_code=201)
 async def send_sms(
     sms_data: SMSSendRequest,
-    account: Annotated[Account, Depends(get_current_account)],
-    db: AsyncSession = Depends(get_db)
+    account: Annotated[AccountSnapshot, Depends(get_current_account)],
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    idempotency_key: Annotated[Optional[str], Header(min_length=1, max_length=255)] = None
+) -> SMSResponse:
+    if not idempotency_key or not settings.IDEMPOTENCY_ENABLED:
+        return SMSResponse.model_validate(await create_sms(sms_data, account, db))
+
+    store = await get_idempotency_store()
+    claim = await store.claim(account.id, idempotency_key, sms_data.model_dump_json())
+    if claim.state == REPLAY:
+        response.headers["Idempotent-Replayed"] = "true"
+        return claim.response
+    if claim.state == MISMATCH:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+    if claim.state == IN_PROGRESS:
+        raise HTTPException(
+            status_code=409,
+            detail="A request with this Idempotency-Key is still in progress",
+            headers={"Retry-After": "1"}
+        )
+
+    committed = False
+
+    async def on_commit(sms: SMS) -> None:
+        nonlocal committed
+        committed = True
+        # Stored before anything after the commit can fail, so a retry replays it
+        await store.complete(claim, SMSResponse.model_validate(sms))
+
+    try:
+        async with store.held(claim):
+            return SMSResponse.model_validate(await create_sms(sms_data, account, db, on_commit))
+    except BaseException:
+        # Before the commit nothing was charged or queued, so the client may retry with the key
+        if not committed:
+            await store.release(claim)
+        raise
+
+
+async def create_sms(
+    sms_data: SMSSendRequest,
+    account: AccountSnapshot,
+    db: AsyncSession,
+    on_commit: Optional[Callable[[SMS], Awaitable[None]]] = None
 ) -> SMS:
     account_repo = AccountRepository(db)
     sms_repo = SMSRepository(db)
@@ -28,64 +129,220 @@ async def send_sms(
     if account.balance < 1:
         raise HTTPException(status_code=402, detail="Insufficient balance")
 
-    success = await account_repo.deduct_balance(account.id, 1)
+    counts = Counter([sms_data.sms_type])
+    await enforce_rate_limit(account, counts)
+
+    # Deduction, SMS row and (with the outbox) the task share one transaction
+    async def create_rows() -> list[SMS]:
+        return [await sms_repo.create(
+            account_id=account.id,
+            phone_number=sms_data.phone_number,
+            message=sms_data.message,
+            sms_type=sms_data.sms_type,
+            commit=False
+        )]
+
+    async def on_rows_commit(sms_list: list[SMS]) -> None:
+        if on_commit:
+            await on_commit(sms_list[0])
+
+    try:
+        sms_list = await charge_and_enqueue(account_repo, db, account, 1, create_rows, on_rows_commit)
+    except HTTPException:
+        await release_rate_limit(account, counts)
+        raise
+    return sms_list[0]
+
+
+async def charge_and_enqueue(
+    account_repo: AccountRepository,
+    db: AsyncSession,
+    account: AccountSnapshot,
+    count: int,
+    create_rows: Callable[[], Awaitable[list[SMS]]],
+    on_commit: Optional[Callable[[list[SMS]], Awaitable[None]]] = None
+) -> list[SMS]:
+    """
+    Deduct `count` credits, create the SMS rows and enqueue them, all or nothing. The
+    redis and quota engines charge outside the transaction, so if it doesn't commit
+    the deduction is refunded before the error propagates. `on_commit` is awaited
+    with the rows right after they commit.
+    """
+    success, balance = await account_repo.deduct_balance(account.id, count, commit=False)
     if not success:
         raise HTTPException(status_code=402, detail="Insufficient balance")
 
-    sms = await sms_repo.create(
-        account_id=account.id,
-        phone_number=sms_data.phone_number,
-        message=sms_data.message,
-        sms_type=sms_data.sms_type
-    )
+    committed = False
 
-    SMSService.publish_to_queue(
-        sms_id=sms.id,
-        phone_number=sms.phone_number,
-        message=sms.message,
-        sms_type=sms.sms_type
-    )
+    sms_list: list[SMS] = []
+    committed = False
 
-    return sms
+    async def on_enqueue_commit() -> None:
+        nonlocal committed
+        committed = True
+        if on_commit:
+            await on_commit(sms_list)
+        # Only once committed: a rolled back deduction must not reach other caches
+        if balance is not None:
+            await account_cache.publish_change(account.id, balance)
+
+    try:
+        sms_list = await create_rows()
+        await SMSService.enqueue(db, sms_list, on_enqueue_commit)
+    except BaseException:
+        if not committed:
+            try:
+                await account_repo.refund_deduction(account.id, count)
+            except Exception as e:
+                logger.error(f"Failed to refund {count} credits to account {account.id}: {e}")
+        raise
+
+    return sms_list
+
+
+@router.post("/send-batch", response_model=SMSBatchResponse, status_code=201)
+async def send_sms_batch(
+    batch_data: SMSBatchSendRequest,
+    account: Annotated[AccountSnapshot, Depends(get_current_account)],
+    db: AsyncSession = Depends(get_db)
+) -> SMSBatchResponse:
+    account_repo = AccountRepository(db)
+    sms_repo = SMSRepository(db)
+    count = len(batch_data.messages)
+
+    if account.balance < count:
+        raise HTTPException(status_code=402, detail="Insufficient balance")
+
+    counts = Counter(item.sms_type for item in batch_data.messages)
+    await enforce_rate_limit(account, counts)
+
+    async def create_rows() -> list[SMS]:
+        return await sms_repo.bulk_create(
+            account_id=account.id,
+            messages=[
+                (item.phone_number, item.message, item.sms_type)
+                for item in batch_data.messages
+            ],
+            commit=False
+        )
+
+    # Whole batch is charged in a single deduction, all or nothing
+    try:
+        sms_list = await charge_and_enqueue(account_repo, db, account, count, create_rows)
+    except HTTPException:
+        # Rejected (e.g. 402): nothing was sent, so the tokens go back
+        await release_rate_limit(account, counts)
+        raise
+    return SMSBatchResponse(items=sms_list)
 
 
 @router.get("", response_model=SMSListResponse)
 async def list_sms(
-    account: Annotated[Account, Depends(get_current_account)],
+    account: Annotated[AccountSnapshot, Depends(get_current_account)],
     db: AsyncSession = Depends(get_db),
     status: Optional[int] = Query(None, description="Filter by status (1=pending, 2=sent, 3=failed)"),
     sms_type: Optional[int] = Query(None, description="Filter by type (1=regular, 2=express)"),
     start_date: Optional[datetime] = Query(None, description="Filter from date"),
     end_date: Optional[datetime] = Query(None, description="Filter to date"),
-    page: int = Query(1, ge=1, description="Page number"),
-    page_size: int = Query(50, ge=1, le=100, description="Items per page")
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    page_size: int = Query(50, ge=1, le=100, description="Items per page"),
+    total: Optional[Literal["exact", "estimate"]] = Query(
+        None, description="Also return the number of matching messages; 'estimate' uses planner statistics"
+    )
 ) -> SMSListResponse:
 
     sms_repo = SMSRepository(db)
-    skip = (page - 1) * page_size
+    filters = dict(status=status, sms_type=sms_type, start_date=start_date, end_date=end_date)
+
+    try:
+        after = SMSService.decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
-    items, total = await sms_repo.list_by_account(
+    # One extra row tells whether there is a next page without counting
+    items = await sms_repo.list_by_account(
         account_id=account.id,
+        after=after,
+        limit=page_size + 1,
+        **filters
+    )
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        next_cursor = SMSService.encode_cursor(items[-1])
+
+    count = None
+    if total:
+        count = await sms_repo.count_by_account(account.id, estimate=total == "estimate", **filters)
+
+    return SMSListResponse(
+        items=items,
+        next_cursor=next_cursor,
+        page_size=page_size,
+        total=count,
+        total_is_estimate=total == "estimate"
+    )
+
+
+@router.get("/export")
+async def export_sms(
+    account: Annotated[AccountSnapshot, Depends(get_current_account)],
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format", description="ndjson or csv"),
+    status: Optional[int] = Query(None, description="Filter by status (1=pending, 2=sent, 3=failed)"),
+    sms_type: Optional[int] = Query(None, description="Filter by type (1=regular, 2=express)"),
+    start_date: Optional[datetime] = Query(None, description="Filter from date"),
+    end_date: Optional[datetime] = Query(None, description="Filter to date")
+) -> StreamingResponse:
+    # Streams every matching row from its own connection; the request session is not used
+    rows = SMSExporter.stream(
+        account_id=account.id,
+        export_format=export_format,
         status=status,
         sms_type=sms_type,
         start_date=start_date,
-        end_date=end_date,
-        skip=skip,
-        limit=page_size
+        end_date=end_date
+    )
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        rows,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="sms-{account.id}.{export_format}"'}
     )
 
-    return SMSListResponse(
-        items=items,
-        total=total,
-        page=page,
-        page_size=page_size
+
+@router.get("/stats", response_model=SMSStatsResponse)
+async def get_sms_stats(
+    account: Annotated[AccountSnapshot, Depends(get_current_account)],
+    start: datetime = Query(..., description="Range start, rounded down to the hour"),
+    end: datetime = Query(..., description="Range end, rounded up to the hour"),
+    granularity: Literal["hour", "day"] = Query("hour", description="hour or day buckets"),
+    db: AsyncSession = Depends(get_db)
+) -> SMSStatsResponse:
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    if end - start > timedelta(days=settings.SMS_STATS_MAX_RANGE_DAYS):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Range must not exceed {settings.SMS_STATS_MAX_RANGE_DAYS} days"
+        )
+
+    rows = await SMSStatsService.get_stats(db, account.id, start, end, granularity)
+
+    return SMSStatsResponse(
+        granularity=granularity,
+        start=start,
+        end=end,
+        items=[
+            SMSStatsItem(bucket=bucket, sms_type=sms_type, status=status, count=count)
+            for bucket, sms_type, status, count in rows
+        ]
     )
 
 
 @router.get("/{sms_id}", response_model=SMSResponse)
 async def get_sms(
     sms_id: UUID,
-    account: Annotated[Account, Depends(get_current_account)],
+    account: Annotated[AccountSnapshot, Depends(get_current_account)],
     db: AsyncSession = Depends(get_db)
 ) -> SMS:
     sms_repo = SMSRepository(db)
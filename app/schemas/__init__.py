@@ -4,10 +4,20 @@ from app.schemas.account_schema import (
     BalanceResponse,
     ChargeRequest
 )
+from app.schemas.dead_letter_schema import (
+    DeadLetterResponse,
+    DeadLetterListResponse,
+    DeadLetterReplayRequest,
+    DeadLetterReplayResponse
+)
 from app.schemas.sms_schema import (
     SMSSendRequest,
+    SMSBatchSendRequest,
     SMSResponse,
-    SMSListResponse
+    SMSBatchResponse,
+    SMSListResponse,
+    SMSStatsItem,
+    SMSStatsResponse
 )
 
 __all__ = [
@@ -15,7 +25,15 @@ __all__ = [
     "AccountResponse",
     "BalanceResponse",
     "ChargeRequest",
+    "DeadLetterResponse",
+    "DeadLetterListResponse",
+    "DeadLetterReplayRequest",
+    "DeadLetterReplayResponse",
     "SMSSendRequest",
+    "SMSBatchSendRequest",
     "SMSResponse",
-    "SMSListResponse"
+    "SMSBatchResponse",
+    "SMSListResponse",
+    "SMSStatsItem",
+    "SMSStatsResponse"
 ]
@@ -0,0 +1,41 @@
+from datetime import datetime
+from typing import Any, Optional
+from uuid import UUID
+from pydantic import BaseModel, Field
+
+
+class DeadLetterResponse(BaseModel):
+    id: int
+    task_id: str
+    task_name: str
+    sms_id: Optional[UUID] = None
+    account_id: Optional[UUID] = None
+    operator: Optional[str] = None
+    error_class: str
+    error: str
+    payload: dict[str, Any]
+    failed_at: datetime
+    replayed_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class DeadLetterListResponse(BaseModel):
+    items: list[DeadLetterResponse]
+    total: int
+
+
+class DeadLetterReplayRequest(BaseModel):
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    account_id: Optional[UUID] = None
+    operator: Optional[str] = None
+    error_class: Optional[str] = None
+    limit: int = Field(500, ge=1, le=10000, description="Dead letters claimed per call")
+
+
+class DeadLetterReplayResponse(BaseModel):
+    claimed: int
+    replayed: int
+    skipped: int
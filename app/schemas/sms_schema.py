@@ -3,6 +3,8 @@ from typing import Optional
 from uuid import UUID
 from pydantic import BaseModel, Field, field_validator
 
+from config.settings import settings
+
 
 class SMSSendRequest(BaseModel):
     phone_number: str = Field(..., min_length=10, max_length=20)
@@ -17,6 +19,10 @@ class SMSSendRequest(BaseModel):
         return v
 
 
+class SMSBatchSendRequest(BaseModel):
+    messages: list[SMSSendRequest] = Field(..., min_length=1, max_length=settings.SMS_BATCH_MAX_SIZE)
+
+
 class SMSResponse(BaseModel):
     id: UUID
     account_id: UUID
@@ -33,6 +39,25 @@ class SMSResponse(BaseModel):
 
 class SMSListResponse(BaseModel):
     items: list[SMSResponse]
-    total: int
-    page: int
+    next_cursor: Optional[str] = Field(None, description="Pass as `cursor` to get the next page; null on the last page")
     page_size: int
+    total: Optional[int] = Field(None, description="Only returned when requested with `total`")
+    total_is_estimate: bool = False
+
+
+class SMSBatchResponse(BaseModel):
+    items: list[SMSResponse]
+
+
+class SMSStatsItem(BaseModel):
+    bucket: datetime
+    sms_type: int
+    status: int
+    count: int
+
+
+class SMSStatsResponse(BaseModel):
+    granularity: str
+    start: datetime
+    end: datetime
+    items: list[SMSStatsItem]
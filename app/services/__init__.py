@@ -1,3 +1,4 @@
 from app.services.sms_service import SMSService
+from app.services.account_cache import AccountSnapshot, account_cache
 
-__all__ = ["SMSService"]
+__all__ = ["SMSService", "AccountSnapshot", "account_cache"]
@@ -0,0 +1,212 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from config.redis import get_redis
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def redis_account_key(api_key: str) -> str:
+    return f"account:apikey:{api_key}"
+
+
+def redis_account_api_key_key(account_id: UUID) -> str:
+    # Lets any process find the shared copy of an account it has never cached itself
+    return f"account:id:{account_id}:apikey"
+
+
+@dataclass(frozen=True, slots=True)
+class AccountSnapshot:
+    id: UUID
+    api_key: str
+    balance: int
+    created_at: datetime
+    rate_limit_regular: Optional[int] = None
+    rate_limit_express: Optional[int] = None
+
+    @classmethod
+    def from_model(cls, account: Any) -> "AccountSnapshot":
+        return cls(
+            id=account.id,
+            api_key=account.api_key,
+            balance=account.balance,
+            created_at=account.created_at,
+            rate_limit_regular=account.rate_limit_regular,
+            rate_limit_express=account.rate_limit_express
+        )
+
+    @classmethod
+    def from_json(cls, raw: str) -> "AccountSnapshot":
+        data = json.loads(raw)
+        return cls(
+            id=UUID(data['id']),
+            api_key=data['api_key'],
+            balance=data['balance'],
+            created_at=datetime.fromisoformat(data['created_at']),
+            rate_limit_regular=data.get('rate_limit_regular'),
+            rate_limit_express=data.get('rate_limit_express')
+        )
+
+    def to_json(self) -> str:
+        return json.dumps({
+            'id': str(self.id),
+            'api_key': self.api_key,
+            'balance': self.balance,
+            'created_at': self.created_at.isoformat(),
+            'rate_limit_regular': self.rate_limit_regular,
+            'rate_limit_express': self.rate_limit_express
+        })
+
+
+class AccountCache:
+    """
+    Per-process LRU/TTL cache of account snapshots keyed by API key.
+    Kept coherent across API replicas through a Redis pub/sub channel.
+    """
+
+    def __init__(self, max_size: int, ttl: float, channel: str):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.channel = channel
+        self._entries: "OrderedDict[str, tuple[float, AccountSnapshot]]" = OrderedDict()
+        self._api_keys: Dict[UUID, str] = {}
+        self._listener: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, api_key: str) -> Optional[AccountSnapshot]:
+        entry = self._entries.get(api_key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, snapshot = entry
+        if expires_at < time.monotonic():
+            self._remove(api_key)
+            self.evictions += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(api_key)
+        self.hits += 1
+        return snapshot
+
+    def put(self, snapshot: AccountSnapshot) -> None:
+        self._entries[snapshot.api_key] = (time.monotonic() + self.ttl, snapshot)
+        self._entries.move_to_end(snapshot.api_key)
+        self._api_keys[snapshot.id] = snapshot.api_key
+        while len(self._entries) > self.max_size:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def api_key_for(self, account_id: UUID) -> Optional[str]:
+        return self._api_keys.get(account_id)
+
+    def apply_change(self, account_id: UUID, balance: Optional[int] = None) -> None:
+        # A known balance is patched in place so busy senders keep hitting the cache;
+        # anything else drops the entry and the next request reloads it
+        api_key = self._api_keys.get(account_id)
+        if api_key is None:
+            return
+
+        self.invalidations += 1
+        if balance is None:
+            self._remove(api_key)
+            return
+
+        expires_at, snapshot = self._entries[api_key]
+        self._entries[api_key] = (expires_at, replace(snapshot, balance=balance))
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._api_keys.clear()
+
+    def _remove(self, api_key: str) -> None:
+        _, snapshot = self._entries.pop(api_key)
+        self._api_keys.pop(snapshot.id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+    async def publish_change(self, account_id: UUID, balance: Optional[int] = None) -> None:
+        api_key = self.api_key_for(account_id)
+        self.apply_change(account_id, balance)
+
+        try:
+            redis = await get_redis()
+            if api_key is None:
+                api_key = await redis.get(redis_account_api_key_key(account_id))
+            async with redis.pipeline(transaction=False) as pipe:
+                # The shared Redis copy can't be patched without the full row, so drop it
+                if api_key:
+                    pipe.delete(redis_account_key(api_key))
+                pipe.publish(self.channel, json.dumps({"account_id": str(account_id), "balance": balance}))
+                await pipe.execute()
+        except Exception as e:
+            # Called once the change is committed; failing the request now would make
+            # the client retry a charge or send that already went through
+            logger.warning(f"Failed to publish account change for {account_id}, other caches may be stale until TTL: {e}")
+
+    async def start(self) -> None:
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = None
+            try:
+                redis = await get_redis()
+                pubsub = redis.pubsub()
+                await pubsub.subscribe(self.channel)
+
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    data = json.loads(message["data"])
+                    self.apply_change(UUID(data["account_id"]), data.get("balance"))
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Invalidations may have been missed while disconnected
+                logger.warning(f"Account cache listener failed, clearing cache: {e}")
+                self.clear()
+                await asyncio.sleep(1)
+
+            finally:
+                if pubsub is not None:
+                    await pubsub.aclose()
+
+
+account_cache = AccountCache(
+    max_size=settings.ACCOUNT_CACHE_MAX_SIZE,
+    ttl=settings.ACCOUNT_CACHE_TTL,
+    channel=settings.ACCOUNT_CACHE_CHANNEL
+)
@@ -0,0 +1,299 @@
+import asyncio
+import logging
+from typing import Optional
+from uuid import UUID, uuid4
+import redis.asyncio as redis
+from sqlalchemy import select, update, values, column, Integer
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.redis import get_redis
+from core.models import Account
+
+logger = logging.getLogger(__name__)
+
+
+BALANCE_KEY_PREFIX = "balance:account:"
+DELTAS_KEY = "balance:deltas"
+FLUSHING_KEY = "balance:deltas:flushing"
+LOCK_KEY = "balance:flush:lock"
+# Set while a flush is committing its deltas to the DB; GENERATION_KEY changes whenever
+# the flushing hash is committed or dropped, so a load can tell its DB read went stale
+COMMITTING_KEY = "balance:flush:committing"
+GENERATION_KEY = "balance:flush:generation"
+
+NOT_LOADED = -1
+INSUFFICIENT = -2
+STALE = -1
+
+LOAD_ATTEMPTS = 20
+LOAD_RETRY_DELAY = 0.05
+
+# KEYS: balance, deltas | ARGV: amount, account_id
+DEDUCT_SCRIPT = """
+local balance = redis.call('GET', KEYS[1])
+if not balance then return -1 end
+balance = tonumber(balance)
+local amount = tonumber(ARGV[1])
+if balance < amount then return -2 end
+redis.call('HINCRBY', KEYS[2], ARGV[2], -amount)
+return redis.call('DECRBY', KEYS[1], amount)
+"""
+
+# KEYS: balance, deltas | ARGV: amount, account_id
+CREDIT_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then return -1 end
+redis.call('HINCRBY', KEYS[2], ARGV[2], ARGV[1])
+return redis.call('INCRBY', KEYS[1], ARGV[1])
+"""
+
+# KEYS: balance, deltas, flushing, committing, generation | ARGV: db_balance, account_id, generation
+# Deltas not yet flushed are not in the DB row, so they are re-applied on load. A DB
+# balance read during a flush's commit, or before a flush that has since finished,
+# may or may not include the flushing deltas, so it is refused and read again
+LOAD_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then return 0 end
+if redis.call('EXISTS', KEYS[4]) == 1 or (redis.call('GET', KEYS[5]) or '0') ~= ARGV[3] then
+    return -1
+end
+local pending = tonumber(redis.call('HGET', KEYS[2], ARGV[2]) or '0')
+    + tonumber(redis.call('HGET', KEYS[3], ARGV[2]) or '0')
+redis.call('SET', KEYS[1], tonumber(ARGV[1]) + pending)
+return 1
+"""
+
+# KEYS: deltas, flushing
+# A leftover flushing hash means the previous flush crashed, so it is retried first
+FLUSH_BEGIN_SCRIPT = """
+if redis.call('EXISTS', KEYS[2]) == 0 then
+    if redis.call('EXISTS', KEYS[1]) == 0 then return {} end
+    redis.call('RENAME', KEYS[1], KEYS[2])
+end
+return redis.call('HGETALL', KEYS[2])
+"""
+
+# KEYS: lock | ARGV: owner token; a flush that overran the TTL must not free the next one's lock
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# KEYS: lock | ARGV: owner token, ttl ms
+EXTEND_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+def balance_key(account_id: UUID) -> str:
+    return f"{BALANCE_KEY_PREFIX}{account_id}"
+
+
+class RedisBalanceLedger:
+    """
+    Balance engine where the in-flight balance lives in Redis.
+
+    Deductions and credits are atomic Lua check-and-update calls that also record a
+    per-account delta. flush() coalesces those deltas into one UPDATE against
+    accounts.balance, and reconcile() repairs any drift between the two stores.
+    """
+
+    def __init__(self, redis_client: redis.Redis):
+        self.redis = redis_client
+        self._deduct = redis_client.register_script(DEDUCT_SCRIPT)
+        self._credit = redis_client.register_script(CREDIT_SCRIPT)
+        self._load = redis_client.register_script(LOAD_SCRIPT)
+        self._flush_begin = redis_client.register_script(FLUSH_BEGIN_SCRIPT)
+        self._release_lock = redis_client.register_script(RELEASE_LOCK_SCRIPT)
+        self._extend_lock = redis_client.register_script(EXTEND_LOCK_SCRIPT)
+
+    async def deduct(self, db: AsyncSession, account_id: UUID, amount: int) -> Optional[int]:
+        # Returns the new balance, or None if the balance is insufficient
+        for _ in range(2):
+            result = await self._deduct(
+                keys=[balance_key(account_id), DELTAS_KEY],
+                args=[amount, str(account_id)]
+            )
+            if result == NOT_LOADED:
+                if not await self.load(db, account_id):
+                    return None
+                continue
+            if result == INSUFFICIENT:
+                return None
+            return result
+
+        return None
+
+    async def credit(self, db: AsyncSession, account_id: UUID, amount: int) -> Optional[int]:
+        for _ in range(2):
+            result = await self._credit(
+                keys=[balance_key(account_id), DELTAS_KEY],
+                args=[amount, str(account_id)]
+            )
+            if result == NOT_LOADED:
+                if not await self.load(db, account_id):
+                    return None
+                continue
+            return result
+
+        return None
+
+    async def load(self, db: AsyncSession, account_id: UUID) -> bool:
+        for _ in range(LOAD_ATTEMPTS):
+            generation = await self.redis.get(GENERATION_KEY) or "0"
+            db_balance = await db.scalar(
+                select(Account.balance).where(Account.id == account_id)
+            )
+            if db_balance is None:
+                return False
+
+            result = await self._load(
+                keys=[balance_key(account_id), DELTAS_KEY, FLUSHING_KEY, COMMITTING_KEY, GENERATION_KEY],
+                args=[db_balance, str(account_id), generation]
+            )
+            if result != STALE:
+                return True
+            # A flush is committing; its deltas are in the row once it finishes
+            await asyncio.sleep(LOAD_RETRY_DELAY)
+
+        logger.warning(f"Could not load balance of account {account_id}, a flush is still committing")
+        return False
+
+    async def acquire_lock(self, ttl_ms: int = 30000) -> Optional[str]:
+        # Returns the owner token to release with, or None if the lock is held elsewhere
+        token = uuid4().hex
+        if await self.redis.set(LOCK_KEY, token, nx=True, px=ttl_ms):
+            return token
+        return None
+
+    async def release_lock(self, token: str) -> None:
+        await self._release_lock(keys=[LOCK_KEY], args=[token])
+
+    async def extend_lock(self, token: str, ttl_ms: int = 30000) -> bool:
+        """Renew the lock for another `ttl_ms`; False if it expired and may be held elsewhere."""
+        return bool(await self._extend_lock(keys=[LOCK_KEY], args=[token, ttl_ms]))
+
+    async def flush(self, db: AsyncSession) -> int:
+        """
+        Apply all pending deltas to accounts.balance in one UPDATE ... FROM (VALUES ...).
+        Must be called while holding the flush lock.
+        """
+        raw = await self._flush_begin(keys=[DELTAS_KEY, FLUSHING_KEY])
+        if not raw:
+            return 0
+
+        deltas = [
+            (UUID(raw[i]), int(raw[i + 1]))
+            for i in range(0, len(raw), 2)
+            if int(raw[i + 1]) != 0
+        ]
+
+        if deltas:
+            await self._begin_commit()
+            delta_values = values(
+                column("id", PG_UUID(as_uuid=True)),
+                column("delta", Integer),
+                name="deltas"
+            ).data(deltas)
+
+            await db.execute(
+                update(Account)
+                .where(Account.id == delta_values.c.id)
+                .values(balance=Account.balance + delta_values.c.delta)
+            )
+            await db.commit()
+
+        # A crash between the commit above and this DEL re-applies the batch on the
+        # next flush; reconcile() detects and repairs that drift
+        await self._end_flush()
+        return len(deltas)
+
+    async def _begin_commit(self) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            # Outlives a flush that died mid-commit only as long as its lock does
+            pipe.set(COMMITTING_KEY, 1, px=30000)
+            pipe.incr(GENERATION_KEY)
+            await pipe.execute()
+
+    async def _end_flush(self) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(FLUSHING_KEY, COMMITTING_KEY)
+            pipe.incr(GENERATION_KEY)
+            await pipe.execute()
+
+    async def reconcile(self, db: AsyncSession, token: str, batch_size: int = 500) -> int:
+        """
+        Compare every Redis-resident balance with accounts.balance plus its pending
+        delta, and rewrite the DB row where they disagree. Redis is authoritative.
+        Must be called while holding the flush lock (`token`), right after a flush; the
+        lock is renewed after every batch and reconciliation stops if it was lost.
+        """
+        repaired = 0
+        keys = []
+
+        async for key in self.redis.scan_iter(match=f"{BALANCE_KEY_PREFIX}*", count=batch_size):
+            keys.append(key)
+            if len(keys) >= batch_size:
+                repaired += await self._reconcile_keys(db, keys)
+                keys = []
+                if not await self.extend_lock(token):
+                    logger.warning(f"Balance flush lock lost during reconciliation, stopping after {repaired} repairs")
+                    return repaired
+
+        if keys:
+            repaired += await self._reconcile_keys(db, keys)
+
+        return repaired
+
+    async def _reconcile_keys(self, db: AsyncSession, keys: list[str]) -> int:
+        account_ids = [UUID(key[len(BALANCE_KEY_PREFIX):]) for key in keys]
+        fields = [str(account_id) for account_id in account_ids]
+
+        # Balance and pending delta are read in one MULTI so a concurrent deduct
+        # can't be seen on one side only
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.mget(keys)
+            pipe.hmget(DELTAS_KEY, fields)
+            redis_balances, pending = await pipe.execute()
+
+        result = await db.execute(
+            select(Account.id, Account.balance).where(Account.id.in_(account_ids))
+        )
+        db_balances = {row.id: row.balance for row in result}
+
+        repaired = 0
+        for account_id, redis_balance, delta in zip(account_ids, redis_balances, pending):
+            if redis_balance is None or account_id not in db_balances:
+                continue
+
+            expected = int(redis_balance) - int(delta or 0)
+            if db_balances[account_id] == expected:
+                continue
+
+            logger.warning(
+                f"Balance drift for account {account_id}: "
+                f"db={db_balances[account_id]} expected={expected}, repairing"
+            )
+            await db.execute(
+                update(Account)
+                .where(Account.id == account_id)
+                .values(balance=expected)
+            )
+            repaired += 1
+
+        await db.commit()
+        return repaired
+
+
+_ledger: Optional[RedisBalanceLedger] = None
+
+
+async def get_balance_ledger() -> RedisBalanceLedger:
+    global _ledger
+    if _ledger is None:
+        _ledger = RedisBalanceLedger(await get_redis())
+    return _ledger
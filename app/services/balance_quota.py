@@ -0,0 +1,327 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from uuid import UUID, uuid4
+from sqlalchemy import select, update, delete, func, values, column, Integer
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.database import async_session_maker
+from config.settings import settings
+from core.models import Account, BalanceReservation
+from app.services.account_cache import account_cache
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QuotaBlock:
+    account_id: UUID
+    reservation_id: Optional[UUID] = None
+    remaining: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    refill_task: Optional[asyncio.Task] = None
+    # Released and unregistered; anyone who was waiting on the lock moves to a new block
+    retired: bool = False
+
+
+class QuotaManager:
+    """
+    Balance engine that reserves blocks of credits from accounts.balance and spends
+    them in-process, so the accounts row is written once per block instead of once
+    per SMS.
+
+    Every block is mirrored by a balance_reservations row whose credits are
+    checkpointed on each sweep. If a process dies, another one returns the last
+    checkpoint to the account once the row goes stale. Customers never lose credits;
+    the gateway can leak at most what was spent since the last checkpoint.
+    """
+
+    def __init__(
+        self,
+        block_size: int,
+        refill_watermark: int,
+        idle_timeout: float,
+        sweep_interval: float,
+        stale_after: float
+    ):
+        self.block_size = block_size
+        self.refill_watermark = refill_watermark
+        self.idle_timeout = idle_timeout
+        self.sweep_interval = sweep_interval
+        self.stale_after = stale_after
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        self._blocks: Dict[UUID, QuotaBlock] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+
+    async def deduct(self, account_id: UUID, amount: int) -> bool:
+        attempts = 0
+        while attempts < 2:
+            block = self._blocks.get(account_id)
+            if block is None:
+                block = self._blocks[account_id] = QuotaBlock(account_id=account_id)
+
+            if block.remaining < amount:
+                async with block.lock:
+                    if block.retired:
+                        # Credits reserved into it would never be checkpointed
+                        continue
+                    if block.remaining < amount:
+                        await self._reserve(block, max(self.block_size, amount))
+
+            attempts += 1
+            if block.remaining < amount:
+                continue
+
+            # No await between the check and the decrement: atomic within the event loop
+            block.remaining -= amount
+            block.last_used = time.monotonic()
+
+            if block.remaining < self.refill_watermark and block.refill_task is None:
+                block.refill_task = asyncio.create_task(self._refill(block))
+            return True
+
+        return False
+
+    def refund(self, account_id: UUID, amount: int) -> bool:
+        """
+        Put credits from a deduction that was not used back into the account's block.
+        False if the block has been released since; its credits went back to the account
+        without these, so the caller returns them to the row.
+        """
+        block = self._blocks.get(account_id)
+        if block is None or block.retired:
+            return False
+        block.remaining += amount
+        return True
+
+    async def spendable_balance(self, db: AsyncSession, account_id: UUID) -> int:
+        # Credits parked in blocks still belong to the customer
+        reserved = await db.scalar(
+            select(func.coalesce(func.sum(BalanceReservation.credits), 0))
+            .where(BalanceReservation.account_id == account_id)
+        )
+        balance = await db.scalar(select(Account.balance).where(Account.id == account_id))
+        return (balance or 0) + (reserved or 0)
+
+    async def start(self) -> None:
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep_loop())
+
+    async def stop(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+
+        for block in list(self._blocks.values()):
+            try:
+                await self._release(block)
+            except Exception as e:
+                logger.error(f"Failed to return quota block for account {block.account_id}: {e}")
+
+    async def _refill(self, block: QuotaBlock) -> None:
+        try:
+            async with block.lock:
+                if not block.retired and block.remaining < self.refill_watermark:
+                    await self._reserve(block, self.block_size)
+        except Exception as e:
+            logger.error(f"Quota refill failed for account {block.account_id}: {e}")
+        finally:
+            block.refill_task = None
+
+    async def _reserve(self, block: QuotaBlock, want: int) -> None:
+        async with async_session_maker() as session:
+            balance = await session.scalar(
+                select(Account.balance)
+                .where(Account.id == block.account_id)
+                .with_for_update()
+            )
+            if not balance:
+                await session.rollback()
+                return
+
+            take = min(balance, want)
+            await session.execute(
+                update(Account)
+                .where(Account.id == block.account_id)
+                .values(balance=Account.balance - take)
+            )
+
+            reservation_id = block.reservation_id
+            updated = 0
+            if reservation_id is not None:
+                result = await session.execute(
+                    update(BalanceReservation)
+                    .where(BalanceReservation.id == reservation_id)
+                    .values(credits=block.remaining + take, updated_at=datetime.utcnow())
+                )
+                updated = result.rowcount
+
+            if not updated:
+                reservation_id = uuid4()
+                session.add(BalanceReservation(
+                    id=reservation_id,
+                    account_id=block.account_id,
+                    owner=self.owner,
+                    credits=take
+                ))
+
+            spendable = await self.spendable_balance(session, block.account_id)
+            await session.commit()
+
+        if reservation_id != block.reservation_id:
+            # Either a first block or our row was reaped as stale, in which case its
+            # credits were already returned and the local ones are void. Switched only
+            # once committed, so a checkpoint never sees a row that doesn't exist yet
+            block.remaining = 0
+            block.reservation_id = reservation_id
+        block.remaining += take
+        logger.debug(f"Reserved {take} credits for account {block.account_id}")
+        await account_cache.publish_change(block.account_id, spendable)
+
+    async def _release(self, block: QuotaBlock, retire: bool = False) -> None:
+        async with block.lock:
+            if retire:
+                # Unregistered while holding the lock, so no waiter can reserve into
+                # a block that _checkpoint no longer sees
+                block.retired = True
+                if self._blocks.get(block.account_id) is block:
+                    del self._blocks[block.account_id]
+
+            if block.reservation_id is None:
+                return
+
+            remaining = block.remaining
+            block.remaining = 0
+
+            async with async_session_maker() as session:
+                result = await session.execute(
+                    delete(BalanceReservation)
+                    .where(BalanceReservation.id == block.reservation_id)
+                )
+                # A reaped row has already had its credits returned
+                if result.rowcount and remaining:
+                    await session.execute(
+                        update(Account)
+                        .where(Account.id == block.account_id)
+                        .values(balance=Account.balance + remaining)
+                    )
+                await session.commit()
+
+            block.reservation_id = None
+            logger.debug(f"Returned {remaining} credits to account {block.account_id}")
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await self._release_idle()
+                await self._checkpoint()
+                await self._reap_stale()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Quota sweep failed: {e}")
+
+    async def _release_idle(self) -> None:
+        cutoff = time.monotonic() - self.idle_timeout
+        for block in list(self._blocks.values()):
+            if block.last_used < cutoff and block.refill_task is None:
+                await self._release(block, retire=True)
+
+    async def _checkpoint(self) -> None:
+        # Blocks busy reserving or releasing write their own row and are skipped. The
+        # rest stay locked until the UPDATE commits, so a reserve can't write its take
+        # in between and have it overwritten with the older `remaining`
+        locked = []
+        try:
+            for block in list(self._blocks.values()):
+                if block.reservation_id is None or block.lock.locked():
+                    continue
+                await block.lock.acquire()
+                locked.append(block)
+
+            blocks = [block for block in locked if block.reservation_id is not None and not block.retired]
+            if not blocks:
+                return
+
+            checkpoint = values(
+                column("id", PG_UUID(as_uuid=True)),
+                column("credits", Integer),
+                name="checkpoint"
+            ).data([(block.reservation_id, block.remaining) for block in blocks])
+
+            async with async_session_maker() as session:
+                result = await session.execute(
+                    update(BalanceReservation)
+                    .where(BalanceReservation.id == checkpoint.c.id)
+                    .values(credits=checkpoint.c.credits, updated_at=datetime.utcnow())
+                    .returning(BalanceReservation.id)
+                )
+                alive = set(result.scalars().all())
+                await session.commit()
+
+            for block in blocks:
+                if block.reservation_id not in alive:
+                    logger.warning(f"Quota reservation for account {block.account_id} was reaped, dropping block")
+                    block.remaining = 0
+                    block.reservation_id = None
+        finally:
+            for block in locked:
+                block.lock.release()
+
+    async def _reap_stale(self, limit: int = 500) -> None:
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stale_after)
+
+        async with async_session_maker() as session:
+            result = await session.execute(
+                select(BalanceReservation)
+                .where(BalanceReservation.updated_at < cutoff, BalanceReservation.owner != self.owner)
+                .with_for_update(skip_locked=True)
+                .limit(limit)
+            )
+            stale = list(result.scalars().all())
+            if not stale:
+                return
+
+            credits: Dict[UUID, int] = {}
+            for reservation in stale:
+                credits[reservation.account_id] = credits.get(reservation.account_id, 0) + reservation.credits
+
+            returned = values(
+                column("id", PG_UUID(as_uuid=True)),
+                column("credits", Integer),
+                name="returned"
+            ).data(list(credits.items()))
+
+            await session.execute(
+                update(Account)
+                .where(Account.id == returned.c.id)
+                .values(balance=Account.balance + returned.c.credits)
+            )
+            await session.execute(
+                delete(BalanceReservation)
+                .where(BalanceReservation.id.in_([reservation.id for reservation in stale]))
+            )
+            await session.commit()
+
+        logger.warning(f"Returned credits from {len(stale)} stale quota reservations")
+
+
+quota_manager = QuotaManager(
+    block_size=settings.QUOTA_BLOCK_SIZE,
+    refill_watermark=settings.QUOTA_REFILL_WATERMARK,
+    idle_timeout=settings.QUOTA_IDLE_TIMEOUT,
+    sweep_interval=settings.QUOTA_SWEEP_INTERVAL,
+    stale_after=settings.QUOTA_STALE_AFTER
+)
@@ -0,0 +1,131 @@
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional
+from uuid import UUID
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.settings import settings
+from core.consts import SMSStatus
+from app.repositories.dead_letter_repository import DeadLetterFilter, DeadLetterRepository
+from app.repositories.outbox_repository import OutboxRepository
+from app.repositories.sms_repository import SMSRepository
+from app.repositories.stats_repository import StatsRepository, hour_bucket
+from app.services.send_dedup import SENT, get_send_dedup
+from app.services.sms_service import PROCESS_SMS_TASK, SMSService
+from app.services.sms_stats import SMSStatsService
+
+logger = logging.getLogger(__name__)
+
+# pg_advisory_xact_lock key: replays run one at a time, so two of them can never both
+# see the same FAILED message and send it twice
+REPLAY_LOCK_KEY = 0x736D735F646C71
+
+
+def dead_letter_record(task_id: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+    """dead_letters row from the kwargs of a workers.tasks.dlq_tasks.store_failed_task message."""
+    kwargs = fields.get("kwargs") or {}
+    failed_at = fields.get("failed_at")
+    sms_id, account_id = kwargs.get("sms_id"), kwargs.get("account_id")
+    return {
+        "task_id": fields.get("task_id") or task_id,
+        "task_name": fields.get("task_name") or "unknown",
+        "sms_id": UUID(sms_id) if sms_id else None,
+        "account_id": UUID(account_id) if account_id else None,
+        "operator": fields.get("operator") or kwargs.get("last_operator"),
+        "error_class": fields.get("error_class") or "Exception",
+        # Tracebacks stay in the worker logs; the table keeps what is needed to filter
+        "error": (fields.get("exception") or "")[:1000],
+        "payload": kwargs,
+        "failed_at": datetime.fromisoformat(failed_at) if failed_at else datetime.utcnow(),
+    }
+
+
+@dataclass
+class ReplayResult:
+    claimed: int
+    replayed: int
+    skipped: int
+
+
+class DeadLetterService:
+    @staticmethod
+    async def replay(db: AsyncSession, filters: DeadLetterFilter, limit: int) -> ReplayResult:
+        """
+        Requeue up to `limit` unreplayed dead-lettered SMS tasks matching `filters`.
+
+        Idempotent per sms_id: a message is reset to PENDING and queued only if it is
+        FAILED, or PENDING with no replay since it failed and no send state left;
+        SENT messages and ones an operator accepted are skipped.
+        Balances are not touched, since the SMS was charged when it was accepted.
+        With the outbox enabled the reset, the stats correction and the tasks commit
+        together.
+        """
+        await db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": REPLAY_LOCK_KEY})
+
+        repo = DeadLetterRepository(db)
+        letters = await repo.claim_for_replay(filters, PROCESS_SMS_TASK, limit)
+        if not letters:
+            await db.rollback()
+            return ReplayResult(claimed=0, replayed=0, skipped=0)
+
+        latest = {letter.sms_id: letter for letter in letters}
+        # A task can be dead-lettered after the operator accepted its message, and a
+        # PENDING message with any send state may still be retried or have a result
+        # on its way that would overwrite the replay
+        dedup = await get_send_dedup()
+        states = await dedup.states([str(sms_id) for sms_id in latest])
+        reset = await SMSRepository(db).reset_for_replay(
+            [
+                (sms_id, DeadLetterService._created_at(letter.payload), letter.failed_at)
+                for sms_id, letter in latest.items() if states[str(sms_id)] != SENT
+            ],
+            failed_only=[sms_id for sms_id in latest if states[str(sms_id)] is not None]
+        )
+
+        changed = [row for row in reset if row.previous_status != SMSStatus.PENDING]
+        await StatsRepository(db).record_transitions(
+            (row.account_id, row.sms_type, row.created_at, row.previous_status, SMSStatus.PENDING)
+            for row in changed
+        )
+
+        entries = []
+        for row in reset:
+            kwargs = {
+                "sms_id": str(row.id),
+                "account_id": str(row.account_id),
+                "phone_number": row.phone_number,
+                "message": row.message,
+                "created_at": row.created_at.isoformat(),
+                "sms_type": row.sms_type,
+            }
+            last_operator = latest[row.id].operator
+            if last_operator:
+                kwargs["last_operator"] = last_operator
+            entries.append((SMSService.queue_for(row.sms_type), kwargs))
+
+        await repo.mark_replayed([letter.id for letter in letters], datetime.utcnow())
+
+        # Their send state says "recorded"; without this the workers would drop them.
+        # Raising here rolls the replay back rather than queueing messages that are dropped.
+        await dedup.forget(str(row.id) for row in reset)
+
+        if settings.SMS_OUTBOX_ENABLED:
+            if entries:
+                await OutboxRepository(db).add(entries)
+            await db.commit()
+        else:
+            await db.commit()
+            await SMSService.publish_messages(entries)
+
+        # Replayed hours may be settled and cached already
+        await SMSStatsService.invalidate((row.account_id, hour_bucket(row.created_at)) for row in changed)
+
+        logger.info(f"Replayed {len(entries)} dead-lettered SMS, skipped {len(letters) - len(entries)}")
+        return ReplayResult(claimed=len(letters), replayed=len(entries), skipped=len(letters) - len(entries))
+
+    @staticmethod
+    def _created_at(payload: Dict[str, Any]) -> Optional[datetime]:
+        created_at = payload.get("created_at")
+        return datetime.fromisoformat(created_at) if created_at else None
@@ -0,0 +1,147 @@
+import json
+import logging
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+import redis.asyncio as redis
+
+from config.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+FAIR_QUEUE_PREFIX = "fair:regular:account:"
+ACTIVE_ACCOUNTS_KEY = "fair:regular:active"
+IN_FLIGHT_KEY = "fair:regular:inflight"
+
+# KEYS: account queue, in-flight list, active set | ARGV: count, account_id
+# Moves up to `count` tasks to the in-flight list so a dispatcher crash before the
+# broker confirms them does not lose them
+TAKE_SCRIPT = """
+local items = redis.call('LPOP', KEYS[1], ARGV[1])
+if not items then
+    redis.call('SREM', KEYS[3], ARGV[2])
+    return {}
+end
+redis.call('RPUSH', KEYS[2], unpack(items))
+if redis.call('LLEN', KEYS[1]) == 0 then
+    redis.call('SREM', KEYS[3], ARGV[2])
+end
+return items
+"""
+
+
+def fair_queue_key(account_id: str) -> str:
+    return f"{FAIR_QUEUE_PREFIX}{account_id}"
+
+
+class DeficitRoundRobin:
+    """
+    Deficit round-robin over accounts with a backlog.
+
+    Every visit adds quantum * weight to an account's deficit and lets it send up to
+    that many messages, so capacity is split by weight no matter how deep each backlog
+    is. Rounds continue until the budget is spent, so spare capacity is never left idle.
+    An account that runs dry leaves the ring and loses its deficit.
+    """
+
+    def __init__(self, quantum: int):
+        self.quantum = quantum
+        self._ring: Deque[str] = deque()
+        self._deficits: Dict[str, int] = {}
+
+    def allocate(
+        self,
+        backlogs: Dict[str, int],
+        budget: int,
+        weight_of: Callable[[str], int]
+    ) -> list[tuple[str, int]]:
+        """Split `budget` messages among accounts given their backlog sizes."""
+        remaining = {account_id: n for account_id, n in backlogs.items() if n > 0}
+        for account_id in [a for a in self._ring if a not in remaining]:
+            self._ring.remove(account_id)
+            self._deficits.pop(account_id, None)
+        for account_id in sorted(remaining.keys() - set(self._ring)):
+            self._ring.append(account_id)
+
+        allocations: Dict[str, int] = {}
+        while budget > 0 and self._ring:
+            account_id = self._ring[0]
+            deficit = self._deficits.get(account_id, 0) + self.quantum * max(1, weight_of(account_id))
+            take = min(deficit, budget, remaining[account_id])
+            allocations[account_id] = allocations.get(account_id, 0) + take
+            budget -= take
+            remaining[account_id] -= take
+
+            if remaining[account_id] == 0:
+                # Backlog is empty: DRR does not let idle accounts bank credit
+                self._ring.popleft()
+                self._deficits.pop(account_id, None)
+            else:
+                self._deficits[account_id] = deficit - take
+                self._ring.rotate(-1)
+
+        return list(allocations.items())
+
+
+class FairQueue:
+    """Per-account Redis backlogs of regular tasks waiting for the fair dispatcher."""
+
+    def __init__(self, redis_client: redis.Redis):
+        self.redis = redis_client
+        self._take = redis_client.register_script(TAKE_SCRIPT)
+
+    async def push(self, entries: list[Dict[str, Any]], fsync_timeout_ms: Optional[int] = None) -> None:
+        """
+        With `fsync_timeout_ms`, returns only once Redis has fsynced the tasks to its
+        append-only file (WAITAOF, Redis 7.2+), and raises if that takes longer. Under
+        appendfsync everysec a plain write can still be lost for up to a second, which
+        a caller deleting its own copy next can't afford.
+        """
+        by_account: Dict[str, list[str]] = {}
+        for kwargs in entries:
+            by_account.setdefault(kwargs["account_id"], []).append(json.dumps(kwargs))
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for account_id, payloads in by_account.items():
+                pipe.rpush(fair_queue_key(account_id), *payloads)
+            pipe.sadd(ACTIVE_ACCOUNTS_KEY, *by_account)
+            if fsync_timeout_ms is not None:
+                pipe.execute_command("WAITAOF", 1, 0, fsync_timeout_ms)
+            results = await pipe.execute()
+
+        if fsync_timeout_ms is not None and results[-1][0] < 1:
+            raise TimeoutError(f"Redis did not fsync {len(entries)} fair queue tasks within {fsync_timeout_ms} ms")
+
+    async def backlogs(self) -> Dict[str, int]:
+        """Backlog size of every account with waiting tasks."""
+        accounts = list(await self.redis.smembers(ACTIVE_ACCOUNTS_KEY))
+        if not accounts:
+            return {}
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for account_id in accounts:
+                pipe.llen(fair_queue_key(account_id))
+            sizes = await pipe.execute()
+        return dict(zip(accounts, sizes))
+
+    async def take(self, account_id: str, count: int) -> list[Dict[str, Any]]:
+        items = await self._take(
+            keys=[fair_queue_key(account_id), IN_FLIGHT_KEY, ACTIVE_ACCOUNTS_KEY],
+            args=[count, account_id]
+        )
+        return [json.loads(item) for item in items]
+
+    async def in_flight(self) -> list[Dict[str, Any]]:
+        return [json.loads(item) for item in await self.redis.lrange(IN_FLIGHT_KEY, 0, -1)]
+
+    async def ack_in_flight(self) -> None:
+        await self.redis.delete(IN_FLIGHT_KEY)
+
+
+_fair_queue: Optional[FairQueue] = None
+
+
+async def get_fair_queue() -> FairQueue:
+    global _fair_queue
+    if _fair_queue is None:
+        _fair_queue = FairQueue(await get_redis())
+    return _fair_queue
@@ -0,0 +1,178 @@
+import asyncio
+import hashlib
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+from uuid import UUID, uuid4
+import redis.asyncio as redis
+
+from config.redis import get_redis
+from config.settings import settings
+from app.schemas.sms_schema import SMSResponse
+
+logger = logging.getLogger(__name__)
+
+PENDING = "p"
+DONE = "d"
+
+# KEYS: key | ARGV: lock value; deletes the key only while it still holds this request's lock
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# KEYS: key | ARGV: lock value, response record, ttl seconds; stores the response only
+# while the key still holds this request's lock, never over a newer request's claim
+COMPLETE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    return 1
+end
+return 0
+"""
+
+# KEYS: key | ARGV: lock value, ttl ms; extends the lock only while this request holds it
+EXTEND_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+ACQUIRED = "acquired"
+REPLAY = "replay"
+IN_PROGRESS = "in_progress"
+MISMATCH = "mismatch"
+
+
+def idempotency_key(account_id: UUID, key: str) -> str:
+    return f"idem:{account_id}:{key}"
+
+
+def fingerprint(body: str) -> str:
+    # Enough to tell a reused key with a different body from a retry
+    return hashlib.blake2b(body.encode("utf-8"), digest_size=8).hexdigest()
+
+
+@dataclass
+class Claim:
+    state: str
+    key: str
+    fingerprint: str
+    # The pending value this request wrote, None if it holds no lock
+    lock: Optional[str] = None
+    response: Optional[SMSResponse] = None
+
+
+class IdempotencyStore:
+    """
+    Idempotency-Key records in Redis, one string per (account, key).
+
+    The first request stores "p|<fingerprint>|<token>" with SET NX, a lock that expires
+    after lock_ttl in case the request dies, and replaces it with
+    "d|<fingerprint>|<response json>" for `ttl` seconds when it succeeds, if it still
+    holds the lock. While the request runs, held() keeps extending the lock, so a slow
+    request is not mistaken for a dead one. A duplicate that arrives while the lock is
+    held waits up to `wait` seconds for the response instead of sending again. A
+    request that fails before its SMS commits deletes its lock so the client can retry.
+    """
+
+    def __init__(self, redis_client: redis.Redis, ttl: int, lock_ttl: float, wait: float, poll_interval: float):
+        self.redis = redis_client
+        self.ttl = ttl
+        self.lock_ttl_ms = int(lock_ttl * 1000)
+        self.wait = wait
+        self.poll_interval = poll_interval
+        self._complete = redis_client.register_script(COMPLETE_SCRIPT)
+        self._release = redis_client.register_script(RELEASE_SCRIPT)
+        self._extend = redis_client.register_script(EXTEND_SCRIPT)
+
+    async def claim(self, account_id: UUID, key: str, body: str) -> Claim:
+        redis_key = idempotency_key(account_id, key)
+        request_fingerprint = fingerprint(body)
+        lock = f"{PENDING}|{request_fingerprint}|{uuid4().hex}"
+        deadline = time.monotonic() + self.wait
+
+        try:
+            while True:
+                # One round trip on the hot path: takes the lock or returns what holds the key
+                current = await self.redis.set(redis_key, lock, nx=True, px=self.lock_ttl_ms, get=True)
+                if current is None:
+                    return Claim(ACQUIRED, redis_key, request_fingerprint, lock)
+
+                state, stored_fingerprint, payload = current.split("|", 2)
+                if stored_fingerprint != request_fingerprint:
+                    return Claim(MISMATCH, redis_key, request_fingerprint)
+                if state == DONE:
+                    return Claim(REPLAY, redis_key, request_fingerprint, response=SMSResponse.model_validate_json(payload))
+                if time.monotonic() >= deadline:
+                    return Claim(IN_PROGRESS, redis_key, request_fingerprint)
+
+                await asyncio.sleep(self.poll_interval)
+        except Exception as e:
+            # Fail open: a Redis outage must not stop sending
+            logger.warning(f"Idempotency store unavailable, processing {key} without it: {e}")
+            return Claim(ACQUIRED, redis_key, request_fingerprint)
+
+    @asynccontextmanager
+    async def held(self, claim: Claim) -> AsyncIterator[None]:
+        """Keep the claim's lock from expiring until the block exits."""
+        if claim.lock is None:
+            yield
+            return
+
+        keeper = asyncio.create_task(self._keep(claim))
+        try:
+            yield
+        finally:
+            keeper.cancel()
+
+    async def _keep(self, claim: Claim) -> None:
+        while True:
+            await asyncio.sleep(self.lock_ttl_ms / 3000)
+            try:
+                if not await self._extend(keys=[claim.key], args=[claim.lock, self.lock_ttl_ms]):
+                    # Completed, released or taken over; nothing left to extend
+                    return
+            except Exception as e:
+                logger.warning(f"Failed to extend idempotency lock {claim.key}: {e}")
+
+    async def complete(self, claim: Claim, response: SMSResponse) -> None:
+        if claim.lock is None:
+            return
+        try:
+            record = f"{DONE}|{claim.fingerprint}|{response.model_dump_json()}"
+            if not await self._complete(keys=[claim.key], args=[claim.lock, record, self.ttl]):
+                # The lock expired and another request claimed the key; its record stands
+                logger.warning(f"Idempotency lock {claim.key} expired before the response was stored")
+        except Exception as e:
+            logger.warning(f"Failed to store idempotent response for {claim.key}: {e}")
+
+    async def release(self, claim: Claim) -> None:
+        if claim.lock is None:
+            return
+        try:
+            await self._release(keys=[claim.key], args=[claim.lock])
+        except Exception as e:
+            # The lock expires on its own after lock_ttl
+            logger.warning(f"Failed to release idempotency lock {claim.key}: {e}")
+
+
+_idempotency_store: Optional[IdempotencyStore] = None
+
+
+async def get_idempotency_store() -> IdempotencyStore:
+    global _idempotency_store
+    if _idempotency_store is None:
+        _idempotency_store = IdempotencyStore(
+            await get_redis(),
+            ttl=settings.IDEMPOTENCY_TTL,
+            lock_ttl=settings.IDEMPOTENCY_LOCK_TTL,
+            wait=settings.IDEMPOTENCY_WAIT,
+            poll_interval=settings.IDEMPOTENCY_POLL_INTERVAL
+        )
+    return _idempotency_store
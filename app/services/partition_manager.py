@@ -0,0 +1,247 @@
+import gzip
+import logging
+import os
+import re
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from config.database import engine
+from config.settings import settings
+from core.models import SMS
+
+logger = logging.getLogger(__name__)
+
+PARENT = SMS.__tablename__
+PARTITION_NAME_PATTERN = "^sms_[0-9]{4}_[0-9]{2}(_[0-9]{2})?$"
+BOUNDS = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+# pg_advisory_lock key so overlapping scheduled runs never work on the same partitions
+MAINTENANCE_LOCK_KEY = 0x736D735F70617274
+
+
+@dataclass(frozen=True)
+class Partition:
+    name: str
+    start: datetime
+    end: datetime
+
+
+@dataclass
+class MaintenancePlan:
+    create: list[Partition] = field(default_factory=list)
+    detach: list[Partition] = field(default_factory=list)
+    # Detaches interrupted half-way (DETACH ... CONCURRENTLY is two transactions)
+    finalize: list[str] = field(default_factory=list)
+    # Detached tables whose archive has not been written yet
+    archive: list[str] = field(default_factory=list)
+
+    def describe(self) -> list[str]:
+        return (
+            [f"create {p.name} [{p.start:%Y-%m-%d}, {p.end:%Y-%m-%d})" for p in self.create]
+            + [f"finalize detach of {name}" for name in self.finalize]
+            + [f"detach {p.name} [{p.start:%Y-%m-%d}, {p.end:%Y-%m-%d})" for p in self.detach]
+            + [f"archive and drop {name}" for name in self.archive]
+        )
+
+
+class PartitionManager:
+    """
+    Keeps the sms table's range partitions ahead of time and trims old ones.
+
+    New partitions are built as standalone tables with the primary key and every index
+    declared on core.models.SMS, then attached, so creating one never takes an ACCESS
+    EXCLUSIVE lock on sms. Partitions that ended more than retention_days ago are
+    detached with DETACH PARTITION CONCURRENTLY, written to archive_dir as gzipped CSV
+    and dropped. Every step is idempotent and picks up where a crashed run stopped.
+    """
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        interval: str,
+        precreate: int,
+        retention_days: int,
+        archive_dir: str
+    ):
+        if interval not in ("month", "day"):
+            raise ValueError(f"Unsupported partition interval: {interval}")
+
+        self.engine = engine
+        self.interval = interval
+        self.precreate = precreate
+        self.retention = timedelta(days=retention_days)
+        self.archive_dir = Path(archive_dir)
+
+    async def plan(self, now: Optional[datetime] = None) -> MaintenancePlan:
+        now = now or datetime.utcnow()
+        plan = MaintenancePlan()
+
+        async with self.engine.connect() as connection:
+            attached, pending = await self._attached(connection)
+            plan.archive = await self._detached(connection)
+
+        for period in self._periods(now):
+            # Days already covered by a monthly partition (or vice versa) are skipped
+            if not any(p.start < period.end and period.start < p.end for p in attached):
+                plan.create.append(period)
+
+        cutoff = now - self.retention
+        plan.finalize = [p.name for p in pending]
+        plan.detach = [p for p in attached if p.end <= cutoff]
+        return plan
+
+    async def apply(self, plan: MaintenancePlan) -> None:
+        for partition in plan.create:
+            await self._create(partition)
+            logger.info(f"Created partition {partition.name}")
+
+        # DETACH ... CONCURRENTLY cannot run inside a transaction block
+        autocommit = self.engine.execution_options(isolation_level="AUTOCOMMIT")
+
+        for name in plan.finalize:
+            async with autocommit.connect() as connection:
+                await connection.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {name} FINALIZE"))
+            logger.info(f"Finalized detach of partition {name}")
+
+        for partition in plan.detach:
+            async with autocommit.connect() as connection:
+                await connection.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {partition.name} CONCURRENTLY"))
+            logger.info(f"Detached partition {partition.name}")
+
+        for name in plan.archive + plan.finalize + [p.name for p in plan.detach]:
+            path = await self._archive(name)
+            logger.info(f"Archived partition {name} to {path}")
+
+    async def run(self, dry_run: bool = False) -> Optional[MaintenancePlan]:
+        if dry_run:
+            plan = await self.plan()
+            for step in plan.describe():
+                logger.info(f"[dry-run] {step}")
+            return plan
+
+        autocommit = self.engine.execution_options(isolation_level="AUTOCOMMIT")
+        async with autocommit.connect() as lock_connection:
+            locked = await lock_connection.scalar(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": MAINTENANCE_LOCK_KEY}
+            )
+            if not locked:
+                logger.info("Partition maintenance already running elsewhere, skipping")
+                return None
+
+            try:
+                plan = await self.plan()
+                for step in plan.describe():
+                    logger.info(step)
+                await self.apply(plan)
+                return plan
+            finally:
+                await lock_connection.execute(
+                    text("SELECT pg_advisory_unlock(:key)"), {"key": MAINTENANCE_LOCK_KEY}
+                )
+
+    def _periods(self, now: datetime) -> list[Partition]:
+        periods = []
+        if self.interval == "day":
+            start = datetime(now.year, now.month, now.day)
+            for _ in range(self.precreate + 1):
+                end = start + timedelta(days=1)
+                periods.append(Partition(f"sms_{start:%Y_%m_%d}", start, end))
+                start = end
+        else:
+            start = datetime(now.year, now.month, 1)
+            for _ in range(self.precreate + 1):
+                end = (start + timedelta(days=32)).replace(day=1)
+                periods.append(Partition(f"sms_{start:%Y_%m}", start, end))
+                start = end
+        return periods
+
+    @staticmethod
+    async def _attached(connection: AsyncConnection) -> tuple[list[Partition], list[Partition]]:
+        result = await connection.execute(text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), i.inhdetachpending "
+            "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:parent)"
+        ), {"parent": PARENT})
+
+        attached, pending = [], []
+        for name, bound, detach_pending in result.all():
+            match = BOUNDS.search(bound or "")
+            if match is None:
+                # DEFAULT partition
+                continue
+            partition = Partition(
+                name,
+                datetime.fromisoformat(match.group(1)),
+                datetime.fromisoformat(match.group(2))
+            )
+            (pending if detach_pending else attached).append(partition)
+        return attached, pending
+
+    @staticmethod
+    async def _detached(connection: AsyncConnection) -> list[str]:
+        result = await connection.execute(text(
+            "SELECT c.relname FROM pg_class c "
+            "JOIN pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE n.nspname = current_schema() AND c.relkind = 'r' "
+            "AND NOT c.relispartition AND c.relname ~ :pattern "
+            "ORDER BY c.relname"
+        ), {"pattern": PARTITION_NAME_PATTERN})
+        return list(result.scalars().all())
+
+    async def _create(self, partition: Partition) -> None:
+        table = SMS.__table__
+        name = partition.name
+        # The model declares its key on the mapper; the table itself has PRIMARY KEY (id, created_at)
+        primary_key = ", ".join(column.name for column in SMS.__mapper__.primary_key)
+
+        async with self.engine.begin() as connection:
+            await connection.execute(text(
+                f"CREATE TABLE {name} (LIKE {PARENT} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+            ))
+            await connection.execute(text(f"ALTER TABLE {name} ADD PRIMARY KEY ({primary_key})"))
+
+            for index in table.indexes:
+                columns = ", ".join(column.name for column in index.columns)
+                unique = "UNIQUE " if index.unique else ""
+                suffix = index.name.removeprefix(f"idx_{PARENT}_")
+                await connection.execute(text(
+                    f"CREATE {unique}INDEX {name}_{suffix}_idx ON {name} ({columns})"
+                ))
+
+            # ATTACH takes SHARE UPDATE EXCLUSIVE on sms, so inserts keep flowing, and
+            # adopts the indexes above as partitions of the parent's indexes
+            await connection.execute(text(
+                f"ALTER TABLE {PARENT} ATTACH PARTITION {name} "
+                f"FOR VALUES FROM ('{partition.start.isoformat()}') TO ('{partition.end.isoformat()}')"
+            ))
+
+    async def _archive(self, name: str) -> Path:
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        path = self.archive_dir / f"{name}.csv.gz"
+        partial = self.archive_dir / f"{name}.csv.gz.partial"
+
+        async with self.engine.connect() as connection:
+            raw_connection = await connection.get_raw_connection()
+            with gzip.open(partial, "wb") as archive:
+                await raw_connection.driver_connection.copy_from_table(
+                    name, output=archive, format="csv", header=True
+                )
+            os.replace(partial, path)
+
+            # Only dropped once the archive is complete on disk
+            await connection.execute(text(f"DROP TABLE {name}"))
+            await connection.commit()
+        return path
+
+
+def get_partition_manager() -> PartitionManager:
+    return PartitionManager(
+        engine,
+        interval=settings.SMS_PARTITION_INTERVAL,
+        precreate=settings.SMS_PARTITION_PRECREATE,
+        retention_days=settings.SMS_PARTITION_RETENTION_DAYS,
+        archive_dir=settings.SMS_ARCHIVE_DIR
+    )
@@ -0,0 +1,167 @@
+import logging
+import math
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+from uuid import UUID
+import redis.asyncio as redis
+
+from config.redis import get_redis
+from config.settings import settings
+from core.consts import SMSType
+from app.services.account_cache import AccountSnapshot
+
+logger = logging.getLogger(__name__)
+
+# KEYS: bucket | ARGV: rate per second, burst, wanted tokens, minimum tokens
+# Grants between minimum and wanted tokens, or none; a minimum above the burst is never
+# granted. Time comes from the Redis server so API replicas with skewed clocks share
+# one consistent bucket.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local wanted = tonumber(ARGV[3])
+local minimum = tonumber(ARGV[4])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local last = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - last) * rate / 1000)
+
+local granted = 0
+local retry_after = 0
+if tokens >= minimum then
+    granted = math.min(wanted, math.floor(tokens))
+    tokens = tokens - granted
+else
+    retry_after = math.ceil((minimum - tokens) * 1000 / rate)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst * 1000 / rate) + 1000)
+return {granted, retry_after}
+"""
+
+
+# KEYS: bucket | ARGV: tokens, burst
+# Gives back tokens taken for a request that was then rejected. A missing bucket has
+# refilled to the burst already.
+REFUND_SCRIPT = """
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+if tokens then
+    redis.call('HSET', KEYS[1], 'tokens', tostring(math.min(tonumber(ARGV[2]), tokens + tonumber(ARGV[1]))))
+end
+return 0
+"""
+
+
+def rate_limit_key(account_id: UUID, sms_type: int) -> str:
+    return f"ratelimit:{account_id}:{sms_type}"
+
+
+@dataclass
+class Lease:
+    tokens: int
+    expires_at: float
+
+
+class RateLimiter:
+    """
+    Token bucket per account and sms_type, shared by all API replicas through Redis.
+
+    Each call to Redis takes a small lease of tokens (lease_fraction of the per-second
+    rate) that later requests spend in-process, so an account well under its limit
+    reaches Redis a few times per second at most. Leased tokens are already gone from
+    the shared bucket, so leases never let an account exceed its limit; an expired
+    lease only forfeits its remaining tokens.
+    """
+
+    def __init__(self, redis_client: redis.Redis, lease_fraction: float, lease_ttl: float):
+        self.redis = redis_client
+        self.lease_fraction = lease_fraction
+        self.lease_ttl = lease_ttl
+        self._bucket = redis_client.register_script(TOKEN_BUCKET_SCRIPT)
+        self._refund = redis_client.register_script(REFUND_SCRIPT)
+        self._leases: Dict[tuple[UUID, int], Lease] = {}
+
+    @staticmethod
+    def limit_for(account: AccountSnapshot, sms_type: int) -> int:
+        if sms_type == SMSType.EXPRESS:
+            limit = account.rate_limit_express
+            return settings.RATE_LIMIT_EXPRESS if limit is None else limit
+        limit = account.rate_limit_regular
+        return settings.RATE_LIMIT_REGULAR if limit is None else limit
+
+    @staticmethod
+    def burst_for(rate: int) -> int:
+        # Never below the largest batch, or a full /sms/send-batch could never be admitted
+        return max(1, math.ceil(rate * settings.RATE_LIMIT_BURST_SECONDS), settings.SMS_BATCH_MAX_SIZE)
+
+    async def acquire(self, account: AccountSnapshot, sms_type: int, cost: int = 1) -> Optional[float]:
+        """
+        Take `cost` tokens. Returns None if allowed, else seconds until they are available.
+        A cost above the burst never fits the bucket; callers check it with burst_for().
+        """
+        rate = self.limit_for(account, sms_type)
+        if rate <= 0:
+            return None
+
+        key = (account.id, sms_type)
+        now = time.monotonic()
+        lease = self._leases.get(key)
+        if lease is not None and lease.expires_at > now and lease.tokens >= cost:
+            lease.tokens -= cost
+            return None
+
+        burst = self.burst_for(rate)
+        wanted = max(cost, math.ceil(rate * self.lease_fraction))
+
+        try:
+            granted, retry_after_ms = await self._bucket(
+                keys=[rate_limit_key(account.id, sms_type)],
+                args=[rate, burst, wanted, cost]
+            )
+        except Exception as e:
+            # Fail open: a Redis outage must not stop sending
+            logger.warning(f"Rate limiter unavailable, allowing request: {e}")
+            return None
+
+        if granted < cost:
+            return retry_after_ms / 1000
+
+        leftover = lease.tokens if lease is not None and lease.expires_at > now else 0
+        self._leases[key] = Lease(tokens=leftover + granted - cost, expires_at=now + self.lease_ttl)
+        if len(self._leases) > settings.ACCOUNT_CACHE_MAX_SIZE:
+            self._prune(now)
+        return None
+
+    async def release(self, account: AccountSnapshot, sms_type: int, cost: int) -> None:
+        """Give back `cost` tokens taken by acquire() for a request that was rejected."""
+        rate = self.limit_for(account, sms_type)
+        if rate <= 0 or cost <= 0:
+            return
+
+        try:
+            await self._refund(keys=[rate_limit_key(account.id, sms_type)], args=[cost, self.burst_for(rate)])
+        except Exception as e:
+            logger.warning(f"Failed to return {cost} rate limit tokens to account {account.id}: {e}")
+
+    def _prune(self, now: float) -> None:
+        for key in [key for key, lease in self._leases.items() if lease.expires_at <= now]:
+            del self._leases[key]
+
+
+_rate_limiter: Optional[RateLimiter] = None
+
+
+async def get_rate_limiter() -> RateLimiter:
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter(
+            await get_redis(),
+            lease_fraction=settings.RATE_LIMIT_LEASE_FRACTION,
+            lease_ttl=settings.RATE_LIMIT_LEASE_TTL
+        )
+    return _rate_limiter
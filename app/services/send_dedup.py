@@ -0,0 +1,219 @@
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+from uuid import uuid4
+import redis.asyncio as redis
+
+from config.redis import get_redis
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Values of send:{sms_id}, one state per message:
+#   c|<attempt>|<token>       claimed by the worker holding <token>, expires after claim_ttl
+#   r|<attempt>               failed, retry <attempt> is parked in a delay queue
+#   s|<operator>|<message_id> the operator accepted it, the result is not recorded yet
+#   d                         the result is recorded; nothing left to do
+CLAIMED = "c"
+RETRY = "r"
+SENT = "s"
+RECORDED = "d"
+
+# Returned by claim() for a delivery another worker is processing right now
+BUSY = "busy"
+# Returned by claim() for a delivery of an attempt that has been superseded by a retry
+STALE = "stale"
+
+# Alongside it, send:{sms_id}:operators lists the operators the current attempt has called,
+# written before each call, so a redelivery goes back to them under the same Idempotency-Key
+
+# KEYS: state key, operators key | ARGV: attempt, token, claim ttl ms
+# Returns {state}, {'c', operators called by an earlier claim...} or {state, operator, message_id}
+CLAIM_SCRIPT = """
+local value = redis.call('GET', KEYS[1])
+local attempt = tonumber(ARGV[1])
+local claim = function()
+    redis.call('SET', KEYS[1], 'c|' .. ARGV[1] .. '|' .. ARGV[2], 'PX', ARGV[3])
+    local called = redis.call('LRANGE', KEYS[2], 0, -1)
+    table.insert(called, 1, 'c')
+    return called
+end
+
+if not value then
+    return claim()
+end
+
+local state = string.sub(value, 1, 1)
+if state == 'd' then
+    return {'d'}
+end
+if state == 's' then
+    local operator, message_id = string.match(value, '^s|([^|]*)|(.*)$')
+    return {'s', operator, message_id}
+end
+
+local owner_attempt = tonumber(string.match(value, '^%a|(%d+)'))
+if state == 'r' then
+    if attempt >= owner_attempt then
+        return claim()
+    end
+    return {'stale'}
+end
+if attempt < owner_attempt then
+    return {'stale'}
+end
+return {'busy'}
+"""
+
+# KEYS: state key, operators key | ARGV: new value, ttl ms, claim value
+# Moves to a later state; never back from a recorded message, and to a retry only while
+# the claim is still this worker's. The attempt's operators are no longer needed after it
+ADVANCE_SCRIPT = """
+local value = redis.call('GET', KEYS[1])
+if value == 'd' then
+    return 0
+end
+if string.sub(ARGV[1], 1, 1) == 'r' and value ~= ARGV[3] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+redis.call('DEL', KEYS[2])
+return 1
+"""
+
+# KEYS: state key | ARGV: claim value
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def send_state_key(sms_id: str) -> str:
+    return f"send:{sms_id}"
+
+
+def send_operators_key(sms_id: str) -> str:
+    return f"send:{sms_id}:operators"
+
+
+@dataclass
+class SendClaim:
+    state: str
+    key: str
+    operators_key: str
+    # The claimed value this worker wrote, None if it holds no claim
+    lock: Optional[str] = None
+    operator: Optional[str] = None
+    message_id: Optional[str] = None
+    # Operators an earlier claim on this attempt called before it expired, in call order
+    called: List[str] = field(default_factory=list)
+
+
+class SendDedup:
+    """
+    Per-message send state in Redis, so a redelivered task never reaches an operator
+    twice.
+
+    A worker claims a message before calling an operator, marks it sent as soon as the
+    operator accepts it and recorded once the result is in the status stream or the
+    database. A redelivery after a crash costs one script call: a recorded message is
+    acked, a sent one only has its result recorded again, and one claimed by another
+    worker is parked in a delay queue until that worker finishes or its claim expires.
+    Each operator is noted before it is called. A claim that expires after an operator
+    call whose outcome was never marked hands its operators to the next claim, which
+    calls them first with the same Idempotency-Key: <sms_id>, so the operator that
+    accepted the message answers without delivering it again.
+    """
+
+    def __init__(self, redis_client: redis.Redis, claim_ttl: float, ttl: int):
+        self.redis = redis_client
+        self.claim_ttl_ms = int(claim_ttl * 1000)
+        self.ttl_ms = ttl * 1000
+        self._claim = redis_client.register_script(CLAIM_SCRIPT)
+        self._advance = redis_client.register_script(ADVANCE_SCRIPT)
+        self._release = redis_client.register_script(RELEASE_SCRIPT)
+
+    async def claim(self, sms_id: str, attempt: int) -> SendClaim:
+        key = send_state_key(sms_id)
+        operators_key = send_operators_key(sms_id)
+        token = uuid4().hex
+        try:
+            result = await self._claim(keys=[key, operators_key], args=[attempt, token, self.claim_ttl_ms])
+        except Exception as e:
+            # Fail open: a Redis outage must not stop sending
+            logger.warning(f"Send dedup unavailable, sending {sms_id} without it: {e}")
+            return SendClaim(CLAIMED, key, operators_key)
+
+        state = result[0]
+        if state == CLAIMED:
+            return SendClaim(CLAIMED, key, operators_key, lock=f"{CLAIMED}|{attempt}|{token}", called=result[1:])
+        if state == SENT:
+            return SendClaim(SENT, key, operators_key, operator=result[1] or None, message_id=result[2] or None)
+        return SendClaim(state, key, operators_key)
+
+    async def note_call(self, claim: SendClaim, operator: str) -> None:
+        """Record that the claim's worker is about to call `operator`."""
+        if claim.lock is None:
+            return
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.rpush(claim.operators_key, operator)
+                pipe.pexpire(claim.operators_key, self.ttl_ms)
+                await pipe.execute()
+        except Exception as e:
+            # Only a redelivery after a crash would miss it
+            logger.warning(f"Failed to note operator {operator} for {claim.key}: {e}")
+
+    async def mark_sent(self, claim: SendClaim, operator: Optional[str], message_id: Optional[str]) -> None:
+        await self._move(claim, f"{SENT}|{operator or ''}|{message_id or ''}", self.ttl_ms)
+
+    async def mark_retry(self, claim: SendClaim, attempt: int) -> None:
+        # Outlives the longest delay tier, so the delivery it supersedes stays stale
+        await self._move(claim, f"{RETRY}|{attempt}", self.ttl_ms)
+
+    async def mark_recorded(self, claim: SendClaim) -> None:
+        await self._move(claim, RECORDED, self.ttl_ms)
+
+    async def release(self, claim: SendClaim) -> None:
+        if claim.lock is None:
+            return
+        try:
+            await self._release(keys=[claim.key], args=[claim.lock])
+        except Exception as e:
+            # The claim expires on its own after claim_ttl
+            logger.warning(f"Failed to release send claim {claim.key}: {e}")
+
+    async def states(self, sms_ids: List[str]) -> Dict[str, Optional[str]]:
+        """Current state (CLAIMED, RETRY, SENT or RECORDED) of each message, None if it has none."""
+        if not sms_ids:
+            return {}
+        values = await self.redis.mget([send_state_key(sms_id) for sms_id in sms_ids])
+        return {sms_id: value[0] if value else None for sms_id, value in zip(sms_ids, values)}
+
+    async def forget(self, sms_ids: Iterable[str]) -> None:
+        """Drop the state of messages that are deliberately sent again, e.g. replayed dead letters."""
+        keys = [key for sms_id in sms_ids for key in (send_state_key(sms_id), send_operators_key(sms_id))]
+        if keys:
+            await self.redis.delete(*keys)
+
+    async def _move(self, claim: SendClaim, value: str, ttl_ms: int) -> None:
+        try:
+            await self._advance(keys=[claim.key, claim.operators_key], args=[value, ttl_ms, claim.lock or ""])
+        except Exception as e:
+            logger.warning(f"Failed to update send state {claim.key}: {e}")
+
+
+_send_dedup: Optional[SendDedup] = None
+
+
+async def get_send_dedup() -> SendDedup:
+    global _send_dedup
+    if _send_dedup is None:
+        _send_dedup = SendDedup(
+            await get_redis(),
+            claim_ttl=settings.SMS_DEDUP_CLAIM_TTL,
+            ttl=settings.SMS_DEDUP_TTL
+        )
+    return _send_dedup
@@ -1,24 +1,126 @@
+import asyncio
+import base64
+import json
+import logging
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
 from uuid import UUID
-from workers.celery_app import celery_app
+from sqlalchemy.ext.asyncio import AsyncSession
+from config.rabbitmq import publish_task
+from config.settings import settings
 from core.consts import SMSType, QueueName
+from core.models import SMS
+from app.repositories.outbox_repository import OutboxRepository
+from app.repositories.stats_repository import StatsRepository
+from app.services.fair_scheduler import get_fair_queue
+
+logger = logging.getLogger(__name__)
+
+PROCESS_SMS_TASK = "workers.tasks.sms_tasks.process_sms"
 
 
 class SMSService:
     @staticmethod
-    def publish_to_queue(
-        sms_id: UUID,
-        phone_number: str,
-        message: str,
-        sms_type: int
+    def queue_for(sms_type: int) -> str:
+        return QueueName.EXPRESS if sms_type == SMSType.EXPRESS else QueueName.REGULAR
+
+    @staticmethod
+    def task_kwargs(sms: SMS) -> Dict[str, Any]:
+        return {
+            "sms_id": str(sms.id),
+            "account_id": str(sms.account_id),
+            "phone_number": sms.phone_number,
+            "message": sms.message,
+            "created_at": sms.created_at.isoformat(),
+            "sms_type": sms.sms_type
+        }
+
+    @staticmethod
+    async def enqueue(
+        db: AsyncSession,
+        sms_list: list[SMS],
+        on_commit: Optional[Callable[[], Awaitable[None]]] = None
     ) -> None:
-        queue = QueueName.EXPRESS if sms_type == SMSType.EXPRESS else QueueName.REGULAR
-
-        celery_app.send_task(
-            "workers.tasks.sms_tasks.process_sms",
-            kwargs={
-                "sms_id": str(sms_id),
-                "phone_number": phone_number,
-                "message": message
-            },
-            queue=queue
-        )
+        """
+        Commit the caller's transaction and hand the messages to the workers.
+
+        With the outbox enabled the tasks are written in that same transaction, so the
+        balance deduction, the SMS rows and the tasks commit or roll back together and
+        the relay publishes them afterwards. The stats rollup is counted in it as well.
+        `on_commit` runs right after the commit, before anything that can still fail
+        without undoing it.
+        """
+        entries = [
+            (SMSService.queue_for(sms.sms_type), SMSService.task_kwargs(sms))
+            for sms in sms_list
+        ]
+        await StatsRepository(db).record_created(sms_list)
+
+        if settings.SMS_OUTBOX_ENABLED:
+            await OutboxRepository(db).add(entries)
+            await db.commit()
+            if on_commit:
+                await on_commit()
+            return
+
+        await db.commit()
+        if on_commit:
+            await on_commit()
+        await SMSService.publish_messages(entries)
+
+    @staticmethod
+    async def publish_messages(entries: list[tuple[str, Dict[str, Any]]], durable: bool = False) -> None:
+        """
+        Hand tasks to the workers. With fair scheduling, regular tasks go to their
+        account's backlog and reach RabbitMQ through workers.fair_dispatcher; express
+        tasks and tasks queued before account_id was in the payload are published directly.
+
+        `durable` callers delete their own copy afterwards, like the outbox relay: backlog
+        pushes then wait for Redis to fsync them (FAIR_QUEUE_FSYNC), as durable as the
+        broker's publisher confirms.
+        """
+        if settings.FAIR_SCHEDULING_ENABLED:
+            fair = [kwargs for queue, kwargs in entries if queue == QueueName.REGULAR and "account_id" in kwargs]
+            if fair:
+                fsync_timeout_ms = settings.FAIR_QUEUE_FSYNC_TIMEOUT_MS if durable and settings.FAIR_QUEUE_FSYNC else None
+                try:
+                    await (await get_fair_queue()).push(fair, fsync_timeout_ms)
+                    entries = [
+                        (queue, kwargs) for queue, kwargs in entries
+                        if queue != QueueName.REGULAR or "account_id" not in kwargs
+                    ]
+                except Exception as e:
+                    # Unfair beats undelivered; tasks that did reach the backlog are sent twice
+                    # and the workers' send state drops the second copy
+                    logger.warning(f"Fair queue unavailable, publishing regular tasks directly: {e}")
+
+        await SMSService.publish_to_queues(entries)
+
+    @staticmethod
+    async def publish_to_queues(entries: list[tuple[str, Dict[str, Any]]]) -> None:
+        # Published concurrently so the whole batch shares the channel confirm flushes;
+        # returns once the broker has confirmed every message
+        await asyncio.gather(*(
+            publish_task(PROCESS_SMS_TASK, kwargs=kwargs, queue=queue)
+            for queue, kwargs in entries
+        ))
+
+    @staticmethod
+    def encode_cursor(sms: SMS) -> str:
+        # Opaque to clients; only the keyset of the last row on the page
+        raw = json.dumps([sms.created_at.isoformat(), str(sms.id)], separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+        """Raises ValueError for cursors that were not produced by encode_cursor."""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            created_at, sms_id = json.loads(raw)
+            created_at = datetime.fromisoformat(created_at)
+            if created_at.tzinfo is not None:
+                # created_at is naive UTC; an aware bound would fail in the query, not here
+                raise ValueError("cursor timestamp has a timezone")
+            return created_at, UUID(sms_id)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
@@ -0,0 +1,139 @@
+import json
+import logging
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Iterable
+from uuid import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.redis import get_redis
+from config.settings import settings
+from app.repositories.stats_repository import StatsRepository, hour_bucket
+
+logger = logging.getLogger(__name__)
+
+ONE_HOUR = timedelta(hours=1)
+
+
+def to_utc(value: datetime) -> datetime:
+    # The rollup stores naive UTC like the sms table
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def stats_cache_key(account_id: UUID, bucket: datetime) -> str:
+    return f"sms:stats:{account_id}:{bucket:%Y%m%d%H}"
+
+
+def settle_horizon() -> datetime:
+    """Hour buckets before this one are served from the cache."""
+    return hour_bucket(datetime.utcnow() - timedelta(seconds=settings.SMS_STATS_SETTLE_SECONDS))
+
+
+class SMSStatsService:
+    """
+    Delivery statistics served from the sms_stats_hourly rollup.
+
+    Hour buckets that ended more than SMS_STATS_SETTLE_SECONDS ago rarely change, so
+    they are cached in Redis and read with one MGET; only the unsettled tail is read
+    from the rollup on every request. Cost is O(buckets), never O(messages).
+
+    Late transitions (a backlog, stream lag, retries, replays) still land in settled
+    buckets; whoever records them calls invalidate() after committing, and
+    SMS_STATS_CACHE_TTL bounds how long a missed invalidation stays visible.
+    """
+
+    @staticmethod
+    async def get_stats(
+        db: AsyncSession,
+        account_id: UUID,
+        start: datetime,
+        end: datetime,
+        granularity: str
+    ) -> list[tuple[datetime, int, int, int]]:
+        """(bucket, sms_type, status, count) for the hour-aligned range around [start, end)."""
+        start, end = to_utc(start), to_utc(end)
+        first = hour_bucket(start)
+        last = hour_bucket(end) if end == hour_bucket(end) else hour_bucket(end) + ONE_HOUR
+        settled = min(last, settle_horizon())
+
+        repo = StatsRepository(db)
+        rows = []
+        if first < settled:
+            rows.extend(await SMSStatsService._settled_rows(repo, account_id, first, settled))
+        rows.extend(await repo.list_buckets(account_id, max(first, settled), last))
+
+        if granularity == "day":
+            days = Counter()
+            for bucket, sms_type, status, count in rows:
+                days[(bucket.replace(hour=0), sms_type, status)] += count
+            return [(bucket, sms_type, status, count) for (bucket, sms_type, status), count in sorted(days.items())]
+
+        return sorted(rows)
+
+    @staticmethod
+    async def _settled_rows(
+        repo: StatsRepository,
+        account_id: UUID,
+        first: datetime,
+        settled: datetime
+    ) -> list[tuple[datetime, int, int, int]]:
+        hours = []
+        bucket = first
+        while bucket < settled:
+            hours.append(bucket)
+            bucket += ONE_HOUR
+
+        try:
+            redis_client = await get_redis()
+            cached = await redis_client.mget([stats_cache_key(account_id, hour) for hour in hours])
+        except Exception as e:
+            logger.warning(f"Stats cache unavailable, reading rollup: {e}")
+            return await repo.list_buckets(account_id, first, settled)
+
+        rows = []
+        missing = []
+        for hour, value in zip(hours, cached):
+            if value is None:
+                missing.append(hour)
+            else:
+                rows.extend((hour, sms_type, status, count) for sms_type, status, count in json.loads(value))
+
+        if not missing:
+            return rows
+
+        fetched = await repo.list_buckets(account_id, missing[0], missing[-1] + ONE_HOUR)
+        by_hour = {hour: [] for hour in missing}
+        for bucket, sms_type, status, count in fetched:
+            if bucket in by_hour:
+                by_hour[bucket].append([sms_type, status, count])
+
+        try:
+            # Empty hours are cached too, so idle periods never go back to the rollup
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for hour, counts in by_hour.items():
+                    pipe.set(stats_cache_key(account_id, hour), json.dumps(counts), ex=settings.SMS_STATS_CACHE_TTL)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to cache settled stats buckets: {e}")
+
+        for hour, counts in by_hour.items():
+            rows.extend((hour, sms_type, status, count) for sms_type, status, count in counts)
+        return rows
+
+    @staticmethod
+    async def invalidate(buckets: Iterable[tuple[UUID, datetime]]) -> None:
+        """Drop cached (account_id, hour bucket) entries whose counts changed after settling."""
+        horizon = settle_horizon()
+        keys = [
+            stats_cache_key(account_id, bucket)
+            for account_id, bucket in set(buckets) if bucket < horizon
+        ]
+        if not keys:
+            return
+        try:
+            redis_client = await get_redis()
+            await redis_client.delete(*keys)
+        except Exception as e:
+            logger.warning(f"Failed to invalidate stats cache, counts may be stale until TTL: {e}")
@@ -1,5 +1,6 @@
-from kombu import Queue
+from kombu import Exchange, Queue
 from config.settings import settings
+from config.rabbitmq import TASK_QUEUES
 
 broker_url = settings.CELERY_BROKER_URL
 result_backend = None
@@ -16,12 +17,25 @@ result_expires = 0
 task_routes = {
     'workers.tasks.sms_tasks.send_sms_express': {'queue': 'express'},
     'workers.tasks.sms_tasks.send_sms_regular': {'queue': 'regular'},
+    # Periodic jobs stay off the SMS queues so a native consumer only ever sees process_sms
+    'workers.tasks.balance_tasks.*': {'queue': 'maintenance'},
+    'workers.tasks.partition_tasks.*': {'queue': 'maintenance'},
+    # store_failed_task is published to dlq explicitly and drained in batches
+    'workers.tasks.dlq_tasks.flush_dead_letters': {'queue': 'maintenance'},
 }
 
-task_queues = (
-    Queue('express'),
-    Queue('regular'),
-    Queue('dlq'),  # Dead Letter Queue for failed tasks
+# Shared with config.rabbitmq.setup_rabbitmq_queues so both sides declare identical
+# queues (express, regular, maintenance and the dlq for failed tasks). Each queue gets
+# its own exchange and routing key; without them Celery binds every queue to the
+# default "regular" exchange and key, and a message reaches all of them
+task_queues = tuple(
+    Queue(
+        name,
+        Exchange(name, type='direct'),
+        routing_key=name,
+        queue_arguments=arguments or None
+    )
+    for name, arguments in TASK_QUEUES.items()
 )
 
 task_default_queue = 'regular'
@@ -35,9 +49,22 @@ task_reject_on_worker_lost = True
 
 broker_connection_retry_on_startup = True
 
+# SMS status updates are applied continuously by workers.status_updater
 beat_schedule = {
-    'batch-update-sms-status': {
-        'task': 'workers.tasks.sms_tasks.messages_satus_batch_update',
-        'schedule': 2.0,  # Run every 2 seconds
+    'flush-balance-deltas': {
+        'task': 'workers.tasks.balance_tasks.flush_balance_deltas',
+        'schedule': settings.BALANCE_FLUSH_INTERVAL,
+    },
+    'reconcile-balances': {
+        'task': 'workers.tasks.balance_tasks.reconcile_balances',
+        'schedule': settings.BALANCE_RECONCILE_INTERVAL,
+    },
+    'maintain-sms-partitions': {
+        'task': 'workers.tasks.partition_tasks.maintain_sms_partitions',
+        'schedule': settings.PARTITION_MAINTENANCE_INTERVAL,
+    },
+    'flush-dead-letters': {
+        'task': 'workers.tasks.dlq_tasks.flush_dead_letters',
+        'schedule': settings.DEAD_LETTER_FLUSH_INTERVAL,
     },
 }
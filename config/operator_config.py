@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel
 
 
@@ -7,10 +7,32 @@ class OperatorConfig(BaseModel):
     url: str
     priority: int
     timeout: int = 5
+    http2: bool = False
+    max_connections: int = 500
+    max_keepalive_connections: int = 200
+    keepalive_expiry: float = 30.0
+    # Multi-recipient submit endpoint; None if the operator only takes one SMS per call
+    batch_url: Optional[str] = None
+    max_batch_size: int = 100
 
 
 OPERATORS: List[OperatorConfig] = [
-    OperatorConfig(name="operator_1", url="http://mock_operator_1:9000/send", priority=1),
-    OperatorConfig(name="operator_2", url="http://mock_operator_2:9001/send", priority=2),
-    OperatorConfig(name="operator_3", url="http://mock_operator_3:9002/send", priority=3),
+    OperatorConfig(
+        name="operator_1",
+        url="http://mock_operator_1:9000/send",
+        batch_url="http://mock_operator_1:9000/send-batch",
+        priority=1
+    ),
+    OperatorConfig(
+        name="operator_2",
+        url="http://mock_operator_2:9001/send",
+        batch_url="http://mock_operator_2:9001/send-batch",
+        priority=2
+    ),
+    OperatorConfig(
+        name="operator_3",
+        url="http://mock_operator_3:9002/send",
+        batch_url="http://mock_operator_3:9002/send-batch",
+        priority=3
+    ),
 ]
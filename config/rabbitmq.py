@@ -1,9 +1,47 @@
+import asyncio
+import json
+import socket
 import aio_pika
-from typing import Optional
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
 
 from config.settings import settings
+from core.consts import QueueName
 
 _rabbitmq_connection: Optional[aio_pika.abc.AbstractRobustConnection] = None
+_publish_channels: List[aio_pika.abc.AbstractChannel] = []
+_publish_channels_lock: Optional[asyncio.Lock] = None
+_next_publish_channel = 0
+_status_channel: Optional[aio_pika.abc.AbstractChannel] = None
+
+
+def retry_queue_name(queue: str, delay: int) -> str:
+    return f"{queue}.retry.{delay}s"
+
+
+def retry_queues() -> Dict[str, Dict[str, Any]]:
+    # Nobody consumes these: a message sits out its tier's TTL and is then dead-lettered
+    # back to the queue it came from
+    return {
+        retry_queue_name(queue, delay): {
+            "x-message-ttl": delay * 1000,
+            "x-dead-letter-exchange": queue,
+            "x-dead-letter-routing-key": queue,
+        }
+        for queue in (QueueName.EXPRESS, QueueName.REGULAR)
+        for delay in settings.SMS_RETRY_DELAYS
+    }
+
+
+# Same declarations as config.celery.task_queues: a durable direct exchange per queue,
+# bound with the queue name as routing key
+TASK_QUEUES: Dict[str, Dict[str, Any]] = {
+    QueueName.EXPRESS: {},
+    QueueName.REGULAR: {},
+    QueueName.MAINTENANCE: {},
+    QueueName.DLQ: {},
+    **retry_queues(),
+}
 
 
 async def get_rabbitmq_connection() -> aio_pika.abc.AbstractRobustConnection:
@@ -13,12 +51,107 @@ async def get_rabbitmq_connection() -> aio_pika.abc.AbstractRobustConnection:
     return _rabbitmq_connection
 
 
+async def get_publish_channel() -> aio_pika.abc.AbstractChannel:
+    # Channels are shared rather than checked out: concurrent publishes pipeline on the
+    # same channel and the broker confirms them together with multiple=True acks
+    global _publish_channels_lock, _next_publish_channel
+    if _publish_channels_lock is None:
+        _publish_channels_lock = asyncio.Lock()
+
+    if len(_publish_channels) < settings.RABBITMQ_PUBLISH_CHANNELS:
+        async with _publish_channels_lock:
+            if len(_publish_channels) < settings.RABBITMQ_PUBLISH_CHANNELS:
+                connection = await get_rabbitmq_connection()
+                channel = await connection.channel(publisher_confirms=True)
+                _publish_channels.append(channel)
+                return channel
+
+    _next_publish_channel = (_next_publish_channel + 1) % len(_publish_channels)
+    return _publish_channels[_next_publish_channel]
+
+
+def build_task_message(task_name: str, kwargs: Dict[str, Any]) -> aio_pika.Message:
+    # Celery task protocol v2, as produced by celery_app.send_task
+    task_id = str(uuid4())
+    return aio_pika.Message(
+        body=json.dumps([
+            [],
+            kwargs,
+            {"callbacks": None, "errbacks": None, "chain": None, "chord": None}
+        ]).encode("utf-8"),
+        headers={
+            "lang": "py",
+            "task": task_name,
+            "id": task_id,
+            "shadow": None,
+            "eta": None,
+            "expires": None,
+            "group": None,
+            "group_index": None,
+            "retries": 0,
+            "timelimit": [None, None],
+            "root_id": task_id,
+            "parent_id": None,
+            "argsrepr": "()",
+            "kwargsrepr": repr(kwargs),
+            "origin": f"{socket.gethostname()}",
+            "ignore_result": False,
+        },
+        content_type="application/json",
+        content_encoding="utf-8",
+        delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+        correlation_id=task_id,
+        reply_to="",
+    )
+
+
+def parse_task_kwargs(message: aio_pika.abc.AbstractIncomingMessage) -> Dict[str, Any]:
+    # Celery protocol v2 body is [args, kwargs, embed]; v1 is a dict with "kwargs"
+    body = json.loads(message.body)
+    if isinstance(body, list):
+        return body[1]
+    return body.get("kwargs", {})
+
+
+async def publish_task(task_name: str, kwargs: Dict[str, Any], queue: str) -> None:
+    channel = await get_publish_channel()
+    exchange = await channel.get_exchange(queue, ensure=False)
+    await exchange.publish(build_task_message(task_name, kwargs), routing_key=queue)
+
+
+async def get_queue_depth(queue: str) -> int:
+    # Messages ready for delivery; unacked in-flight messages are not counted
+    global _status_channel
+    if _status_channel is None or _status_channel.is_closed:
+        connection = await get_rabbitmq_connection()
+        _status_channel = await connection.channel()
+
+    declared = await _status_channel.declare_queue(queue, passive=True)
+    return declared.declaration_result.message_count
+
+
 async def close_rabbitmq() -> None:
-    global _rabbitmq_connection
+    global _rabbitmq_connection, _status_channel
+    _publish_channels.clear()
+    _status_channel = None
     if _rabbitmq_connection and not _rabbitmq_connection.is_closed:
         await _rabbitmq_connection.close()
         _rabbitmq_connection = None
 
 
 async def setup_rabbitmq_queues() -> None:
-    pass
+    connection = await get_rabbitmq_connection()
+    channel = await connection.channel()
+    try:
+        for name, arguments in TASK_QUEUES.items():
+            exchange = await channel.declare_exchange(name, aio_pika.ExchangeType.DIRECT, durable=True)
+            queue = await channel.declare_queue(name, durable=True, arguments=arguments or None)
+            await queue.bind(exchange, routing_key=name)
+
+        # Older deployments bound every queue to the "regular" exchange and key
+        for name in TASK_QUEUES:
+            if name != QueueName.REGULAR:
+                queue = await channel.get_queue(name, ensure=False)
+                await queue.unbind(QueueName.REGULAR, routing_key=QueueName.REGULAR)
+    finally:
+        await channel.close()
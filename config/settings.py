@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -27,6 +28,7 @@ class Settings(BaseSettings):
     RABBITMQ_USER: str = "guest"
     RABBITMQ_PASSWORD: str = "guest"
     RABBITMQ_URL: str = ""
+    RABBITMQ_PUBLISH_CHANNELS: int = 4
 
     CELERY_BROKER_URL: str = ""
     CELERY_RESULT_BACKEND: str = ""
@@ -36,6 +38,124 @@ class Settings(BaseSettings):
 
     LOG_LEVEL: str = "INFO"
 
+    SMS_BATCH_MAX_SIZE: int = 1000
+    SMS_EXPORT_CHUNK_ROWS: int = 5000
+
+    # Default SMS per second per account and type; overridden by accounts.rate_limit_*
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_REGULAR: int = 200
+    RATE_LIMIT_EXPRESS: int = 50
+    RATE_LIMIT_BURST_SECONDS: float = 2.0
+    # Tokens taken from Redis per call, as a fraction of the per-second rate, and spent locally
+    RATE_LIMIT_LEASE_FRACTION: float = 0.05
+    RATE_LIMIT_LEASE_TTL: float = 1.0
+
+    # Idempotency-Key on /sms/send: responses are kept for IDEMPOTENCY_TTL seconds; a
+    # duplicate of an in-flight request waits up to IDEMPOTENCY_WAIT for its response
+    IDEMPOTENCY_ENABLED: bool = True
+    IDEMPOTENCY_TTL: int = 86400
+    IDEMPOTENCY_LOCK_TTL: float = 10.0
+    IDEMPOTENCY_WAIT: float = 2.0
+    IDEMPOTENCY_POLL_INTERVAL: float = 0.02
+
+    SMS_STATS_SHARDS: int = 8
+    # Hour buckets this long past their end are cached; late transitions invalidate them,
+    # the TTL bounds staleness if an invalidation is lost (None caches them forever)
+    SMS_STATS_SETTLE_SECONDS: int = 7200
+    SMS_STATS_CACHE_TTL: Optional[int] = 3600
+    SMS_STATS_MAX_RANGE_DAYS: int = 93
+
+    ACCOUNT_CACHE_MAX_SIZE: int = 100_000
+    ACCOUNT_CACHE_TTL: int = 60
+    ACCOUNT_CACHE_CHANNEL: str = "account:changes"
+
+    # "postgres" deducts on the accounts row, "redis" uses the Redis-resident ledger,
+    # "quota" spends per-process credit blocks reserved from the accounts row
+    BALANCE_ENGINE: str = "postgres"
+    BALANCE_FLUSH_INTERVAL: float = 1.0
+    BALANCE_RECONCILE_INTERVAL: float = 300.0
+
+    QUOTA_BLOCK_SIZE: int = 500
+    QUOTA_REFILL_WATERMARK: int = 100
+    QUOTA_IDLE_TIMEOUT: float = 30.0
+    QUOTA_SWEEP_INTERVAL: float = 5.0
+    QUOTA_STALE_AFTER: float = 60.0
+
+    CONSUMER_EXPRESS_CONCURRENCY: int = 200
+    CONSUMER_REGULAR_CONCURRENCY: int = 500
+
+    # Adaptive operator routing (per worker process); False walks OPERATORS by priority
+    OPERATOR_ROUTING_ADAPTIVE: bool = True
+    OPERATOR_STATS_WINDOW: int = 200
+    OPERATOR_STATS_MAX_AGE: float = 30.0
+    OPERATOR_MIN_SAMPLES: int = 20
+    # Traffic share goes as score ** exponent; higher concentrates on the best operator
+    OPERATOR_ROUTING_EXPONENT: float = 2.0
+    OPERATOR_BREAKER_WINDOW: int = 20
+    OPERATOR_BREAKER_FAILURE_RATE: float = 0.5
+    OPERATOR_BREAKER_COOLDOWN: float = 10.0
+    # Express sends go to a second operator when the first is slower than this
+    # percentile of its recent latency (DEFAULT_DELAY until it has enough samples)
+    OPERATOR_HEDGING_ENABLED: bool = True
+    OPERATOR_HEDGE_PERCENTILE: float = 0.95
+    OPERATOR_HEDGE_MIN_DELAY: float = 0.05
+    OPERATOR_HEDGE_DEFAULT_DELAY: float = 0.3
+    OPERATOR_METRICS_INTERVAL: float = 60.0
+
+    # Regular messages in the native consumer are sent in batch calls to operators with a
+    # batch_url: a batch goes out at max_batch_size messages or OPERATOR_BATCH_MAX_WAIT seconds
+    OPERATOR_BATCHING_ENABLED: bool = True
+    OPERATOR_BATCH_MAX_WAIT: float = 0.05
+
+    # Delay before each retry of a message every operator failed; the message waits in a
+    # TTL queue per tier instead of in a sleeping worker. Changing a delay adds a queue.
+    SMS_RETRY_DELAYS: list[int] = [5, 30, 120]
+
+    # Per-message send state that stops redelivered tasks from reaching an operator twice.
+    # A claim must outlive a send through every operator.
+    SMS_DEDUP_ENABLED: bool = True
+    SMS_DEDUP_CLAIM_TTL: float = 30.0
+    SMS_DEDUP_TTL: int = 86400
+
+    # The dlq queue is drained into dead_letters in batches of this size
+    DEAD_LETTER_BATCH_SIZE: int = 1000
+    DEAD_LETTER_FLUSH_INTERVAL: float = 5.0
+    DEAD_LETTER_REPLAY_BATCH: int = 500
+    # X-Admin-Key for /admin endpoints; unset disables them
+    ADMIN_API_KEY: Optional[str] = None
+
+    STATUS_STREAM: str = "sms:results"
+    STATUS_CONSUMER_GROUP: str = "status-updaters"
+    STATUS_BATCH_SIZE: int = 10000
+    STATUS_BLOCK_MS: int = 1000
+    STATUS_CLAIM_IDLE_MS: int = 60000
+    STATUS_COPY_THRESHOLD: int = 5000
+
+    SMS_OUTBOX_ENABLED: bool = True
+    OUTBOX_BATCH_SIZE: int = 1000
+    OUTBOX_RELAY_CONCURRENCY: int = 4
+    OUTBOX_POLL_INTERVAL: float = 0.1
+    OUTBOX_METRICS_INTERVAL: float = 10.0
+
+    # Regular tasks wait in per-account Redis backlogs and are fed to the regular queue
+    # by workers.fair_dispatcher with deficit round-robin; express is never held back
+    FAIR_SCHEDULING_ENABLED: bool = True
+    FAIR_QUANTUM: int = 50
+    FAIR_TARGET_DEPTH: int = 1000
+    FAIR_EXPRESS_BACKLOG: int = 100
+    FAIR_POLL_INTERVAL: float = 0.05
+    FAIR_WEIGHT_REFRESH_INTERVAL: float = 30.0
+    # Outbox rows are deleted once their backlog push is in Redis's AOF; needs appendonly yes
+    FAIR_QUEUE_FSYNC: bool = True
+    FAIR_QUEUE_FSYNC_TIMEOUT_MS: int = 2000
+
+    # "month" or "day"; existing partitions of either size are left in place
+    SMS_PARTITION_INTERVAL: str = "month"
+    SMS_PARTITION_PRECREATE: int = 3
+    SMS_PARTITION_RETENTION_DAYS: int = 365
+    SMS_ARCHIVE_DIR: str = "/var/lib/sms_gateway/archive"
+    PARTITION_MAINTENANCE_INTERVAL: float = 3600.0
+
     @property
     def database_url_sync(self) -> str:
         return self.DATABASE_URL.replace("+asyncpg", "")
@@ -12,3 +12,11 @@ class SMSType:
 class QueueName:
     EXPRESS = "express"
     REGULAR = "regular"
+    MAINTENANCE = "maintenance"
+    DLQ = "dlq"
+
+
+class BalanceEngine:
+    POSTGRES = "postgres"
+    REDIS = "redis"
+    QUOTA = "quota"
@@ -0,0 +1,59 @@
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+from uuid import UUID
+
+EPOCH = datetime(1970, 1, 1)
+ONE_MS = timedelta(milliseconds=1)
+
+RANDOM_BITS = 74
+# Largest step between two ids of the same millisecond; keeps them hard to guess
+MAX_INCREMENT = 1 << 16
+
+_lock = threading.Lock()
+_last_ms = -1
+_last_random = 0
+
+
+def uuid7(timestamp: Optional[datetime] = None) -> UUID:
+    """
+    Time-ordered UUID (RFC 9562 version 7) carrying `timestamp` (naive UTC) in its
+    first 48 bits as Unix milliseconds; the remaining 74 bits are random. Ids made in
+    the same millisecond as the previous one continue from its random bits by a random
+    increment (RFC 9562 method 2), so they still sort in creation order.
+    """
+    global _last_ms, _last_random
+    unix_ms = (((timestamp or datetime.utcnow()) - EPOCH) // ONE_MS) & 0xFFFF_FFFF_FFFF
+
+    with _lock:
+        random_bits = _last_random + 1 + int.from_bytes(os.urandom(2), "big") % MAX_INCREMENT
+        if unix_ms != _last_ms or random_bits >> RANDOM_BITS:
+            random_bits = int.from_bytes(os.urandom(10), "big") & ((1 << RANDOM_BITS) - 1)
+        _last_ms, _last_random = unix_ms, random_bits
+
+    # 48-bit timestamp, version 7, 12 random bits, RFC variant (0b10), 62 random bits
+    value = unix_ms << 80
+    value |= 0x7 << 76
+    value |= (random_bits >> 62) << 64
+    value |= 0x2 << 62
+    value |= random_bits & ((1 << 62) - 1)
+    return UUID(int=value)
+
+
+def uuid7_timestamp(value: UUID) -> Optional[datetime]:
+    # Legacy uuid4 ids carry no time, the caller has to fall back to an id-only lookup
+    if value.version != 7:
+        return None
+    return EPOCH + timedelta(milliseconds=value.int >> 80)
+
+
+def created_at_range(value: UUID) -> Optional[tuple[datetime, datetime]]:
+    """
+    Half-open [start, end) created_at window of a row whose id was generated from its
+    created_at, or None for ids that are not UUIDv7.
+    """
+    start = uuid7_timestamp(value)
+    if start is None:
+        return None
+    return start, start + ONE_MS
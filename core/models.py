@@ -1,12 +1,23 @@
 from datetime import datetime
 from uuid import uuid4
-from sqlalchemy import String, Integer, DateTime, Index, ForeignKey, SmallInteger
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import String, Integer, BigInteger, DateTime, Index, ForeignKey, SmallInteger, Text
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from typing import Optional
 
 from config.database import Base
 from core.consts import SMSStatus, SMSType
+from core.ids import uuid7, uuid7_timestamp
+
+
+def new_sms_id():
+    return uuid7()
+
+
+def sms_created_at(context) -> datetime:
+    # Keeps created_at inside the window encoded in the row's UUIDv7 id
+    new_id = context.get_current_parameters().get("id")
+    return (new_id and uuid7_timestamp(new_id)) or datetime.utcnow()
 
 
 class Account(Base):
@@ -16,8 +27,14 @@ class Account(Base):
     api_key: Mapped[str] = mapped_column(String(100), unique=True, nullable=False)
     balance: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    # SMS per second; NULL uses the RATE_LIMIT_* defaults, 0 disables the limit
+    rate_limit_regular: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    rate_limit_express: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    # Share of regular-queue capacity relative to other accounts with a backlog
+    scheduling_weight: Mapped[int] = mapped_column(Integer, default=1, server_default="1", nullable=False)
 
     sms_records = relationship("SMS", back_populates="account", lazy="select")
+    balance_reservations = relationship("BalanceReservation", back_populates="account", lazy="select")
 
     __table_args__ = (
         Index("idx_accounts_api_key", "api_key"),
@@ -27,14 +44,16 @@ class Account(Base):
 class SMS(Base):
     __tablename__ = "sms"
 
-    id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), default=uuid4)
+    id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), default=new_sms_id)
     account_id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("accounts.id"), nullable=False)
     phone_number: Mapped[str] = mapped_column(String(20), nullable=False)
     message: Mapped[str] = mapped_column(String(70), nullable=False)
     sms_type: Mapped[int] = mapped_column(SmallInteger, default=SMSType.REGULAR, nullable=False)
     status: Mapped[int] = mapped_column(SmallInteger, default=SMSStatus.PENDING, nullable=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=sms_created_at, nullable=False)
     sent_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    operator: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
+    operator_message_id: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
 
     account = relationship("Account", back_populates="sms_records", lazy="select")
 
@@ -51,3 +70,69 @@ class SMS(Base):
     __mapper_args__ = {
         "primary_key": [id, created_at]
     }
+
+
+class BalanceReservation(Base):
+    __tablename__ = "balance_reservations"
+
+    id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid4)
+    account_id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("accounts.id"), nullable=False)
+    owner: Mapped[str] = mapped_column(String(100), nullable=False)
+    credits: Mapped[int] = mapped_column(Integer, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+    account = relationship("Account", back_populates="balance_reservations", lazy="select")
+
+    __table_args__ = (
+        Index("idx_balance_reservations_account", "account_id"),
+        Index("idx_balance_reservations_owner", "owner"),
+        Index("idx_balance_reservations_updated", "updated_at"),
+    )
+
+
+class SMSOutbox(Base):
+    __tablename__ = "sms_outbox"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    sms_id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+    queue: Mapped[str] = mapped_column(String(20), nullable=False)
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class DeadLetter(Base):
+    """A task that failed for good; replayable by sms_id from payload (the task kwargs)."""
+    __tablename__ = "dead_letters"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    # Broker task id, so redelivered DLQ messages are stored once
+    task_id: Mapped[str] = mapped_column(String(64), unique=True, nullable=False)
+    task_name: Mapped[str] = mapped_column(String(100), nullable=False)
+    sms_id: Mapped[Optional[UUID]] = mapped_column(UUID(as_uuid=True), nullable=True)
+    account_id: Mapped[Optional[UUID]] = mapped_column(UUID(as_uuid=True), nullable=True)
+    operator: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
+    error_class: Mapped[str] = mapped_column(String(100), nullable=False)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    failed_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    replayed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("idx_dead_letters_failed", "failed_at"),
+        Index("idx_dead_letters_account_failed", "account_id", "failed_at"),
+        Index("idx_dead_letters_operator_failed", "operator", "failed_at"),
+        Index("idx_dead_letters_error_class_failed", "error_class", "failed_at"),
+        Index("idx_dead_letters_sms", "sms_id"),
+    )
+
+
+class SMSStatsHourly(Base):
+    __tablename__ = "sms_stats_hourly"
+
+    account_id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("accounts.id"), primary_key=True)
+    bucket: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    sms_type: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    status: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    # Spreads the send path's increments for a hot account over several rows
+    shard: Mapped[int] = mapped_column(SmallInteger, primary_key=True, default=0)
+    count: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
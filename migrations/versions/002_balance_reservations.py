@@ -0,0 +1,38 @@
+"""balance reservations for per-process quota blocks
+
+Revision ID: 19e914d50b07
+Revises: b15c4b8243d8
+Create Date: 2026-10-18 09:12:05.114203
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '19e914d50b07'
+down_revision: Union[str, None] = 'b15c4b8243d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('balance_reservations',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('account_id', sa.UUID(), nullable=False),
+    sa.Column('owner', sa.String(length=100), nullable=False),
+    sa.Column('credits', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['account_id'], ['accounts.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_balance_reservations_account', 'balance_reservations', ['account_id'], unique=False)
+    op.create_index('idx_balance_reservations_owner', 'balance_reservations', ['owner'], unique=False)
+    op.create_index('idx_balance_reservations_updated', 'balance_reservations', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_balance_reservations_updated', table_name='balance_reservations')
+    op.drop_index('idx_balance_reservations_owner', table_name='balance_reservations')
+    op.drop_index('idx_balance_reservations_account', table_name='balance_reservations')
+    op.drop_table('balance_reservations')
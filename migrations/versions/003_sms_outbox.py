@@ -0,0 +1,32 @@
+"""transactional outbox for sms publishing
+
+Revision ID: 871ac9fe904f
+Revises: 19e914d50b07
+Create Date: 2026-10-18 10:41:27.530982
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = '871ac9fe904f'
+down_revision: Union[str, None] = '19e914d50b07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('sms_outbox',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('sms_id', sa.UUID(), nullable=False),
+    sa.Column('queue', sa.String(length=20), nullable=False),
+    sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('sms_outbox')
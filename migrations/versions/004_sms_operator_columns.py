@@ -0,0 +1,27 @@
+"""record operator and operator message id on sms
+
+Revision ID: 937323535945
+Revises: 871ac9fe904f
+Create Date: 2026-10-18 11:52:04.118306
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '937323535945'
+down_revision: Union[str, None] = '871ac9fe904f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Nullable columns without defaults are a catalog-only change on every partition
+    op.add_column('sms', sa.Column('operator', sa.String(length=50), nullable=True))
+    op.add_column('sms', sa.Column('operator_message_id', sa.String(length=100), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('sms', 'operator_message_id')
+    op.drop_column('sms', 'operator')
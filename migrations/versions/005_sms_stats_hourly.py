@@ -0,0 +1,41 @@
+"""hourly per-account sms stats rollup
+
+Revision ID: a3adf72ccb7c
+Revises: 937323535945
+Create Date: 2026-10-18 13:07:45.902113
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'a3adf72ccb7c'
+down_revision: Union[str, None] = '937323535945'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('sms_stats_hourly',
+    sa.Column('account_id', sa.UUID(), nullable=False),
+    sa.Column('bucket', sa.DateTime(), nullable=False),
+    sa.Column('sms_type', sa.SmallInteger(), nullable=False),
+    sa.Column('status', sa.SmallInteger(), nullable=False),
+    sa.Column('shard', sa.SmallInteger(), nullable=False),
+    sa.Column('count', sa.BigInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['account_id'], ['accounts.id'], ),
+    sa.PrimaryKeyConstraint('account_id', 'bucket', 'sms_type', 'status', 'shard')
+    )
+
+    # Seed the rollup from existing messages; from here on it is maintained incrementally
+    op.execute("""
+        INSERT INTO sms_stats_hourly (account_id, bucket, sms_type, status, shard, count)
+        SELECT account_id, date_trunc('hour', created_at), sms_type, status, 0, count(*)
+        FROM sms
+        GROUP BY 1, 2, 3, 4
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('sms_stats_hourly')
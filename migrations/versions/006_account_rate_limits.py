@@ -0,0 +1,26 @@
+"""per-account rate limits
+
+Revision ID: 68fdc23e56db
+Revises: a3adf72ccb7c
+Create Date: 2026-10-18 14:21:12.640935
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '68fdc23e56db'
+down_revision: Union[str, None] = 'a3adf72ccb7c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('accounts', sa.Column('rate_limit_regular', sa.Integer(), nullable=True))
+    op.add_column('accounts', sa.Column('rate_limit_express', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('accounts', 'rate_limit_express')
+    op.drop_column('accounts', 'rate_limit_regular')
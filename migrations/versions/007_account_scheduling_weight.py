@@ -0,0 +1,24 @@
+"""per-account scheduling weight for the fair dispatcher
+
+Revision ID: ae1f9f04f7d1
+Revises: 68fdc23e56db
+Create Date: 2026-10-18 15:02:38.271554
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'ae1f9f04f7d1'
+down_revision: Union[str, None] = '68fdc23e56db'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('accounts', sa.Column('scheduling_weight', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('accounts', 'scheduling_weight')
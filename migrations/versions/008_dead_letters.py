@@ -0,0 +1,49 @@
+"""persistent dead-letter store
+
+Revision ID: 297a6c2e7ae5
+Revises: ae1f9f04f7d1
+Create Date: 2026-10-18 16:20:11.904317
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = '297a6c2e7ae5'
+down_revision: Union[str, None] = 'ae1f9f04f7d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('dead_letters',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('task_id', sa.String(length=64), nullable=False),
+    sa.Column('task_name', sa.String(length=100), nullable=False),
+    sa.Column('sms_id', sa.UUID(), nullable=True),
+    sa.Column('account_id', sa.UUID(), nullable=True),
+    sa.Column('operator', sa.String(length=50), nullable=True),
+    sa.Column('error_class', sa.String(length=100), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('failed_at', sa.DateTime(), nullable=False),
+    sa.Column('replayed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('task_id')
+    )
+    op.create_index('idx_dead_letters_failed', 'dead_letters', ['failed_at'], unique=False)
+    op.create_index('idx_dead_letters_account_failed', 'dead_letters', ['account_id', 'failed_at'], unique=False)
+    op.create_index('idx_dead_letters_operator_failed', 'dead_letters', ['operator', 'failed_at'], unique=False)
+    op.create_index('idx_dead_letters_error_class_failed', 'dead_letters', ['error_class', 'failed_at'], unique=False)
+    op.create_index('idx_dead_letters_sms', 'dead_letters', ['sms_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_dead_letters_sms', table_name='dead_letters')
+    op.drop_index('idx_dead_letters_error_class_failed', table_name='dead_letters')
+    op.drop_index('idx_dead_letters_operator_failed', table_name='dead_letters')
+    op.drop_index('idx_dead_letters_account_failed', table_name='dead_letters')
+    op.drop_index('idx_dead_letters_failed', table_name='dead_letters')
+    op.drop_table('dead_letters')
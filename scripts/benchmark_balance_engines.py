@@ -0,0 +1,91 @@
+"""
+Benchmark deductions per second from one hot account, Postgres row against Redis ledger.
+
+Creates a throwaway account and takes --deductions single-credit deductions from it
+with --concurrency in flight, each in its own session as concurrent sends would, once
+with BALANCE_ENGINE=postgres (the row-locked UPDATE and a commit per deduction) and
+once with BALANCE_ENGINE=redis (the ledger's Lua script). The ledger is flushed
+afterwards and the account row must end at the expected balance; exits non-zero if
+it doesn't. The account and its ledger key are deleted at the end.
+
+    python -m scripts.benchmark_balance_engines --deductions 20000 --concurrency 50
+"""
+import argparse
+import asyncio
+import sys
+import time
+from uuid import uuid4
+from sqlalchemy import delete, select
+
+from config.database import async_session_maker, engine
+from config.redis import close_redis
+from config.settings import settings
+from core.consts import BalanceEngine
+from core.models import Account
+from app.repositories.account_repository import AccountRepository
+from app.services.balance_ledger import balance_key, get_balance_ledger
+
+
+async def deduct_all(account_id, deductions: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def deduct() -> None:
+        async with semaphore:
+            async with async_session_maker() as session:
+                success, _ = await AccountRepository(session).deduct_balance(account_id, 1)
+                assert success
+
+    started = time.perf_counter()
+    await asyncio.gather(*(deduct() for _ in range(deductions)))
+    return deductions / (time.perf_counter() - started)
+
+
+async def run(args) -> int:
+    account_id = uuid4()
+    balance = args.deductions * 2
+    async with async_session_maker() as session:
+        session.add(Account(id=account_id, api_key=f"benchmark-{account_id.hex}", balance=balance))
+        await session.commit()
+
+    ledger = await get_balance_ledger()
+    rates = {}
+    try:
+        for balance_engine in (BalanceEngine.POSTGRES, BalanceEngine.REDIS):
+            settings.BALANCE_ENGINE = balance_engine
+            rates[balance_engine] = await deduct_all(account_id, args.deductions, args.concurrency)
+            print(f"{balance_engine:>8}: {rates[balance_engine]:,.0f} deductions/s")
+
+        token = None
+        while token is None:
+            # The beat flush may be holding it
+            token = await ledger.acquire_lock()
+            if token is None:
+                await asyncio.sleep(0.1)
+        try:
+            async with async_session_maker() as session:
+                await ledger.flush(session)
+        finally:
+            await ledger.release_lock(token)
+
+        async with async_session_maker() as session:
+            final = await session.scalar(select(Account.balance).where(Account.id == account_id))
+        print(f"redis ledger is {rates[BalanceEngine.REDIS] / rates[BalanceEngine.POSTGRES]:.1f}x the row UPDATE")
+        if final != balance - 2 * args.deductions:
+            print(f"balance after flush is {final}, expected {balance - 2 * args.deductions}")
+            return 1
+        return 0
+    finally:
+        await ledger.redis.delete(balance_key(account_id))
+        async with async_session_maker() as session:
+            await session.execute(delete(Account).where(Account.id == account_id))
+            await session.commit()
+        await close_redis()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--deductions", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
@@ -0,0 +1,109 @@
+"""
+Benchmark one asyncio consumer process against a pool of Celery-style worker processes.
+
+Processes --messages express messages through the real process_sms_message, the
+operator HTTP calls, send state and status stream included. Once in a single process
+with --in-flight sends at a time, as workers.consumer runs them, and once across
+--children processes that each handle one message at a time, as a prefork Celery
+worker with that concurrency does. Both read from an in-memory list instead of
+RabbitMQ, so only the execution model differs. Prints msg/s and the summed resident
+memory of the processes. Results go to a scratch status stream that is deleted
+afterwards. Run where Redis and the mock operators resolve, e.g. inside the
+celery_worker container (Linux only, memory is read from /proc).
+
+    python -m scripts.benchmark_consumer --messages 5000 --children 50 --in-flight 500
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import time
+from datetime import datetime
+from uuid import uuid4
+
+from config.redis import get_redis, close_redis
+from config.settings import settings
+from core.consts import SMSType
+from core.ids import uuid7
+from workers.operator_client import OperatorClient
+from workers.runtime import runtime
+from workers.services.sms_processor import process_sms_message
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def task_kwargs() -> dict:
+    return {
+        "sms_id": str(uuid7()),
+        "phone_number": "+15550100000",
+        "message": "benchmark",
+        "created_at": datetime.utcnow().isoformat(),
+        "sms_type": SMSType.EXPRESS,
+        "account_id": str(uuid4()),
+    }
+
+
+def start_child(stream: str) -> None:
+    settings.STATUS_STREAM = stream
+    runtime.start()
+
+
+def child_task(kwargs: dict) -> tuple[int, float]:
+    runtime.run(process_sms_message(**kwargs))
+    return os.getpid(), rss_mb()
+
+
+def warm_up(_) -> float:
+    return rss_mb()
+
+
+def run_children(messages: list[dict], children: int) -> tuple[float, float]:
+    memory = {}
+    # fork would hand the parent's connections to every child
+    with multiprocessing.get_context("spawn").Pool(children, start_child, (settings.STATUS_STREAM,)) as pool:
+        # Pool start-up is not part of the comparison
+        pool.map(warm_up, range(children))
+        started = time.perf_counter()
+        for pid, rss in pool.imap_unordered(child_task, messages):
+            memory[pid] = max(memory.get(pid, 0.0), rss)
+        elapsed = time.perf_counter() - started
+    return len(messages) / elapsed, sum(memory.values())
+
+
+async def run_consumer(messages: list[dict], in_flight: int) -> tuple[float, float]:
+    semaphore = asyncio.Semaphore(in_flight)
+
+    async def process(kwargs: dict) -> None:
+        async with semaphore:
+            await process_sms_message(**kwargs)
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(process(kwargs) for kwargs in messages))
+        return len(messages) / (time.perf_counter() - started), rss_mb()
+    finally:
+        await OperatorClient.close()
+        await (await get_redis()).delete(settings.STATUS_STREAM)
+        await close_redis()
+
+
+def run(args) -> None:
+    settings.STATUS_STREAM = f"sms:status:benchmark:{uuid4().hex}"
+
+    rate, memory = run_children([task_kwargs() for _ in range(args.messages)], args.children)
+    print(f"{args.children} children: {rate:,.0f} msg/s, {memory:,.0f} MB resident")
+
+    rate, memory = asyncio.run(run_consumer([task_kwargs() for _ in range(args.messages)], args.in_flight))
+    print(f"  1 consumer: {rate:,.0f} msg/s, {memory:,.0f} MB resident, {args.in_flight} in flight")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--children", type=int, default=50)
+    parser.add_argument("--in-flight", type=int, default=500)
+    args = parser.parse_args()
+    run(args)
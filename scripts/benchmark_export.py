@@ -0,0 +1,95 @@
+"""
+Benchmark SMSExporter.stream on a large account.
+
+Seeds --rows SMS rows for a throwaway account with COPY, streams them through the
+exporter (discarding the output) and reports throughput, bytes written and the peak
+RSS while streaming, which should not grow with --rows. The seeded rows are deleted
+afterwards; the current month's partition must exist.
+
+    python -m scripts.benchmark_export --rows 10000000 --format ndjson
+"""
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+from sqlalchemy import delete
+
+from config.database import async_session_maker, engine
+from core.consts import SMSStatus, SMSType
+from core.ids import uuid7
+from core.models import Account, SMS
+from app.services.sms_export import SMSExporter
+
+SEED_CHUNK = 100_000
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+async def seed(account_id, rows: int) -> None:
+    start = datetime.utcnow() - timedelta(seconds=rows / 1000)
+
+    async with engine.connect() as connection:
+        raw_connection = await connection.get_raw_connection()
+        driver = raw_connection.driver_connection
+
+        for offset in range(0, rows, SEED_CHUNK):
+            records = []
+            for i in range(offset, min(offset + SEED_CHUNK, rows)):
+                created_at = start + timedelta(milliseconds=i)
+                records.append((
+                    uuid7(created_at), account_id, "09120000000", "export benchmark",
+                    SMSType.REGULAR, SMSStatus.SENT, created_at, created_at, "operator_a", uuid4().hex
+                ))
+            await driver.copy_records_to_table(
+                "sms",
+                records=records,
+                columns=[
+                    "id", "account_id", "phone_number", "message", "sms_type", "status",
+                    "created_at", "sent_at", "operator", "operator_message_id"
+                ]
+            )
+
+
+async def run(rows: int, export_format: str) -> None:
+    account_id = uuid4()
+    async with async_session_maker() as session:
+        session.add(Account(id=account_id, api_key=f"benchmark-{account_id.hex}", balance=0))
+        await session.commit()
+
+    try:
+        started = time.perf_counter()
+        await seed(account_id, rows)
+        print(f"Seeded {rows:,} rows in {time.perf_counter() - started:.1f}s")
+
+        exported_bytes = 0
+        baseline_rss = peak_rss = rss_mb()
+        started = time.perf_counter()
+        async for chunk in SMSExporter.stream(account_id, export_format):
+            exported_bytes += len(chunk)
+            peak_rss = max(peak_rss, rss_mb())
+        elapsed = time.perf_counter() - started
+
+        print(
+            f"Exported {rows:,} rows as {export_format} in {elapsed:.1f}s "
+            f"({rows / elapsed:,.0f} rows/s, {exported_bytes / elapsed / 2**20:.1f} MB/s, "
+            f"{exported_bytes / 2**20:,.0f} MB), RSS {baseline_rss:.0f} MB before, {peak_rss:.0f} MB peak"
+        )
+    finally:
+        async with async_session_maker() as session:
+            await session.execute(delete(SMS).where(SMS.account_id == account_id))
+            await session.execute(delete(Account).where(Account.id == account_id))
+            await session.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--format", dest="export_format", choices=["ndjson", "csv"], default="ndjson")
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.export_format))
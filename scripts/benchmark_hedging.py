@@ -0,0 +1,92 @@
+"""
+Benchmark express send latency with and without operator hedging.
+
+Injects tail latency into the mock operators through PUT /profile (--tail-rate of
+requests hang for --tail-seconds), sends --messages express messages through
+OperatorClient with --concurrency in flight, once unhedged and once hedged, and prints
+p50/p99/max send latency plus the extra operator calls hedging cost. Operator profiles
+are restored afterwards. Run where the mock operators resolve, e.g. inside the
+celery_worker container.
+
+    python -m scripts.benchmark_hedging --messages 5000 --tail-rate 0.03
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from uuid import uuid4
+import httpx
+
+from config.operator_config import OPERATORS
+from workers.operator_client import OperatorClient
+
+
+def profile_url(operator) -> str:
+    return operator.url.rsplit("/send", 1)[0] + "/profile"
+
+
+async def run_pass(label: str, hedge: bool, messages: int, concurrency: int) -> None:
+    OperatorClient.hedge_metrics.clear()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    sent = 0
+
+    async def send_one() -> None:
+        nonlocal sent
+        async with semaphore:
+            started = time.perf_counter()
+            success, _, _, _ = await OperatorClient.send_sms(
+                "+15550100000", "benchmark", hedge=hedge, idempotency_key=str(uuid4())
+            )
+            latencies.append(time.perf_counter() - started)
+            sent += success
+
+    await asyncio.gather(*(send_one() for _ in range(messages)))
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(
+        f"{label:>9}: p50 {statistics.median(latencies) * 1000:.0f} ms, p99 {p99 * 1000:.0f} ms, "
+        f"max {latencies[-1] * 1000:.0f} ms, {sent / messages:.2%} sent"
+    )
+
+    metrics = OperatorClient.hedge_metrics
+    if metrics["messages"]:
+        print(
+            f"{'':>9}  {metrics['hedged'] / metrics['messages']:.1%} hedged, "
+            f"{metrics['hedge_won']} won by the hedge, "
+            f"{metrics['sends'] / metrics['messages']:.3f} operator calls per message "
+            f"({metrics['cancelled']} cancelled)"
+        )
+
+
+async def run(args) -> None:
+    async with httpx.AsyncClient(timeout=5) as admin:
+        saved = {}
+        for operator in OPERATORS:
+            response = await admin.get(profile_url(operator))
+            response.raise_for_status()
+            saved[operator.name] = response.json()
+
+        try:
+            for operator in OPERATORS:
+                tail = dict(saved[operator.name], hang_rate=args.tail_rate, hang_seconds=args.tail_seconds)
+                (await admin.put(profile_url(operator), json=tail)).raise_for_status()
+
+            # Both passes share the router, so the first one also warms up its latency stats
+            await run_pass("unhedged", False, args.messages, args.concurrency)
+            await run_pass("hedged", True, args.messages, args.concurrency)
+        finally:
+            for operator in OPERATORS:
+                await admin.put(profile_url(operator), json=saved[operator.name])
+            await OperatorClient.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--tail-rate", type=float, default=0.03)
+    parser.add_argument("--tail-seconds", type=float, default=1.0)
+    args = parser.parse_args()
+    asyncio.run(run(args))
@@ -0,0 +1,139 @@
+"""
+Measure Idempotency-Key overhead and check the duplicate race window against Redis.
+
+Overhead: --requests sequential claims of fresh keys (the hot path of every keyed
+send), completions, and replays of completed keys, with p50/p99 per operation.
+
+Race: --keys keys, each claimed by --duplicates concurrent requests at once. The
+winner "sends" for --work-ms and then completes, or with --fail-rate releases its
+lock as a failed request would. Every key must end with exactly one send, and every
+duplicate must get that send's response, a lock handover after a failure, or a 409.
+Exits non-zero on a violation.
+
+    python -m scripts.benchmark_idempotency --requests 5000 --keys 500 --duplicates 8
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from uuid import uuid4
+
+from config.redis import get_redis, close_redis
+from core.consts import SMSStatus
+from app.schemas.sms_schema import SMSResponse
+from app.services.idempotency import ACQUIRED, IN_PROGRESS, REPLAY, IdempotencyStore
+
+BODY = '{"phone_number":"+15550100000","message":"benchmark","sms_type":1}'
+
+
+def fake_response(account_id) -> SMSResponse:
+    return SMSResponse(
+        id=uuid4(),
+        account_id=account_id,
+        phone_number="+15550100000",
+        message="benchmark",
+        sms_type=1,
+        status=SMSStatus.PENDING,
+        created_at=datetime.utcnow()
+    )
+
+
+def summary(label: str, timings: list[float]) -> str:
+    timings = sorted(timings)
+    p99 = timings[max(0, int(len(timings) * 0.99) - 1)]
+    return f"{label:>9}: p50 {statistics.median(timings) * 1000:.2f} ms, p99 {p99 * 1000:.2f} ms"
+
+
+async def measure_overhead(store: IdempotencyStore, requests: int) -> None:
+    account_id = uuid4()
+    claims, completes, replays = [], [], []
+    keys = [str(uuid4()) for _ in range(requests)]
+
+    for key in keys:
+        started = time.perf_counter()
+        claim = await store.claim(account_id, key, BODY)
+        claims.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await store.complete(claim, fake_response(account_id))
+        completes.append(time.perf_counter() - started)
+
+    for key in keys:
+        started = time.perf_counter()
+        claim = await store.claim(account_id, key, BODY)
+        replays.append(time.perf_counter() - started)
+        assert claim.state == REPLAY
+
+    print(summary("claim", claims))
+    print(summary("complete", completes))
+    print(summary("replay", replays))
+
+
+async def check_race(store: IdempotencyStore, args, rng: random.Random) -> int:
+    account_id = uuid4()
+    sends: Counter = Counter()
+    sent_ids = {}
+    outcomes: Counter = Counter()
+    violations = 0
+
+    async def request(key: str) -> None:
+        claim = await store.claim(account_id, key, BODY)
+        outcomes[claim.state] += 1
+        if claim.state == ACQUIRED:
+            await asyncio.sleep(args.work_ms / 1000)
+            if rng.random() < args.fail_rate:
+                await store.release(claim)
+                return
+            sends[key] += 1
+            response = fake_response(account_id)
+            sent_ids.setdefault(key, response.id)
+            await store.complete(claim, response)
+        elif claim.state == REPLAY:
+            outcomes["replay_matches"] += claim.response.id == sent_ids.get(key)
+
+    keys = [str(uuid4()) for _ in range(args.keys)]
+    await asyncio.gather(*(request(key) for key in keys for _ in range(args.duplicates)))
+
+    for key in keys:
+        if sends[key] > 1:
+            violations += 1
+    if outcomes["replay_matches"] != outcomes[REPLAY]:
+        violations += outcomes[REPLAY] - outcomes["replay_matches"]
+
+    print(
+        f"{args.keys} keys x {args.duplicates} duplicates: {sum(sends.values())} sends, "
+        f"{outcomes[ACQUIRED]} locks taken, {outcomes[REPLAY]} replays, "
+        f"{outcomes[IN_PROGRESS]} answered 409, {violations} violations"
+    )
+    return violations
+
+
+async def run(args) -> int:
+    redis_client = await get_redis()
+    store = IdempotencyStore(
+        redis_client, ttl=300, lock_ttl=args.lock_ttl, wait=args.wait, poll_interval=args.poll_interval
+    )
+    try:
+        await measure_overhead(store, args.requests)
+        return await check_race(store, args, random.Random(args.seed))
+    finally:
+        await close_redis()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--keys", type=int, default=500)
+    parser.add_argument("--duplicates", type=int, default=8)
+    parser.add_argument("--work-ms", type=float, default=20.0)
+    parser.add_argument("--fail-rate", type=float, default=0.1)
+    parser.add_argument("--lock-ttl", type=float, default=10.0)
+    parser.add_argument("--wait", type=float, default=2.0)
+    parser.add_argument("--poll-interval", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    sys.exit(1 if asyncio.run(run(args)) else 0)
@@ -0,0 +1,66 @@
+"""
+Benchmark regular sends with one operator call per SMS vs batch calls.
+
+Sends --messages regular messages through OperatorClient with --concurrency in flight,
+once with a call per message and once through the operators' /send-batch, and prints
+throughput, p50/p99 send latency and operator calls per message. Run where the mock
+operators resolve, e.g. inside the celery_worker container.
+
+    python -m scripts.benchmark_operator_batching --messages 20000 --concurrency 500
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from uuid import uuid4
+
+from config.settings import settings
+from workers.operator_client import OperatorClient
+
+
+async def run_pass(label: str, batch: bool, messages: int, concurrency: int) -> None:
+    OperatorClient.call_metrics.clear()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    sent = 0
+
+    async def send_one() -> None:
+        nonlocal sent
+        async with semaphore:
+            started = time.perf_counter()
+            success, _, _, _ = await OperatorClient.send_sms(
+                "+15550100000", "benchmark", idempotency_key=str(uuid4()), batch=batch
+            )
+            latencies.append(time.perf_counter() - started)
+            sent += success
+
+    started = time.perf_counter()
+    await asyncio.gather(*(send_one() for _ in range(messages)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    calls = OperatorClient.call_metrics
+    print(
+        f"{label:>9}: {messages / elapsed:.0f} msg/s, p50 {statistics.median(latencies) * 1000:.0f} ms, "
+        f"p99 {p99 * 1000:.0f} ms, {sent / messages:.2%} sent, "
+        f"{(calls['calls'] + calls['batch_calls']) / messages:.3f} operator calls per message"
+    )
+
+
+async def run(args) -> None:
+    settings.OPERATOR_BATCH_MAX_WAIT = args.max_wait_ms / 1000
+    try:
+        await run_pass("single", False, args.messages, args.concurrency)
+        await run_pass("batched", True, args.messages, args.concurrency)
+    finally:
+        await OperatorClient.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=settings.CONSUMER_REGULAR_CONCURRENCY)
+    parser.add_argument("--max-wait-ms", type=float, default=settings.OPERATOR_BATCH_MAX_WAIT * 1000)
+    args = parser.parse_args()
+    asyncio.run(run(args))
@@ -0,0 +1,74 @@
+"""
+Benchmark operator call latency with a new HTTP client per call vs the pooled clients.
+
+Sends --requests calls to the first operator with --concurrency in flight, once
+opening an httpx.AsyncClient (and connection) per call as the workers did before the
+pools, and once through OperatorClient's keep-alive pool, and prints throughput and
+p50/p99 per call. Run where the mock operators resolve, e.g. inside the
+celery_worker container.
+
+    python -m scripts.benchmark_operator_pool --requests 5000 --concurrency 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import httpx
+
+from config.operator_config import OPERATORS, OperatorConfig
+from workers.operator_client import OperatorClient
+
+BODY = {"phone_number": "+15550100000", "message": "benchmark"}
+
+
+async def per_call(operator: OperatorConfig) -> bool:
+    async with httpx.AsyncClient(timeout=operator.timeout) as client:
+        response = await client.post(operator.url, json=BODY)
+    return response.status_code == 200
+
+
+async def pooled(operator: OperatorConfig) -> bool:
+    response = await OperatorClient.get_client(operator).post(operator.url, json=BODY)
+    return response.status_code == 200
+
+
+async def run_pass(label: str, call, operator: OperatorConfig, requests: int, concurrency: int) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    ok = 0
+
+    async def one() -> None:
+        nonlocal ok
+        async with semaphore:
+            started = time.perf_counter()
+            success = await call(operator)
+            latencies.append(time.perf_counter() - started)
+            ok += success
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(
+        f"{label:>8}: {requests / elapsed:.0f} calls/s, p50 {statistics.median(latencies) * 1000:.1f} ms, "
+        f"p99 {p99 * 1000:.1f} ms, {ok / requests:.2%} HTTP 200"
+    )
+
+
+async def run(args) -> None:
+    operator = OPERATORS[0]
+    try:
+        await run_pass("per call", per_call, operator, args.requests, args.concurrency)
+        await run_pass("pooled", pooled, operator, args.requests, args.concurrency)
+    finally:
+        await OperatorClient.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args))
@@ -0,0 +1,115 @@
+"""
+Benchmark id lookups on a table partitioned like sms, with and without the created_at
+window derived from UUIDv7 ids.
+
+Builds a scratch table with 24 monthly partitions, fills it with UUIDv7 rows, then times
+the same point lookups both ways and reports how many partitions each plan touches.
+The scratch table is dropped afterwards.
+
+    python -m scripts.benchmark_partition_lookup --rows-per-partition 50000 --lookups 2000
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+
+from config.database import engine
+from core.ids import uuid7, created_at_range
+
+TABLE = "sms_lookup_benchmark"
+PARTITIONS = 24
+
+
+def month_start(year: int, month: int) -> datetime:
+    year, month = year + (month - 1) // 12, (month - 1) % 12 + 1
+    return datetime(year, month, 1)
+
+
+async def setup(connection, rows_per_partition: int) -> list:
+    await connection.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    await connection.execute(
+        f"CREATE TABLE {TABLE} (id uuid NOT NULL, created_at timestamp NOT NULL, "
+        f"status smallint NOT NULL, PRIMARY KEY (id, created_at)) PARTITION BY RANGE (created_at)"
+    )
+
+    today = datetime.utcnow()
+    ids = []
+    for offset in range(PARTITIONS):
+        start = month_start(today.year, today.month - offset)
+        end = month_start(start.year, start.month + 1)
+        await connection.execute(
+            f"CREATE TABLE {TABLE}_{start:%Y_%m} PARTITION OF {TABLE} "
+            f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+        )
+
+        span = (end - start).total_seconds() - 1
+        records = []
+        for _ in range(rows_per_partition):
+            created_at = start + timedelta(seconds=random.uniform(0, span))
+            sms_id = uuid7(created_at)
+            records.append((sms_id, created_at, 1))
+        await connection.copy_records_to_table(TABLE, records=records, columns=["id", "created_at", "status"])
+        ids.extend(record[0] for record in random.sample(records, min(100, len(records))))
+
+    await connection.execute(f"ANALYZE {TABLE}")
+    return ids
+
+
+async def time_lookups(connection, ids: list, pruned: bool) -> float:
+    if pruned:
+        statement = await connection.prepare(
+            f"SELECT * FROM {TABLE} WHERE id = $1 AND created_at >= $2 AND created_at < $3"
+        )
+    else:
+        statement = await connection.prepare(f"SELECT * FROM {TABLE} WHERE id = $1")
+
+    started = time.perf_counter()
+    for sms_id in ids:
+        if pruned:
+            await statement.fetchrow(sms_id, *created_at_range(sms_id))
+        else:
+            await statement.fetchrow(sms_id)
+    return time.perf_counter() - started
+
+
+async def partitions_scanned(connection, sms_id, pruned: bool) -> int:
+    if pruned:
+        start, end = created_at_range(sms_id)
+        query = (
+            f"EXPLAIN (ANALYZE, FORMAT JSON) SELECT * FROM {TABLE} WHERE id = '{sms_id}' "
+            f"AND created_at >= '{start.isoformat()}' AND created_at < '{end.isoformat()}'"
+        )
+    else:
+        query = f"EXPLAIN (ANALYZE, FORMAT JSON) SELECT * FROM {TABLE} WHERE id = '{sms_id}'"
+
+    plan = await connection.fetchval(query)
+    return plan.count('"Relation Name"')
+
+
+async def run(rows_per_partition: int, lookups: int) -> None:
+    async with engine.connect() as connection:
+        raw_connection = await connection.get_raw_connection()
+        driver = raw_connection.driver_connection
+        try:
+            ids = await setup(driver, rows_per_partition)
+            sample = [random.choice(ids) for _ in range(lookups)]
+
+            for pruned in (False, True):
+                elapsed = await time_lookups(driver, sample, pruned)
+                label = "id + created_at window" if pruned else "id only"
+                print(
+                    f"{label:>24}: {elapsed / lookups * 1000:.3f} ms/lookup, "
+                    f"{await partitions_scanned(driver, sample[0], pruned)} partitions in plan"
+                )
+        finally:
+            await driver.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows-per-partition", type=int, default=50000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows_per_partition, args.lookups))
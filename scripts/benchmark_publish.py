@@ -0,0 +1,79 @@
+"""
+Benchmark task publish latency of celery send_task vs pooled aio_pika confirms under load.
+
+Starts --requests concurrent "requests" on one event loop, as an API worker would
+handle them, each publishing one task. Once with the blocking celery_app.send_task
+the API used before, and once with config.rabbitmq.publish_task, which returns when
+the broker has confirmed the message. Prints p50/p99 per request and the wall time
+for all of them. Tasks go to a scratch queue with no consumer that is deleted
+afterwards. Run where RabbitMQ resolves, e.g. inside the app container.
+
+    python -m scripts.benchmark_publish --requests 1000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from uuid import uuid4
+import aio_pika
+
+from config.rabbitmq import get_rabbitmq_connection, close_rabbitmq, publish_task
+from workers.celery_app import celery_app
+
+TASK = "benchmark.publish"
+
+
+def report(label: str, latencies: list[float], elapsed: float) -> None:
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(
+        f"{label:>9}: p50 {statistics.median(latencies) * 1000:.1f} ms, p99 {p99 * 1000:.1f} ms, "
+        f"{len(latencies)} requests in {elapsed:.2f}s"
+    )
+
+
+async def run_pass(label: str, publish, requests: int) -> None:
+    latencies = []
+
+    async def request(index: int) -> None:
+        started = time.perf_counter()
+        await publish({"index": index})
+        latencies.append(time.perf_counter() - started)
+
+    # Connection set-up is not part of the comparison
+    await publish({"index": -1})
+    started = time.perf_counter()
+    await asyncio.gather(*(request(index) for index in range(requests)))
+    report(label, latencies, time.perf_counter() - started)
+
+
+async def run(args) -> None:
+    queue_name = f"benchmark.publish.{uuid4().hex}"
+    connection = await get_rabbitmq_connection()
+    channel = await connection.channel()
+    exchange = await channel.declare_exchange(queue_name, aio_pika.ExchangeType.DIRECT, durable=True)
+    queue = await channel.declare_queue(queue_name, durable=True)
+    await queue.bind(exchange, routing_key=queue_name)
+
+    async def send_task(kwargs: dict) -> None:
+        # Blocks the event loop, as it did inside the request handler
+        celery_app.send_task(TASK, kwargs=kwargs, queue=queue_name)
+
+    async def confirmed(kwargs: dict) -> None:
+        await publish_task(TASK, kwargs=kwargs, queue=queue_name)
+
+    try:
+        await run_pass("send_task", send_task, args.requests)
+        await run_pass("aio_pika", confirmed, args.requests)
+    finally:
+        await queue.delete(if_unused=False, if_empty=False)
+        await exchange.delete()
+        await channel.close()
+        await close_rabbitmq()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(run(args))
@@ -0,0 +1,63 @@
+"""
+Benchmark the latency RateLimiter.acquire adds to a request.
+
+Runs --requests sequential acquisitions for a synthetic account well under its limit,
+once with the local lease fast path and once forcing every call to the Redis script,
+and prints p50/p99/max per call.
+
+    python -m scripts.benchmark_rate_limiter --requests 20000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime
+from uuid import uuid4
+
+from config.redis import get_redis, close_redis
+from config.settings import settings
+from core.consts import SMSType
+from app.services.account_cache import AccountSnapshot
+from app.services.rate_limiter import RateLimiter, rate_limit_key
+
+
+def report(label: str, samples: list[float]) -> None:
+    samples.sort()
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    print(
+        f"{label:>14}: p50 {statistics.median(samples) * 1000:.3f} ms, "
+        f"p99 {p99 * 1000:.3f} ms, max {samples[-1] * 1000:.3f} ms"
+    )
+
+
+async def run(requests: int) -> None:
+    redis_client = await get_redis()
+    # High enough that the benchmark never gets throttled
+    account = AccountSnapshot(
+        id=uuid4(),
+        api_key="benchmark",
+        balance=0,
+        created_at=datetime.utcnow(),
+        rate_limit_regular=1_000_000
+    )
+
+    try:
+        for label, lease_fraction in (("lease", settings.RATE_LIMIT_LEASE_FRACTION), ("redis only", 0.0)):
+            limiter = RateLimiter(redis_client, lease_fraction=lease_fraction, lease_ttl=settings.RATE_LIMIT_LEASE_TTL)
+            samples = []
+            for _ in range(requests):
+                started = time.perf_counter()
+                retry_after = await limiter.acquire(account, SMSType.REGULAR)
+                samples.append(time.perf_counter() - started)
+                assert retry_after is None
+            report(label, samples)
+    finally:
+        await redis_client.delete(rate_limit_key(account.id, SMSType.REGULAR))
+        await close_redis()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests))
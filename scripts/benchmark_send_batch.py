@@ -0,0 +1,80 @@
+"""
+Benchmark messages per second of /sms/send against /sms/send-batch in one API process.
+
+Runs the app in-process through httpx's ASGI transport, so the numbers are one API
+worker's, against the real Postgres, Redis and RabbitMQ of a dev stack. A throwaway
+account with enough balance sends --messages messages one request each with
+--concurrency requests in flight, then the same number in --batch-size batches, and
+the speedup is printed. Rate limiting is switched off for the run. The messages are
+queued for real; the account and its SMS rows are deleted afterwards.
+
+    python -m scripts.benchmark_send_batch --messages 20000 --batch-size 1000
+"""
+import argparse
+import asyncio
+import time
+from uuid import uuid4
+import httpx
+from sqlalchemy import delete
+
+from config.database import async_session_maker, engine
+from config.settings import settings
+from core.models import Account, SMS
+from app.main import app
+
+MESSAGE = {"phone_number": "+15550100000", "message": "benchmark", "sms_type": 1}
+
+
+async def timed(label: str, messages: int, requests) -> float:
+    started = time.perf_counter()
+    await asyncio.gather(*requests)
+    elapsed = time.perf_counter() - started
+    print(f"{label:>10}: {messages} messages in {elapsed:.2f}s, {messages / elapsed:,.0f} msg/s")
+    return messages / elapsed
+
+
+async def run(args) -> None:
+    settings.RATE_LIMIT_ENABLED = False
+    account_id = uuid4()
+    api_key = f"benchmark-{account_id.hex}"
+    async with async_session_maker() as session:
+        session.add(Account(id=account_id, api_key=api_key, balance=args.messages * 2))
+        await session.commit()
+
+    headers = {"X-API-Key": api_key}
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def post(client: httpx.AsyncClient, path: str, body: dict) -> None:
+        async with semaphore:
+            response = await client.post(f"{settings.API_V1_PREFIX}{path}", json=body, headers=headers)
+            response.raise_for_status()
+
+    try:
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+                single = await timed(
+                    "single", args.messages,
+                    (post(client, "/sms/send", MESSAGE) for _ in range(args.messages))
+                )
+                batches = args.messages // args.batch_size
+                batched = await timed(
+                    "batch", batches * args.batch_size,
+                    (post(client, "/sms/send-batch", {"messages": [MESSAGE] * args.batch_size}) for _ in range(batches))
+                )
+        print(f"send-batch is {batched / single:.1f}x /sms/send")
+    finally:
+        async with async_session_maker() as session:
+            await session.execute(delete(SMS).where(SMS.account_id == account_id))
+            await session.execute(delete(Account).where(Account.id == account_id))
+            await session.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(run(args))
@@ -0,0 +1,90 @@
+"""
+Benchmark SMSRepository.batch_update_status against a real database.
+
+Seeds PENDING rows for a throwaway account, applies one flush of mixed SENT/FAILED
+results per size and prints the wall time. Everything it creates is deleted afterwards.
+
+    python -m scripts.benchmark_status_update --sizes 10000 100000
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+from sqlalchemy import delete, insert
+
+from config.database import async_session_maker, engine
+from core.consts import SMSStatus, SMSType
+from core.models import Account, SMS
+from app.repositories.sms_repository import SMSRepository
+
+OPERATORS = ["operator_a", "operator_b", "operator_c"]
+
+
+async def seed(account_id, size: int) -> list[tuple]:
+    now = datetime.utcnow()
+    rows = [
+        {
+            "id": uuid4(),
+            "account_id": account_id,
+            "phone_number": "09120000000",
+            "message": "benchmark",
+            "sms_type": SMSType.REGULAR,
+            "status": SMSStatus.PENDING,
+            "created_at": now - timedelta(milliseconds=i),
+        }
+        for i in range(size)
+    ]
+
+    async with async_session_maker() as session:
+        for start in range(0, size, 5000):
+            await session.execute(insert(SMS), rows[start:start + 5000])
+        await session.commit()
+
+    updates = []
+    for row in rows:
+        sent = random.random() < 0.95
+        updates.append((
+            row["id"],
+            row["created_at"],
+            SMSStatus.SENT if sent else SMSStatus.FAILED,
+            row["created_at"] + timedelta(milliseconds=random.randint(50, 3000)) if sent else None,
+            random.choice(OPERATORS) if sent else None,
+            uuid4().hex if sent else None
+        ))
+    return updates
+
+
+async def run(sizes: list[int]) -> None:
+    account_id = uuid4()
+    async with async_session_maker() as session:
+        session.add(Account(id=account_id, api_key=f"benchmark-{account_id.hex}", balance=0))
+        await session.commit()
+
+    try:
+        for size in sizes:
+            updates = await seed(account_id, size)
+
+            async with async_session_maker() as session:
+                started = time.perf_counter()
+                sent, failed = await SMSRepository(session).batch_update_status(updates)
+                elapsed = time.perf_counter() - started
+
+            print(
+                f"{size:>8} rows: {elapsed * 1000:8.1f} ms "
+                f"({size / elapsed:,.0f} rows/s), {sent} sent, {failed} failed"
+            )
+    finally:
+        async with async_session_maker() as session:
+            await session.execute(delete(SMS).where(SMS.account_id == account_id))
+            await session.execute(delete(Account).where(Account.id == account_id))
+            await session.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    args = parser.parse_args()
+    asyncio.run(run(args.sizes))
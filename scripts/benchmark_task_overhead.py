@@ -0,0 +1,93 @@
+"""
+Benchmark the per-invocation overhead of process_sms, asyncio.run() per task vs the worker runtime.
+
+Runs --tasks process_sms invocations back to back with the operator call replaced by
+an immediate success, so only the task's own overhead is left. Once the way tasks ran
+before the runtime, a new event loop, Redis client and operator pools per task, and
+once through workers.runtime, where they live for the process. Prints tasks/s and
+p50/p99 per invocation. Results go to a scratch status stream that is deleted
+afterwards. Needs Redis, e.g. inside the celery_worker container.
+
+    python -m scripts.benchmark_task_overhead --tasks 5000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime
+from uuid import uuid4
+
+from config.redis import get_redis, close_redis
+from config.settings import settings
+from core.consts import SMSType
+from core.ids import uuid7
+from app.services import send_dedup
+from workers.operator_client import OperatorClient
+from workers.runtime import runtime
+from workers.services import sms_processor
+
+
+class InstantOperator:
+    @staticmethod
+    async def send_sms(phone, message, hedge=False, idempotency_key=None, avoid=None, batch=False, prefer=None, on_call=None):
+        return True, uuid4().hex, None, "benchmark"
+
+
+def task_kwargs() -> dict:
+    return {
+        "sms_id": str(uuid7()),
+        "phone_number": "+15550100000",
+        "message": "benchmark",
+        "created_at": datetime.utcnow().isoformat(),
+        "sms_type": SMSType.REGULAR,
+        "account_id": str(uuid4()),
+    }
+
+
+async def per_task_loop(kwargs: dict) -> None:
+    # What every task paid before: clients opened in this loop and closed with it
+    try:
+        await sms_processor.process_sms_message(**kwargs)
+    finally:
+        await OperatorClient.close()
+        await close_redis()
+        send_dedup._send_dedup = None
+
+
+def measure(label: str, tasks: int, invoke) -> None:
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(tasks):
+        kwargs = task_kwargs()
+        call_started = time.perf_counter()
+        invoke(kwargs)
+        latencies.append(time.perf_counter() - call_started)
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(
+        f"{label:>11}: {tasks / elapsed:,.0f} tasks/s, p50 {statistics.median(latencies) * 1000:.2f} ms, "
+        f"p99 {p99 * 1000:.2f} ms"
+    )
+
+
+def run(args) -> None:
+    settings.STATUS_STREAM = f"sms:status:benchmark:{uuid4().hex}"
+    sms_processor.OperatorClient = InstantOperator
+
+    measure("asyncio.run", args.tasks, lambda kwargs: asyncio.run(per_task_loop(kwargs)))
+    measure("runtime", args.tasks, lambda kwargs: runtime.run(sms_processor.process_sms_message(**kwargs)))
+
+    async def cleanup() -> None:
+        await (await get_redis()).delete(settings.STATUS_STREAM)
+
+    runtime.run(cleanup())
+    runtime.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=5000)
+    args = parser.parse_args()
+    run(args)
@@ -0,0 +1,33 @@
+"""
+Create upcoming sms partitions and detach, archive and drop expired ones.
+
+Prints the plan without touching the database unless --apply is given:
+
+    python -m scripts.manage_partitions
+    python -m scripts.manage_partitions --apply
+"""
+import argparse
+import asyncio
+import logging
+
+from config.database import engine
+from config.settings import settings
+from app.services.partition_manager import get_partition_manager
+
+
+async def run(apply: bool) -> None:
+    try:
+        plan = await get_partition_manager().run(dry_run=not apply)
+        if plan is not None and not plan.describe():
+            print("Nothing to do")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--apply", action="store_true", help="execute the plan instead of printing it")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=settings.LOG_LEVEL, format="%(message)s")
+    asyncio.run(run(args.apply))
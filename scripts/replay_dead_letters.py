@@ -0,0 +1,97 @@
+"""
+Replay dead-lettered SMS matching the given filters.
+
+Claims unreplayed dead letters in batches of --batch, resets their messages to PENDING
+and queues them again, pausing between batches so no more than --rate messages per
+second are requeued. Safe to re-run or to run next to the admin API: messages already
+sent or already replayed are skipped. --dry-run only prints how many letters match.
+
+    python -m scripts.replay_dead_letters --operator operator_a --since 2026-10-18T09:00 --rate 200
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+from datetime import datetime
+from uuid import UUID
+
+from config.database import async_session_maker, engine
+from config.rabbitmq import close_rabbitmq
+from config.redis import close_redis
+from config.settings import settings
+from app.repositories.dead_letter_repository import DeadLetterFilter, DeadLetterRepository
+from app.services.dead_letter_service import DeadLetterService
+
+
+async def dry_run(filters: DeadLetterFilter, sample: int) -> None:
+    async with async_session_maker() as session:
+        repo = DeadLetterRepository(session)
+        total = await repo.count(filters)
+        letters = await repo.find(filters, sample)
+
+    print(f"{total} dead letters match")
+    by_cause = Counter((letter.operator, letter.error_class) for letter in letters)
+    for (operator, error_class), count in by_cause.most_common():
+        print(f"  {count:>6}  {operator or '-'}  {error_class}")
+    if total > len(letters):
+        print(f"  (breakdown of the {len(letters)} most recent)")
+
+
+async def replay(filters: DeadLetterFilter, args) -> None:
+    claimed = replayed = skipped = 0
+    started = time.monotonic()
+
+    while args.max is None or claimed < args.max:
+        limit = args.batch if args.max is None else min(args.batch, args.max - claimed)
+        async with async_session_maker() as session:
+            result = await DeadLetterService.replay(session, filters, limit)
+
+        if not result.claimed:
+            break
+
+        claimed += result.claimed
+        replayed += result.replayed
+        skipped += result.skipped
+        print(f"replayed {replayed}, skipped {skipped}")
+
+        if args.rate:
+            # Keep the requeue rate at --rate so the retried traffic does not swamp the operators
+            ahead = replayed / args.rate - (time.monotonic() - started)
+            if ahead > 0:
+                await asyncio.sleep(ahead)
+
+    print(f"Done: {claimed} dead letters claimed, {replayed} SMS requeued, {skipped} skipped")
+
+
+async def run(args) -> None:
+    filters = DeadLetterFilter(
+        since=args.since,
+        until=args.until,
+        account_id=args.account_id,
+        operator=args.operator,
+        error_class=args.error_class
+    )
+    try:
+        if args.dry_run:
+            await dry_run(filters, args.batch)
+        else:
+            await replay(filters, args)
+    finally:
+        await close_rabbitmq()
+        await close_redis()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--since", type=datetime.fromisoformat)
+    parser.add_argument("--until", type=datetime.fromisoformat)
+    parser.add_argument("--account-id", type=UUID)
+    parser.add_argument("--operator")
+    parser.add_argument("--error-class")
+    parser.add_argument("--batch", type=int, default=settings.DEAD_LETTER_REPLAY_BATCH)
+    parser.add_argument("--rate", type=float, default=0, help="Max messages requeued per second, 0 for unlimited")
+    parser.add_argument("--max", type=int, help="Stop after claiming this many dead letters")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(run(args))
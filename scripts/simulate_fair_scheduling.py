@@ -0,0 +1,88 @@
+"""
+Simulate regular-queue latency for small accounts while one account floods it.
+
+Discrete-time model, no broker or Redis needed: workers drain --capacity messages per
+tick; a bulk account submits --flood messages at t=0 and --small accounts each submit
+one message every --small-interval ticks. Compares plain FIFO with the fair dispatcher
+(DeficitRoundRobin feeding a queue capped at --target-depth) and prints p50/p99 queueing
+latency per class, in ticks.
+
+    python -m scripts.simulate_fair_scheduling --flood 200000 --capacity 500
+"""
+import argparse
+import statistics
+from collections import deque
+
+from app.services.fair_scheduler import DeficitRoundRobin
+
+BULK = "bulk"
+
+
+def percentiles(samples: list[int]) -> str:
+    if not samples:
+        return "no samples"
+    samples.sort()
+    p99 = samples[max(0, int(len(samples) * 0.99) - 1)]
+    return f"p50 {statistics.median(samples):.0f}, p99 {p99}, max {samples[-1]} ({len(samples)} msgs)"
+
+
+def arrivals(tick: int, flood: int, small: int, small_interval: int) -> list[tuple[str, int]]:
+    batch = [(BULK, tick)] * flood if tick == 0 else []
+    if tick % small_interval == 0:
+        batch.extend((f"small-{n}", tick) for n in range(small))
+    return batch
+
+
+def simulate_fifo(args) -> dict[str, list[int]]:
+    queue = deque()
+    latencies = {"bulk": [], "small": []}
+    for tick in range(args.ticks):
+        queue.extend(arrivals(tick, args.flood, args.small, args.small_interval))
+        for _ in range(min(args.capacity, len(queue))):
+            account_id, submitted = queue.popleft()
+            latencies["bulk" if account_id == BULK else "small"].append(tick - submitted)
+    return latencies
+
+
+def simulate_fair(args) -> dict[str, list[int]]:
+    backlogs: dict[str, deque] = {}
+    drr = DeficitRoundRobin(args.quantum)
+    queue = deque()
+    latencies = {"bulk": [], "small": []}
+
+    for tick in range(args.ticks):
+        for account_id, submitted in arrivals(tick, args.flood, args.small, args.small_interval):
+            backlogs.setdefault(account_id, deque()).append(submitted)
+
+        # The dispatcher tops the queue up to target depth; workers then drain it
+        sizes = {account_id: len(backlog) for account_id, backlog in backlogs.items() if backlog}
+        budget = args.target_depth - len(queue)
+        if sizes and budget > 0:
+            weight_of = lambda a: args.bulk_weight if a == BULK else 1
+            for account_id, allocated in drr.allocate(sizes, budget, weight_of):
+                backlog = backlogs[account_id]
+                queue.extend((account_id, backlog.popleft()) for _ in range(allocated))
+
+        for _ in range(min(args.capacity, len(queue))):
+            account_id, submitted = queue.popleft()
+            latencies["bulk" if account_id == BULK else "small"].append(tick - submitted)
+    return latencies
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--flood", type=int, default=200000)
+    parser.add_argument("--small", type=int, default=20)
+    parser.add_argument("--small-interval", type=int, default=5)
+    parser.add_argument("--capacity", type=int, default=500)
+    parser.add_argument("--ticks", type=int, default=600)
+    parser.add_argument("--quantum", type=int, default=50)
+    parser.add_argument("--target-depth", type=int, default=1000)
+    parser.add_argument("--bulk-weight", type=int, default=1)
+    args = parser.parse_args()
+
+    for label, simulate in (("fifo", simulate_fifo), ("fair", simulate_fair)):
+        latencies = simulate(args)
+        print(f"{label}:")
+        print(f"  small accounts: {percentiles(latencies['small'])}")
+        print(f"  bulk account:   {percentiles(latencies['bulk'])}")
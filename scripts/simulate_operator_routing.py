@@ -0,0 +1,124 @@
+"""
+Simulate per-message send latency under static priority and adaptive operator routing.
+
+Virtual time, no operators needed: operator_1 degrades (slow and returning HTTP 503) for
+the middle half of the run and then recovers. Static routing walks operators by
+priority with the 1s/2s/4s backoff on HTTP errors; adaptive routing uses OperatorRouter
+with one attempt per operator. Prints success rate, p50/p99 send latency and each
+operator's share of successful sends.
+
+    python -m scripts.simulate_operator_routing --messages 20000
+"""
+import argparse
+import random
+import statistics
+from collections import Counter
+from dataclasses import dataclass
+
+from config.operator_config import OPERATORS
+from config.settings import settings
+from workers.operator_router import OperatorRouter
+
+BACKOFF = (1, 2, 4)
+
+
+@dataclass
+class Profile:
+    latency_min: float
+    latency_max: float
+    failure_rate: float
+    error_rate: float
+
+
+HEALTHY = {
+    "operator_1": Profile(0.05, 0.2, 0.05, 0.0),
+    "operator_2": Profile(0.08, 0.25, 0.05, 0.0),
+    "operator_3": Profile(0.1, 0.3, 0.05, 0.0),
+}
+DEGRADED = Profile(0.8, 1.5, 0.05, 0.6)
+
+
+def profile_for(name: str, index: int, messages: int) -> Profile:
+    if name == "operator_1" and messages // 4 <= index < messages * 3 // 4:
+        return DEGRADED
+    return HEALTHY[name]
+
+
+def call(rng: random.Random, profile: Profile) -> tuple[float, str]:
+    """(latency, outcome) with outcome one of sent, failed, error."""
+    latency = rng.uniform(profile.latency_min, profile.latency_max)
+    if rng.random() < profile.error_rate:
+        return latency, "error"
+    if rng.random() < profile.failure_rate:
+        return latency, "failed"
+    return latency, "sent"
+
+
+def simulate_static(args, rng: random.Random):
+    latencies, used = [], Counter()
+    for index in range(args.messages):
+        elapsed = 0.0
+        for operator in sorted(OPERATORS, key=lambda x: x.priority):
+            outcome = "error"
+            for attempt in range(len(BACKOFF)):
+                latency, outcome = call(rng, profile_for(operator.name, index, args.messages))
+                elapsed += latency
+                if outcome != "error":
+                    break
+                if attempt < len(BACKOFF) - 1:
+                    elapsed += BACKOFF[attempt]
+            if outcome == "sent":
+                used[operator.name] += 1
+                break
+        latencies.append(elapsed)
+    return latencies, used
+
+
+def simulate_adaptive(args, rng: random.Random):
+    now = [0.0]
+    router = OperatorRouter(
+        OPERATORS,
+        window=settings.OPERATOR_STATS_WINDOW,
+        max_age=settings.OPERATOR_STATS_MAX_AGE,
+        min_samples=settings.OPERATOR_MIN_SAMPLES,
+        exponent=settings.OPERATOR_ROUTING_EXPONENT,
+        breaker_window=settings.OPERATOR_BREAKER_WINDOW,
+        breaker_failure_rate=settings.OPERATOR_BREAKER_FAILURE_RATE,
+        breaker_cooldown=settings.OPERATOR_BREAKER_COOLDOWN,
+        clock=lambda: now[0],
+        rng=rng
+    )
+
+    latencies, used = [], Counter()
+    for index in range(args.messages):
+        now[0] = index * args.interval
+        elapsed = 0.0
+        for operator in router.rank():
+            router.begin(operator)
+            latency, outcome = call(rng, profile_for(operator.name, index, args.messages))
+            elapsed += latency
+            router.record(operator, latency, outcome == "sent")
+            if outcome == "sent":
+                used[operator.name] += 1
+                break
+        latencies.append(elapsed)
+    return latencies, used
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--interval", type=float, default=0.01, help="seconds between messages")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    for label, simulate in (("static", simulate_static), ("adaptive", simulate_adaptive)):
+        latencies, used = simulate(args, random.Random(args.seed))
+        latencies.sort()
+        sent = sum(used.values())
+        p99 = latencies[int(len(latencies) * 0.99) - 1]
+        shares = ", ".join(f"{name} {used[name] / sent:.0%}" for name in sorted(used))
+        print(
+            f"{label:>8}: {sent / args.messages:.2%} sent, p50 {statistics.median(latencies) * 1000:.0f} ms, "
+            f"p99 {p99 * 1000:.0f} ms | {shares}"
+        )
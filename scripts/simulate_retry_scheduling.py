@@ -0,0 +1,112 @@
+"""
+Simulate worker throughput during an operator brownout with inline backoff vs delay queues.
+
+Discrete-event model, no broker needed: --workers slots drain a backlog of --messages
+while every operator answers --error-rate of calls with HTTP 503. "inline" is the old
+behaviour (up to 3 calls per operator with 1s/2s sleeps in the worker slot);
+"delayed" makes one call per operator and parks a failed message in the
+SMS_RETRY_DELAYS tiers without holding a slot. Prints messages sent within --horizon
+seconds, slot time per message and slot-seconds spent asleep.
+
+    python -m scripts.simulate_retry_scheduling --workers 50 --messages 20000
+"""
+import argparse
+import heapq
+import random
+from collections import deque
+
+from config.operator_config import OPERATORS
+from config.settings import settings
+
+INLINE_BACKOFF = (1, 2)
+
+
+def call(rng: random.Random, args) -> tuple[float, bool]:
+    return rng.uniform(0.1, 0.3), rng.random() >= args.error_rate
+
+
+def inline_job(rng: random.Random, args) -> tuple[float, float, bool]:
+    """(slot time, of which asleep, sent)"""
+    busy = asleep = 0.0
+    for _ in OPERATORS:
+        for retry in range(len(INLINE_BACKOFF) + 1):
+            latency, ok = call(rng, args)
+            busy += latency
+            if ok:
+                return busy, asleep, True
+            if retry < len(INLINE_BACKOFF):
+                busy += INLINE_BACKOFF[retry]
+                asleep += INLINE_BACKOFF[retry]
+    return busy, asleep, False
+
+
+def delayed_job(rng: random.Random, args) -> tuple[float, float, bool]:
+    busy = 0.0
+    for _ in OPERATORS:
+        latency, ok = call(rng, args)
+        busy += latency
+        if ok:
+            return busy, 0.0, True
+    return busy, 0.0, False
+
+
+def simulate(job, retry_delays, args, rng: random.Random) -> dict:
+    ready = deque((message, 0) for message in range(args.messages))
+    events = []
+    free = args.workers
+    sent_at, failed, asleep, busy_total = [], 0, 0.0, 0.0
+    now = 0.0
+
+    while ready or events:
+        while free and ready:
+            message, attempt = ready.popleft()
+            busy, slept, ok = job(rng, args)
+            free -= 1
+            busy_total += busy
+            asleep += slept
+            heapq.heappush(events, (now + busy, "done", message, attempt, ok))
+
+        now, kind, message, attempt, ok = heapq.heappop(events)
+        if kind == "retry":
+            ready.append((message, attempt))
+            continue
+
+        free += 1
+        if ok:
+            sent_at.append(now)
+        elif attempt < len(retry_delays):
+            # The slot is already free; the message comes back when its tier expires
+            heapq.heappush(events, (now + retry_delays[attempt], "retry", message, attempt + 1, False))
+        else:
+            failed += 1
+
+    return {
+        "sent_in_horizon": sum(1 for t in sent_at if t <= args.horizon),
+        "sent": len(sent_at),
+        "failed": failed,
+        "slot_per_message": busy_total / args.messages,
+        "asleep": asleep,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--error-rate", type=float, default=0.5)
+    parser.add_argument("--horizon", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    for label, job, delays in (
+        ("inline", inline_job, []),
+        ("delayed", delayed_job, settings.SMS_RETRY_DELAYS),
+    ):
+        result = simulate(job, delays, args, random.Random(args.seed))
+        print(
+            f"{label:>8}: {result['sent_in_horizon']} sent in first {args.horizon:.0f}s "
+            f"({result['sent_in_horizon'] / args.horizon:.0f}/s), "
+            f"{result['sent'] / args.messages:.2%} sent overall, "
+            f"{result['slot_per_message']:.2f}s slot time/msg, "
+            f"{result['asleep']:.0f} slot-seconds asleep"
+        )
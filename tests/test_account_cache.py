@@ -0,0 +1,39 @@
+import importlib
+from datetime import datetime
+from uuid import uuid4
+import pytest
+
+from app.services.account_cache import AccountCache, AccountSnapshot, redis_account_api_key_key, redis_account_key
+
+# app.services re-exports the cache instance under the module's name
+account_cache_module = importlib.import_module("app.services.account_cache")
+
+@pytest.fixture
+def cache(redis_client, monkeypatch):
+    async def get_redis():
+        return redis_client
+
+    monkeypatch.setattr(account_cache_module, "get_redis", get_redis)
+    return AccountCache(max_size=10, ttl=60, channel="test:account-changes")
+
+
+async def test_change_drops_the_shared_copy_without_a_local_one(cache, redis_client):
+    snapshot = AccountSnapshot(id=uuid4(), api_key="key", balance=100, created_at=datetime.utcnow())
+    # Cached in Redis by another replica
+    await redis_client.set(redis_account_key(snapshot.api_key), snapshot.to_json())
+    await redis_client.set(redis_account_api_key_key(snapshot.id), snapshot.api_key)
+
+    await cache.publish_change(snapshot.id)
+
+    assert await redis_client.get(redis_account_key(snapshot.api_key)) is None
+
+
+async def test_change_drops_the_shared_copy_of_a_locally_cached_account(cache, redis_client):
+    snapshot = AccountSnapshot(id=uuid4(), api_key="key", balance=100, created_at=datetime.utcnow())
+    await redis_client.set(redis_account_key(snapshot.api_key), snapshot.to_json())
+    cache.put(snapshot)
+
+    await cache.publish_change(snapshot.id, 90)
+
+    assert await redis_client.get(redis_account_key(snapshot.api_key)) is None
+    assert cache.get(snapshot.api_key).balance == 90
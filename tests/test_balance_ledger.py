@@ -0,0 +1,93 @@
+import asyncio
+from uuid import uuid4
+
+from app.services.balance_ledger import FLUSHING_KEY, LOCK_KEY, RedisBalanceLedger, balance_key
+
+
+async def test_flush_lock_is_exclusive(redis_client):
+    ledger = RedisBalanceLedger(redis_client)
+
+    token = await ledger.acquire_lock()
+
+    assert token is not None
+    assert await ledger.acquire_lock() is None
+
+
+async def test_release_lock_keeps_a_lock_taken_over_after_expiry(redis_client):
+    ledger = RedisBalanceLedger(redis_client)
+    stale = await ledger.acquire_lock(ttl_ms=10)
+    # The first flush overran its TTL and another worker took the lock
+    await redis_client.delete(LOCK_KEY)
+    current = await ledger.acquire_lock()
+
+    await ledger.release_lock(stale)
+
+    assert await redis_client.get(LOCK_KEY) == current
+    await ledger.release_lock(current)
+    assert await redis_client.get(LOCK_KEY) is None
+
+
+class AccountRow:
+    """Stands in for the session; `on_read` runs between the balance read and its return."""
+
+    def __init__(self, balance: int, on_read=None):
+        self.balance = balance
+        self.on_read = on_read
+        self.reads = 0
+
+    async def scalar(self, statement):
+        self.reads += 1
+        balance = self.balance
+        if self.on_read:
+            on_read, self.on_read = self.on_read, None
+            await on_read(self)
+        return balance
+
+
+async def test_load_rereads_a_balance_a_finishing_flush_made_stale(redis_client):
+    ledger = RedisBalanceLedger(redis_client)
+    account_id = uuid4()
+    # A flush took a -5 delta that the DB row does not have yet
+    await redis_client.hset(FLUSHING_KEY, str(account_id), -5)
+
+    async def flush_finishes(row):
+        await ledger._begin_commit()
+        row.balance = 95
+        await ledger._end_flush()
+
+    row = AccountRow(100, flush_finishes)
+
+    assert await ledger.load(row, account_id)
+
+    assert row.reads == 2
+    assert await redis_client.get(balance_key(account_id)) == "95"
+
+
+async def test_load_waits_for_a_committing_flush(redis_client):
+    ledger = RedisBalanceLedger(redis_client)
+    account_id = uuid4()
+    await redis_client.hset(FLUSHING_KEY, str(account_id), -5)
+    await ledger._begin_commit()
+    # The commit has landed, the flushing hash is not dropped yet
+    row = AccountRow(95)
+
+    async def finish() -> None:
+        await asyncio.sleep(0.01)
+        await ledger._end_flush()
+
+    finishing = asyncio.create_task(finish())
+    assert await ledger.load(row, account_id)
+    await finishing
+
+    assert await redis_client.get(balance_key(account_id)) == "95"
+
+
+async def test_extend_lock_only_renews_its_own_lock(redis_client):
+    ledger = RedisBalanceLedger(redis_client)
+    stale = await ledger.acquire_lock(ttl_ms=10)
+    await redis_client.delete(LOCK_KEY)
+    current = await ledger.acquire_lock(ttl_ms=1000)
+
+    assert not await ledger.extend_lock(stale, 60000)
+    assert await ledger.extend_lock(current, 60000)
+    assert await redis_client.pttl(LOCK_KEY) > 1000
@@ -0,0 +1,142 @@
+import asyncio
+import random
+from datetime import datetime, timedelta
+from uuid import uuid4
+import pytest
+from sqlalchemy import delete, func, select, update
+
+from config.database import async_session_maker
+from core.models import Account, BalanceReservation
+from app.services import balance_quota
+from app.services.balance_quota import QuotaManager
+
+CREDITS = 5000
+
+
+@pytest.fixture
+async def account_id(database, monkeypatch):
+    async def publish_change(account_id, balance=None):
+        pass
+
+    monkeypatch.setattr(balance_quota.account_cache, "publish_change", publish_change)
+
+    account_id = uuid4()
+    async with async_session_maker() as session:
+        session.add(Account(id=account_id, api_key=f"test-{account_id.hex}", balance=CREDITS))
+        await session.commit()
+
+    yield account_id
+
+    async with async_session_maker() as session:
+        await session.execute(delete(BalanceReservation).where(BalanceReservation.account_id == account_id))
+        await session.execute(delete(Account).where(Account.id == account_id))
+        await session.commit()
+
+
+def quota_manager(**overrides) -> QuotaManager:
+    options = dict(block_size=100, refill_watermark=10, idle_timeout=0.0, sweep_interval=60.0, stale_after=60.0)
+    options.update(overrides)
+    return QuotaManager(**options)
+
+
+async def balances(account_id) -> tuple[int, int]:
+    """(accounts.balance, credits parked in reservations)"""
+    async with async_session_maker() as session:
+        balance = await session.scalar(select(Account.balance).where(Account.id == account_id))
+        reserved = await session.scalar(
+            select(func.coalesce(func.sum(BalanceReservation.credits), 0))
+            .where(BalanceReservation.account_id == account_id)
+        )
+    return balance, reserved
+
+
+async def test_waiter_on_a_released_block_reserves_into_a_registered_one(account_id):
+    manager = quota_manager()
+    assert await manager.deduct(account_id, 1)
+
+    # The idle release holds the block's lock while it returns the credits...
+    release = asyncio.create_task(manager._release_idle())
+    await asyncio.sleep(0)
+    # ...and a send queues behind it on the same lock
+    assert await manager.deduct(account_id, 1)
+    await release
+
+    block = manager._blocks[account_id]
+    assert not block.retired
+    assert block.remaining == 99
+
+    await manager._checkpoint()
+    balance, reserved = await balances(account_id)
+    assert balance + reserved == CREDITS - 2
+
+    await manager.stop()
+    assert await balances(account_id) == (CREDITS - 2, 0)
+
+
+async def test_concurrent_spending_with_idle_releases_and_a_crash_never_loses_credits(account_id):
+    rng = random.Random(1)
+    managers = [quota_manager() for _ in range(3)]
+    spent = [0] * len(managers)
+    lowest_balance = CREDITS
+    running = True
+
+    async def spend(manager: QuotaManager, sends: int) -> int:
+        total = 0
+        for _ in range(sends):
+            amount = rng.randint(1, 5)
+            if await manager.deduct(account_id, amount):
+                total += amount
+            await asyncio.sleep(rng.uniform(0, 0.002))
+        return total
+
+    async def spend_on(index: int, sends: int) -> None:
+        spent[index] += await spend(managers[index], sends)
+
+    async def sweep(manager: QuotaManager) -> None:
+        while running:
+            await asyncio.sleep(rng.uniform(0, 0.01))
+            await manager._release_idle()
+            await manager._checkpoint()
+
+    async def watch_balance() -> None:
+        nonlocal lowest_balance
+        while running:
+            balance, _ = await balances(account_id)
+            lowest_balance = min(lowest_balance, balance)
+            await asyncio.sleep(0.005)
+
+    background = [asyncio.create_task(sweep(manager)) for manager in managers]
+    background.append(asyncio.create_task(watch_balance()))
+    await asyncio.gather(*(spend_on(index, 300) for index in range(len(managers))))
+    running = False
+    await asyncio.gather(*background)
+
+    # managers[0] dies: its last checkpoint is all the survivors can return
+    crashed = managers.pop(0)
+    await crashed._checkpoint()
+    # Sends the crashed process made after its last checkpoint
+    uncheckpointed = await spend(crashed, 20)
+    assert uncheckpointed > 0
+    for block in crashed._blocks.values():
+        if block.refill_task is not None:
+            await block.refill_task
+    async with async_session_maker() as session:
+        await session.execute(
+            update(BalanceReservation)
+            .where(BalanceReservation.owner == crashed.owner)
+            .values(updated_at=datetime.utcnow() - timedelta(minutes=5))
+        )
+        await session.commit()
+
+    await managers[0]._reap_stale()
+    for manager in managers:
+        await manager.stop()
+
+    balance, reserved = await balances(account_id)
+    total_spent = sum(spent) + uncheckpointed
+    assert reserved == 0
+    assert lowest_balance >= 0
+    assert 0 <= total_spent <= CREDITS
+    # The customer never pays for more than was sent; the gateway leaks at most the
+    # crashed process's spends since its last checkpoint
+    assert CREDITS - total_spent <= balance <= CREDITS - total_spent + uncheckpointed
@@ -0,0 +1,46 @@
+from workers import consumer
+from workers.consumer import SMSConsumer
+
+
+class Delivery:
+    """An incoming message that records how it was settled."""
+
+    def __init__(self, redelivered: bool):
+        self.redelivered = redelivered
+        self.correlation_id = "task-1"
+        self.settled = []
+
+    async def nack(self, requeue: bool = True) -> None:
+        self.settled.append(("nack", requeue))
+
+    async def reject(self, requeue: bool = False) -> None:
+        self.settled.append(("reject", requeue))
+
+
+async def test_message_is_requeued_when_the_dlq_publish_fails(monkeypatch):
+    async def publish_task(*args, **kwargs):
+        raise ConnectionError("broker unavailable")
+
+    monkeypatch.setattr(consumer, "publish_task", publish_task)
+    monkeypatch.setattr(consumer, "parse_task_kwargs", lambda message: {"sms_id": "sms-1"})
+    message = Delivery(redelivered=True)
+
+    await SMSConsumer(1, 1)._on_failure(message, RuntimeError("send failed"))
+
+    assert message.settled == [("nack", True)]
+
+
+async def test_message_is_rejected_once_dead_lettered(monkeypatch):
+    published = []
+
+    async def publish_task(task_name, kwargs, queue):
+        published.append(kwargs)
+
+    monkeypatch.setattr(consumer, "publish_task", publish_task)
+    monkeypatch.setattr(consumer, "parse_task_kwargs", lambda message: {"sms_id": "sms-1"})
+    message = Delivery(redelivered=True)
+
+    await SMSConsumer(1, 1)._on_failure(message, RuntimeError("send failed"))
+
+    assert message.settled == [("reject", False)]
+    assert published[0]["kwargs"] == {"sms_id": "sms-1"}
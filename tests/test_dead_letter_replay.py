@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+import pytest
+from sqlalchemy import delete, select
+
+from config.database import async_session_maker
+from config.settings import settings
+from core.consts import SMSStatus, SMSType
+from core.ids import uuid7
+from core.models import SMS, Account, DeadLetter, SMSStatsHourly
+from app.repositories.dead_letter_repository import DeadLetterFilter
+from app.services import dead_letter_service, sms_stats
+from app.services.dead_letter_service import DeadLetterService
+from app.services.send_dedup import SendDedup, send_state_key
+from app.services.sms_service import PROCESS_SMS_TASK, SMSService
+
+
+@pytest.fixture
+async def replays(database, redis_client, monkeypatch):
+    """Tasks queued by replays, with send state on fakeredis; cleans up the account's rows."""
+    dedup = SendDedup(redis_client, claim_ttl=30, ttl=600)
+    queued = []
+
+    async def get_send_dedup():
+        return dedup
+
+    async def get_redis():
+        return redis_client
+
+    async def publish_messages(entries):
+        queued.extend(kwargs["sms_id"] for _, kwargs in entries)
+
+    monkeypatch.setattr(dead_letter_service, "get_send_dedup", get_send_dedup)
+    monkeypatch.setattr(sms_stats, "get_redis", get_redis)
+    monkeypatch.setattr(SMSService, "publish_messages", staticmethod(publish_messages))
+    monkeypatch.setattr(settings, "SMS_OUTBOX_ENABLED", False)
+
+    account_id = uuid4()
+    async with async_session_maker() as session:
+        session.add(Account(id=account_id, api_key=f"test-{account_id.hex}", balance=0))
+        await session.commit()
+
+    yield account_id, queued
+
+    async with async_session_maker() as session:
+        await session.execute(delete(DeadLetter).where(DeadLetter.account_id == account_id))
+        await session.execute(delete(SMSStatsHourly).where(SMSStatsHourly.account_id == account_id))
+        await session.execute(delete(SMS).where(SMS.account_id == account_id))
+        await session.execute(delete(Account).where(Account.id == account_id))
+        await session.commit()
+
+
+async def dead_lettered(account_id, status: int) -> str:
+    created_at = datetime.utcnow() - timedelta(minutes=5)
+    sms_id = uuid7(created_at)
+    async with async_session_maker() as session:
+        session.add(SMS(
+            id=sms_id,
+            account_id=account_id,
+            phone_number="+15550100000",
+            message="replay",
+            sms_type=SMSType.REGULAR,
+            status=status,
+            created_at=created_at
+        ))
+        await session.flush()
+        session.add(DeadLetter(
+            task_id=uuid4().hex,
+            task_name=PROCESS_SMS_TASK,
+            sms_id=sms_id,
+            account_id=account_id,
+            error_class="RuntimeError",
+            payload={"sms_id": str(sms_id), "created_at": created_at.isoformat()},
+            failed_at=datetime.utcnow()
+        ))
+        await session.commit()
+    return str(sms_id)
+
+
+async def status_of(sms_id: str) -> int:
+    async with async_session_maker() as session:
+        return await session.scalar(select(SMS.status).where(SMS.id == sms_id))
+
+
+async def test_replay_skips_messages_an_operator_accepted_or_still_in_flight(replays, redis_client):
+    account_id, queued = replays
+    failed = await dead_lettered(account_id, SMSStatus.FAILED)
+    lost = await dead_lettered(account_id, SMSStatus.PENDING)
+    accepted = await dead_lettered(account_id, SMSStatus.PENDING)
+    accepted_then_failed = await dead_lettered(account_id, SMSStatus.FAILED)
+    result_on_its_way = await dead_lettered(account_id, SMSStatus.PENDING)
+    await redis_client.set(send_state_key(failed), "d")
+    await redis_client.set(send_state_key(accepted), "s|operator_1|m-1")
+    await redis_client.set(send_state_key(accepted_then_failed), "s|operator_1|m-2")
+    await redis_client.set(send_state_key(result_on_its_way), "d")
+
+    async with async_session_maker() as session:
+        result = await DeadLetterService.replay(session, DeadLetterFilter(account_id=account_id), limit=10)
+
+    assert (result.claimed, result.replayed, result.skipped) == (5, 2, 3)
+    assert sorted(queued) == sorted([failed, lost])
+    assert await status_of(failed) == SMSStatus.PENDING
+    assert await status_of(accepted_then_failed) == SMSStatus.FAILED
+    assert not await redis_client.exists(send_state_key(failed))
+    # Their send state still stops a redelivery from reaching an operator again
+    assert await redis_client.get(send_state_key(accepted)) == "s|operator_1|m-1"
+    assert await redis_client.get(send_state_key(result_on_its_way)) == "d"
@@ -0,0 +1,151 @@
+from collections import Counter
+from uuid import uuid4
+import pytest
+
+from core.consts import QueueName
+from app.services.fair_scheduler import (
+    ACTIVE_ACCOUNTS_KEY,
+    IN_FLIGHT_KEY,
+    DeficitRoundRobin,
+    FairQueue,
+    fair_queue_key
+)
+from app.services.sms_service import SMSService
+from workers import fair_dispatcher
+from workers.fair_dispatcher import FairDispatcher
+
+EXPRESS_BACKLOG = 100
+
+
+def tasks_of(account_id: str, n: int) -> list[dict]:
+    return [{"sms_id": str(uuid4()), "account_id": account_id} for _ in range(n)]
+
+
+def test_capacity_is_split_by_weight_whatever_the_backlog():
+    drr = DeficitRoundRobin(quantum=10)
+    weights = {"heavy": 3, "light": 1, "flood": 1}
+    backlogs = {"heavy": 100_000, "light": 100_000, "flood": 10_000_000}
+
+    sent = Counter()
+    for _ in range(50):
+        for account_id, n in drr.allocate(backlogs, 100, weights.__getitem__):
+            sent[account_id] += n
+            backlogs[account_id] -= n
+
+    assert sum(sent.values()) == 5000
+    assert sent["heavy"] == pytest.approx(3 * sent["light"], rel=0.02)
+    assert sent["flood"] == pytest.approx(sent["light"], rel=0.02)
+
+
+def test_small_backlog_is_served_next_to_a_flood():
+    drr = DeficitRoundRobin(quantum=10)
+
+    allocations = dict(drr.allocate({"flood": 1_000_000, "small": 5}, 100, lambda account_id: 1))
+
+    assert allocations == {"flood": 95, "small": 5}
+
+
+def test_spare_capacity_goes_to_the_remaining_backlog():
+    drr = DeficitRoundRobin(quantum=10)
+
+    allocations = dict(drr.allocate({"a": 30, "b": 500}, 200, lambda account_id: 1))
+
+    assert allocations == {"a": 30, "b": 170}
+
+
+async def test_take_moves_tasks_in_flight_and_drops_drained_accounts(redis_client):
+    queue = FairQueue(redis_client)
+    await queue.push(tasks_of("a", 3) + tasks_of("b", 1))
+
+    taken = await queue.take("a", 2)
+    assert len(taken) == 2
+    assert await redis_client.smembers(ACTIVE_ACCOUNTS_KEY) == {"a", "b"}
+
+    taken += await queue.take("a", 5)
+    assert len(taken) == 3
+    assert await redis_client.smembers(ACTIVE_ACCOUNTS_KEY) == {"b"}
+    assert await queue.in_flight() == taken
+    assert await queue.take("a", 1) == []
+    assert await queue.backlogs() == {"b": 1}
+
+
+class Broker:
+    """Queue depths the dispatcher sees and the tasks it published."""
+
+    def __init__(self):
+        self.depths = {QueueName.EXPRESS: 0, QueueName.REGULAR: 0}
+        self.published = []
+        self.failing = False
+
+    async def get_queue_depth(self, queue: str) -> int:
+        return self.depths[queue]
+
+    async def publish_to_queues(self, entries) -> None:
+        if self.failing:
+            raise ConnectionError("broker unavailable")
+        self.published.extend(kwargs for _, kwargs in entries)
+
+
+@pytest.fixture
+def broker(monkeypatch):
+    broker = Broker()
+
+    async def refresh_weights(self, active):
+        self._weights = dict.fromkeys(active, 1)
+
+    monkeypatch.setattr(fair_dispatcher, "get_queue_depth", broker.get_queue_depth)
+    monkeypatch.setattr(SMSService, "publish_to_queues", staticmethod(broker.publish_to_queues))
+    monkeypatch.setattr(FairDispatcher, "_refresh_weights", refresh_weights)
+    return broker
+
+
+def dispatcher() -> FairDispatcher:
+    return FairDispatcher(
+        quantum=10,
+        target_depth=50,
+        express_backlog=EXPRESS_BACKLOG,
+        poll_interval=0.01,
+        weight_refresh_interval=60.0
+    )
+
+
+async def test_regular_dispatch_pauses_above_the_express_backlog(broker, redis_client):
+    queue = FairQueue(redis_client)
+    await queue.push(tasks_of("a", 20))
+    feeder = dispatcher()
+
+    broker.depths[QueueName.EXPRESS] = EXPRESS_BACKLOG + 1
+    assert await feeder.dispatch_once(queue) == 0
+    assert await redis_client.llen(fair_queue_key("a")) == 20
+
+    broker.depths[QueueName.EXPRESS] = EXPRESS_BACKLOG
+    assert await feeder.dispatch_once(queue) == 20
+    assert len(broker.published) == 20
+
+
+async def test_dispatch_tops_the_regular_queue_up_to_its_target(broker, redis_client):
+    queue = FairQueue(redis_client)
+    await queue.push(tasks_of("a", 100))
+    broker.depths[QueueName.REGULAR] = 30
+
+    assert await dispatcher().dispatch_once(queue) == 20
+    assert await redis_client.llen(fair_queue_key("a")) == 80
+
+
+async def test_tasks_taken_before_a_failed_publish_are_recovered(broker, redis_client):
+    queue = FairQueue(redis_client)
+    pushed = tasks_of("a", 5) + tasks_of("b", 5)
+    await queue.push(pushed)
+    feeder = dispatcher()
+
+    broker.failing = True
+    with pytest.raises(ConnectionError):
+        await feeder.dispatch_once(queue)
+    assert await redis_client.llen(IN_FLIGHT_KEY) == 10
+
+    broker.failing = False
+    await feeder.recover(queue)
+
+    assert sorted(task["sms_id"] for task in broker.published) == sorted(task["sms_id"] for task in pushed)
+    assert await redis_client.llen(IN_FLIGHT_KEY) == 0
+    assert await queue.backlogs() == {}
@@ -0,0 +1,154 @@
+import asyncio
+import importlib
+from datetime import datetime
+from types import SimpleNamespace
+from uuid import uuid4
+import pytest
+from fastapi import HTTPException, Response
+
+from config.settings import settings
+from core.consts import SMSStatus
+from app.schemas.sms_schema import SMSResponse, SMSSendRequest
+from app.services.account_cache import AccountSnapshot
+from app.services.idempotency import ACQUIRED, DONE, IdempotencyStore, fingerprint, idempotency_key
+
+# app.routers re-exports the APIRouter under the module's name
+sms_router = importlib.import_module("app.routers.sms_router")
+
+
+@pytest.fixture
+def account():
+    return AccountSnapshot(id=uuid4(), api_key="test", balance=10_000, created_at=datetime.utcnow())
+
+
+@pytest.fixture
+def store(redis_client):
+    store = IdempotencyStore(redis_client, ttl=60, lock_ttl=10.0, wait=2.0, poll_interval=0.01)
+    # How long the faked send takes, and whether it fails once committed
+    store.sleep = 0.05
+    store.fail_after_commit = False
+    return store
+
+
+@pytest.fixture
+def sends(store, monkeypatch):
+    """SMS rows created by /sms/send, which takes its idempotency store from `store`."""
+    created = []
+
+    async def get_idempotency_store():
+        return store
+
+    async def create_sms(sms_data, account, db, on_commit=None):
+        # Long enough for a duplicate to arrive while the first request holds the lock
+        await asyncio.sleep(store.sleep)
+        sms = SimpleNamespace(
+            id=uuid4(),
+            account_id=account.id,
+            phone_number=sms_data.phone_number,
+            message=sms_data.message,
+            sms_type=sms_data.sms_type,
+            status=SMSStatus.PENDING,
+            created_at=datetime.utcnow(),
+            sent_at=None
+        )
+        created.append(sms)
+        if on_commit:
+            await on_commit(sms)
+        if store.fail_after_commit:
+            raise ConnectionError("broker unavailable")
+        return sms
+
+    monkeypatch.setattr(sms_router, "get_idempotency_store", get_idempotency_store)
+    monkeypatch.setattr(sms_router, "create_sms", create_sms)
+    monkeypatch.setattr(settings, "IDEMPOTENCY_ENABLED", True)
+    return created
+
+
+def send(account, key: str, message: str = "hello"):
+    request = SMSSendRequest(phone_number="+15550100000", message=message)
+    return sms_router.send_sms(request, account, Response(), db=None, idempotency_key=key)
+
+
+def sms_response(account) -> SMSResponse:
+    return SMSResponse(
+        id=uuid4(),
+        account_id=account.id,
+        phone_number="+15550100000",
+        message="hello",
+        sms_type=1,
+        status=SMSStatus.PENDING,
+        created_at=datetime.utcnow()
+    )
+
+
+async def test_concurrent_duplicates_send_once(sends, account):
+    responses = await asyncio.gather(*(send(account, "key-1") for _ in range(5)))
+
+    assert len(sends) == 1
+    assert {response.id for response in responses} == {sends[0].id}
+
+
+async def test_key_reused_with_a_different_body_is_rejected(sends, account):
+    await send(account, "key-1", "hello")
+
+    with pytest.raises(HTTPException) as error:
+        await send(account, "key-1", "goodbye")
+
+    assert error.value.status_code == 422
+    assert len(sends) == 1
+
+
+async def test_failed_request_releases_the_key_for_a_retry(sends, account, monkeypatch):
+    async def failing_create_sms(sms_data, account, db, on_commit=None):
+        raise HTTPException(status_code=402, detail="Insufficient balance")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(sms_router, "create_sms", failing_create_sms)
+        with pytest.raises(HTTPException):
+            await send(account, "key-1")
+
+    response = await send(account, "key-1")
+
+    assert len(sends) == 1
+    assert response.id == sends[0].id
+
+
+async def test_failure_after_the_commit_keeps_the_response(sends, store, account):
+    store.fail_after_commit = True
+    with pytest.raises(ConnectionError):
+        await send(account, "key-1")
+
+    store.fail_after_commit = False
+    response = await send(account, "key-1")
+
+    assert len(sends) == 1
+    assert response.id == sends[0].id
+
+
+async def test_lock_outlives_its_ttl_while_the_request_runs(sends, store, account):
+    store.lock_ttl_ms = 60
+    store.sleep = 0.3
+
+    first = asyncio.create_task(send(account, "key-1"))
+    await asyncio.sleep(0.15)
+    duplicate = await send(account, "key-1")
+
+    assert (await first).id == duplicate.id
+    assert len(sends) == 1
+
+
+async def test_complete_after_the_lock_expired_keeps_the_newer_claim(store, account, redis_client):
+    body = SMSSendRequest(phone_number="+15550100000", message="hello").model_dump_json()
+    stale = await store.claim(account.id, "key-1", body)
+    assert stale.state == ACQUIRED
+    # The lock expired and a retry claimed the key
+    await redis_client.delete(stale.key)
+    current = await store.claim(account.id, "key-1", body)
+
+    response = sms_response(account)
+    await store.complete(stale, response)
+
+    assert await redis_client.get(idempotency_key(account.id, "key-1")) == current.lock
+    await store.complete(current, response)
+    stored = await redis_client.get(current.key)
+    assert stored.startswith(f"{DONE}|{fingerprint(body)}|")
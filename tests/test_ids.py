@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from core.ids import ONE_MS, created_at_range, uuid7, uuid7_timestamp
+
+
+def test_ids_of_the_same_millisecond_sort_in_creation_order():
+    timestamp = datetime(2026, 3, 1, 12, 0, 0, 123000)
+
+    ids = [uuid7(timestamp) for _ in range(1000)]
+
+    assert sorted(ids) == ids
+    assert len(set(ids)) == len(ids)
+    assert all(uuid7_timestamp(value) == timestamp for value in ids)
+
+
+def test_ids_sort_by_time_across_milliseconds():
+    start = datetime(2026, 3, 1, 12, 0, 0)
+
+    ids = [uuid7(start + index * ONE_MS) for index in range(100)]
+
+    assert sorted(ids) == ids
+
+
+def test_id_is_a_version_7_rfc_uuid():
+    value = uuid7()
+
+    assert value.version == 7
+    assert value.variant == "specified in RFC 4122"
+
+
+def test_timestamp_is_truncated_to_the_millisecond():
+    timestamp = datetime(2026, 3, 1, 12, 0, 0, 123456)
+
+    assert uuid7_timestamp(uuid7(timestamp)) == datetime(2026, 3, 1, 12, 0, 0, 123000)
+
+
+def test_created_at_range_holds_the_created_at():
+    created_at = datetime(2026, 3, 1, 23, 59, 59, 999999)
+
+    start, end = created_at_range(uuid7(created_at))
+
+    assert start <= created_at < end
+    assert end - start == timedelta(milliseconds=1)
+
+
+def test_ids_without_a_timestamp_have_no_range():
+    value = uuid4()
+
+    assert uuid7_timestamp(value) is None
+    assert created_at_range(value) is None
@@ -0,0 +1,61 @@
+import asyncio
+
+from config.operator_config import OPERATORS
+from workers.operator_batcher import MISMATCH_RETRIES, OperatorBatcher
+
+
+class Operator:
+    """Answers batch calls from a list of canned responses, one per call."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    async def submit(self, operator, items):
+        self.calls.append([item.idempotency_key for item in items])
+        return self.responses.pop(0)(items)
+
+
+def sent(items):
+    return [(True, f"m-{item.idempotency_key}", None) for item in items]
+
+
+def missing_last(items):
+    return sent(items)[:-1]
+
+
+async def send_all(batcher, keys):
+    operator = OPERATORS[0]
+    return await asyncio.gather(*(
+        batcher.send(operator, "+15550100000", "batch", key) for key in keys
+    ))
+
+
+async def test_count_mismatch_is_resent_to_the_same_operator_with_the_same_keys():
+    operator = Operator(missing_last, sent)
+    batcher = OperatorBatcher(operator.submit, max_wait=0.01)
+
+    results = await send_all(batcher, ["a", "b", "c"])
+
+    assert results == [(True, "m-a", None), (True, "m-b", None), (True, "m-c", None)]
+    assert operator.calls == [["a", "b", "c"], ["a", "b", "c"]]
+
+
+async def test_persistent_count_mismatch_fails_the_batch():
+    operator = Operator(*[missing_last] * (MISMATCH_RETRIES + 1))
+    batcher = OperatorBatcher(operator.submit, max_wait=0.01)
+
+    results = await send_all(batcher, ["a", "b"])
+
+    assert all(result == (False, None, "Malformed batch response") for result in results)
+    assert len(operator.calls) == MISMATCH_RETRIES + 1
+
+
+async def test_count_mismatch_without_idempotency_keys_is_not_resent():
+    operator = Operator(missing_last, sent)
+    batcher = OperatorBatcher(operator.submit, max_wait=0.01)
+
+    results = await send_all(batcher, ["a", None])
+
+    assert not any(success for success, _, _ in results)
+    assert len(operator.calls) == 1
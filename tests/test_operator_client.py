@@ -0,0 +1,106 @@
+import asyncio
+import httpx
+import pytest
+
+from config.operator_config import OPERATORS
+from config.settings import settings
+from workers import operator_client
+from workers.operator_batcher import BatchItem
+from workers.operator_client import OperatorClient
+from workers.operator_router import CLOSED, OperatorRouter
+
+
+async def open_pool():
+    return OperatorClient.get_client(OPERATORS[0])
+
+
+def test_pools_are_closed_when_their_event_loop_shuts_down():
+    first = asyncio.run(open_pool())
+    assert first.is_closed
+
+    second = asyncio.run(open_pool())
+    assert second is not first
+    assert second.is_closed
+
+
+async def test_close_shuts_the_pools_of_the_running_loop():
+    client = await open_pool()
+
+    await OperatorClient.close()
+
+    assert client.is_closed
+    assert await open_pool() is not client
+    await OperatorClient.close()
+
+
+@pytest.fixture
+def router(monkeypatch):
+    router = OperatorRouter(
+        OPERATORS, window=200, max_age=60, min_samples=20, exponent=2,
+        breaker_window=20, breaker_failure_rate=0.5, breaker_cooldown=10
+    )
+    monkeypatch.setattr(operator_client, "get_operator_router", lambda: router)
+    return router
+
+
+def serve(monkeypatch, handler) -> None:
+    """Answer every operator call with `handler` instead of the network."""
+    clients = {}
+
+    def get_client(operator):
+        if operator.name not in clients:
+            clients[operator.name] = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        return clients[operator.name]
+
+    monkeypatch.setattr(OperatorClient, "get_client", staticmethod(get_client))
+
+
+async def test_a_garbled_response_fails_over_to_the_next_operator(router, monkeypatch):
+    first, second = sorted(OPERATORS, key=lambda op: op.priority)[:2]
+
+    def handler(request):
+        if str(request.url) == first.url:
+            return httpx.Response(200, text='{"status": "se')
+        return httpx.Response(200, json={"status": "sent", "message_id": "m-1"})
+
+    serve(monkeypatch, handler)
+    monkeypatch.setattr(settings, "OPERATOR_ROUTING_ADAPTIVE", False)
+
+    result = await OperatorClient.send_sms("+15550100000", "hello", idempotency_key="key-1")
+
+    assert result == (True, "m-1", None, second.name)
+    assert router._stats[first.name].success_rate == 0.0
+
+
+async def test_a_failed_batch_counts_as_one_call(router, monkeypatch):
+
+    async def send_batch(operator, items):
+        return [(False, None, "HTTP error 503")] * len(items)
+
+    monkeypatch.setattr(OperatorClient, "_send_batch", staticmethod(send_batch))
+    loop = asyncio.get_running_loop()
+    items = [BatchItem("+15550100000", "batch", str(index), loop.create_future()) for index in range(50)]
+
+    results = await OperatorClient._submit_batch(OPERATORS[0], items)
+
+    assert len(results) == 50
+    assert router._breakers[OPERATORS[0].name].state == CLOSED
+    assert len(router._stats[OPERATORS[0].name]) == 1
+
+
+@pytest.mark.parametrize("body", [
+    '{"results": [{"status": "se',
+    '[]',
+    '{"results": null}',
+    '{"results": {"status": "sent"}}',
+    '{"results": ["sent", "sent"]}',
+])
+async def test_a_garbled_batch_response_fails_the_batch(body, monkeypatch):
+    serve(monkeypatch, lambda request: httpx.Response(200, text=body))
+    loop = asyncio.get_running_loop()
+    items = [BatchItem("+15550100000", "batch", str(index), loop.create_future()) for index in range(2)]
+
+    results = await OperatorClient._send_batch(OPERATORS[0], items)
+
+    assert len(results) == 2
+    assert not any(success for success, _, _ in results)
@@ -0,0 +1,116 @@
+import asyncio
+import time
+from collections import Counter
+import pytest
+
+from config.operator_config import OPERATORS
+from config.settings import settings
+from workers.operator_client import OperatorClient
+from workers.operator_router import OperatorRouter
+
+HEDGE_DELAY = 0.05
+SLOW = 0.5
+
+
+class Operators:
+    """Operators answering after a set delay, recording when each call started and how it ended."""
+
+    def __init__(self, delays: dict, failing=()):
+        self.delays = delays
+        self.failing = set(failing)
+        self.started = {}
+        self.cancelled = []
+
+    async def send(self, operator, phone_number, message, idempotency_key=None):
+        self.started[operator.name] = time.monotonic()
+        try:
+            await asyncio.sleep(self.delays[operator.name])
+        except asyncio.CancelledError:
+            self.cancelled.append(operator.name)
+            raise
+        if operator.name in self.failing:
+            return False, None, "HTTP error 503"
+        return True, f"{operator.name}-message", None
+
+
+@pytest.fixture
+def router(monkeypatch):
+    router = OperatorRouter(
+        OPERATORS, window=200, max_age=60, min_samples=20, exponent=2,
+        breaker_window=20, breaker_failure_rate=0.5, breaker_cooldown=10
+    )
+    # Every operator usually answers within HEDGE_DELAY
+    for operator in OPERATORS:
+        for _ in range(20):
+            router.record(operator, HEDGE_DELAY, True)
+    monkeypatch.setattr(OperatorClient, "hedge_metrics", Counter())
+    monkeypatch.setattr(settings, "OPERATOR_HEDGE_MIN_DELAY", 0.01)
+    return router
+
+
+def serve(monkeypatch, operators: Operators) -> None:
+    monkeypatch.setattr(OperatorClient, "_send", staticmethod(operators.send))
+
+
+async def send_hedged(router):
+    started = time.monotonic()
+    result = await OperatorClient._send_hedged(router, router.operators, "+15550100000", "hello", "key-1")
+    return result, started
+
+
+async def test_fast_operator_is_not_hedged(router, monkeypatch):
+    first, second, third = router.operators
+    operators = Operators({first.name: 0.01, second.name: 0.01, third.name: 0.01})
+    serve(monkeypatch, operators)
+
+    (success, _, _, name), _ = await send_hedged(router)
+
+    assert success and name == first.name
+    assert list(operators.started) == [first.name]
+    assert OperatorClient.hedge_metrics["hedged"] == 0
+
+
+async def test_hedge_fires_after_the_delay_and_cancels_the_loser(router, monkeypatch):
+    first, second, third = router.operators
+    operators = Operators({first.name: SLOW, second.name: 0.01, third.name: 0.01})
+    serve(monkeypatch, operators)
+
+    (success, message_id, _, name), started = await send_hedged(router)
+    await asyncio.sleep(0)
+
+    assert (success, message_id, name) == (True, f"{second.name}-message", second.name)
+    assert operators.started[second.name] - started == pytest.approx(HEDGE_DELAY, abs=0.04)
+    assert operators.cancelled == [first.name]
+    assert third.name not in operators.started
+    assert OperatorClient.hedge_metrics["hedge_won"] == 1
+    assert OperatorClient.hedge_metrics["cancelled"] == 1
+    # The cancelled call is kept as a latency sample without an outcome
+    assert router._stats[first.name]._samples[-1][2] is None
+
+
+async def test_at_most_one_hedge_per_message(router, monkeypatch):
+    first, second, third = router.operators
+    operators = Operators({first.name: SLOW, second.name: SLOW, third.name: 0.01})
+    serve(monkeypatch, operators)
+
+    (success, _, _, name), _ = await send_hedged(router)
+    await asyncio.sleep(0)
+
+    # Both calls outlived the hedge delay, yet the third operator was never raced in
+    assert success and name == first.name
+    assert list(operators.started) == [first.name, second.name]
+    assert operators.cancelled == [second.name]
+    assert OperatorClient.hedge_metrics["hedged"] == 1
+
+
+async def test_failover_continues_after_the_hedged_pair_fails(router, monkeypatch):
+    first, second, third = router.operators
+    operators = Operators({first.name: SLOW, second.name: 0.1, third.name: 0.01}, failing={first.name, second.name})
+    serve(monkeypatch, operators)
+
+    (success, _, _, name), _ = await send_hedged(router)
+
+    assert success and name == third.name
+    assert operators.started[third.name] >= operators.started[first.name] + SLOW
+    assert OperatorClient.hedge_metrics["hedged"] == 1
+    assert operators.cancelled == []
@@ -0,0 +1,182 @@
+import random
+from collections import Counter
+import pytest
+
+from config.operator_config import OperatorConfig
+from workers.operator_router import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, OperatorRouter
+
+COOLDOWN = 10.0
+MIN_SAMPLES = 20
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker("operator_1", window=10, failure_rate=0.5, cooldown=COOLDOWN, clock=clock)
+
+
+def operators(n: int = 3) -> list[OperatorConfig]:
+    return [OperatorConfig(name=f"operator_{i}", url=f"http://operator_{i}/send", priority=i) for i in range(1, n + 1)]
+
+
+def make_router(clock, operator_list=None) -> OperatorRouter:
+    return OperatorRouter(
+        operator_list or operators(), window=200, max_age=60, min_samples=MIN_SAMPLES, exponent=2,
+        breaker_window=10, breaker_failure_rate=0.5, breaker_cooldown=COOLDOWN,
+        clock=clock, rng=random.Random(7)
+    )
+
+
+def trip(breaker: CircuitBreaker) -> None:
+    for _ in range(10):
+        breaker.record(False)
+
+
+def test_breaker_opens_once_the_window_fails_at_the_rate(breaker):
+    for success in [True] * 5 + [False] * 4:
+        breaker.record(success)
+    assert breaker.state == CLOSED
+
+    breaker.record(False)
+
+    assert breaker.state == OPEN
+    assert not breaker.available()
+
+
+def test_breaker_waits_for_a_full_window(breaker):
+    for _ in range(9):
+        breaker.record(False)
+
+    assert breaker.state == CLOSED
+
+
+def test_breaker_half_opens_after_the_cooldown_and_allows_one_probe(breaker, clock):
+    trip(breaker)
+    clock.now += COOLDOWN - 0.1
+    assert not breaker.available()
+
+    clock.now += 0.1
+    assert breaker.available()
+    assert breaker.state == HALF_OPEN
+    breaker.on_attempt()
+    assert not breaker.available()
+
+    # A probe that never reports back is abandoned after another cooldown
+    clock.now += COOLDOWN
+    assert breaker.available()
+
+
+def test_successful_probe_closes_the_breaker(breaker, clock):
+    trip(breaker)
+    clock.now += COOLDOWN
+    assert breaker.available()
+    breaker.on_attempt()
+
+    breaker.record(True)
+
+    assert breaker.state == CLOSED
+    # The failures that opened it are forgotten
+    breaker.record(False)
+    assert breaker.state == CLOSED
+
+
+def test_failed_probe_reopens_for_another_cooldown(breaker, clock):
+    trip(breaker)
+    clock.now += COOLDOWN
+    assert breaker.available()
+    breaker.on_attempt()
+
+    breaker.record(False)
+
+    assert breaker.state == OPEN
+    assert breaker.opened_at == clock.now
+    clock.now += COOLDOWN - 0.1
+    assert not breaker.available()
+
+
+def test_late_results_do_not_move_an_open_breaker(breaker):
+    trip(breaker)
+
+    breaker.record(True)
+
+    assert breaker.state == OPEN
+
+
+def test_rank_prefers_the_faster_healthier_operator(clock):
+    router = make_router(clock)
+    fast, slow, flaky = router.operators
+    for i in range(MIN_SAMPLES):
+        router.record(fast, 0.05, True)
+        router.record(slow, 0.5, True)
+        # Fails 30% of calls, below the breaker's rate
+        router.record(flaky, 0.05, i % 10 >= 3)
+
+    rankings = [router.rank() for _ in range(1000)]
+    firsts = Counter(order[0].name for order in rankings)
+
+    # Drawn by score ** 2: 20 ** 2, 14 ** 2 and 2 ** 2
+    assert firsts[fast.name] > firsts[flaky.name] > firsts[slow.name] > 0
+    assert firsts[fast.name] / 1000 == pytest.approx(400 / 600, abs=0.05)
+    # Failover after the first pick follows the score
+    scores = router._scores()
+    assert all(
+        [scores[op.name] for op in order[1:]] == sorted((scores[op.name] for op in order[1:]), reverse=True)
+        for order in rankings
+    )
+
+
+def test_operators_without_enough_samples_score_as_the_best(clock):
+    router = make_router(clock)
+    known, new, _ = router.operators
+    for _ in range(MIN_SAMPLES):
+        router.record(known, 0.05, True)
+    router.record(new, 5.0, False)
+
+    scores = router._scores()
+
+    assert scores[new.name] == scores[known.name]
+
+
+def test_rank_skips_open_circuits(clock):
+    router = make_router(clock)
+    broken = router.operators[0]
+    for _ in range(10):
+        router.record(broken, 0.05, False)
+
+    ranked = [router.rank() for _ in range(100)]
+
+    assert all(broken not in order for order in ranked)
+    assert all(len(order) == 2 for order in ranked)
+
+
+def test_rank_tries_every_operator_when_all_circuits_are_open(clock):
+    router = make_router(clock)
+    for op in router.operators:
+        for _ in range(10):
+            router.record(op, 0.05, False)
+
+    assert sorted(op.name for op in router.rank()) == [op.name for op in router.operators]
+
+
+def test_stale_samples_age_out(clock):
+    router = make_router(clock)
+    op = router.operators[0]
+    for _ in range(MIN_SAMPLES):
+        router.record(op, 0.05, False)
+    assert router.hedge_delay(op, 0.9) == 0.05
+
+    clock.now += 61
+
+    assert router.hedge_delay(op, 0.9) is None
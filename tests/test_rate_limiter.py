@@ -0,0 +1,117 @@
+import importlib
+from collections import Counter
+from datetime import datetime
+from uuid import uuid4
+import pytest
+from fastapi import HTTPException
+
+from config.settings import settings
+from core.consts import SMSType
+from app.schemas.sms_schema import SMSBatchSendRequest, SMSSendRequest
+from app.services.account_cache import AccountSnapshot
+from app.services.rate_limiter import RateLimiter, rate_limit_key
+
+# app.routers re-exports the APIRouter under the module's name
+sms_router = importlib.import_module("app.routers.sms_router")
+
+
+@pytest.fixture
+def account():
+    return AccountSnapshot(
+        id=uuid4(),
+        api_key="test",
+        balance=10_000,
+        created_at=datetime.utcnow(),
+        rate_limit_express=50
+    )
+
+
+@pytest.fixture
+def limiter(redis_client):
+    return RateLimiter(redis_client, lease_fraction=0.05, lease_ttl=1.0)
+
+
+@pytest.fixture
+def routed(limiter, monkeypatch):
+    """The router's rate limiter is `limiter`."""
+    async def get_rate_limiter():
+        return limiter
+
+    monkeypatch.setattr(sms_router, "get_rate_limiter", get_rate_limiter)
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    return limiter
+
+
+async def tokens_left(redis_client, account, sms_type) -> float:
+    return float(await redis_client.hget(rate_limit_key(account.id, sms_type), "tokens"))
+
+
+async def test_batch_within_the_burst_is_allowed_once(limiter, account):
+    burst = limiter.burst_for(50)
+
+    assert await limiter.acquire(account, SMSType.EXPRESS, burst) is None
+    assert await limiter.acquire(account, SMSType.EXPRESS, burst) is not None
+
+
+async def test_full_batch_fits_the_default_burst(limiter, account):
+    assert await limiter.acquire(account, SMSType.EXPRESS, settings.SMS_BATCH_MAX_SIZE) is None
+    assert await limiter.acquire(account, SMSType.REGULAR, settings.SMS_BATCH_MAX_SIZE) is None
+
+
+async def test_batch_larger_than_the_burst_takes_no_tokens(limiter, account, redis_client):
+    retry_after = await limiter.acquire(account, SMSType.EXPRESS, limiter.burst_for(50) + 1)
+
+    assert retry_after is not None
+    assert not limiter._leases
+    tokens = await redis_client.hget(rate_limit_key(account.id, SMSType.EXPRESS), "tokens")
+    assert float(tokens) == limiter.burst_for(50)
+    # The next ordinary send is unaffected
+    assert await limiter.acquire(account, SMSType.EXPRESS) is None
+    assert all(lease.tokens >= 0 for lease in limiter._leases.values())
+
+
+async def test_send_route_rejects_a_batch_over_the_burst_with_413(routed, account):
+    with pytest.raises(HTTPException) as error:
+        await sms_router.enforce_rate_limit(account, Counter({SMSType.EXPRESS: routed.burst_for(50) + 1}))
+
+    assert error.value.status_code == 413
+    assert not routed._leases
+
+
+async def test_mixed_batch_over_the_burst_takes_no_tokens_of_any_type(routed, account):
+    counts = Counter({SMSType.EXPRESS: 10, SMSType.REGULAR: routed.burst_for(200) + 1})
+
+    with pytest.raises(HTTPException) as error:
+        await sms_router.enforce_rate_limit(account, counts)
+
+    assert error.value.status_code == 413
+    assert not routed._leases
+
+
+async def test_rate_limited_type_returns_the_tokens_of_the_others(routed, account, redis_client):
+    burst = routed.burst_for(50)
+    await routed.acquire(account, SMSType.REGULAR, routed.burst_for(200))
+
+    with pytest.raises(HTTPException) as error:
+        await sms_router.enforce_rate_limit(account, Counter({SMSType.EXPRESS: burst, SMSType.REGULAR: 1}))
+
+    assert error.value.status_code == 429
+    assert await tokens_left(redis_client, account, SMSType.EXPRESS) == pytest.approx(burst, abs=1)
+
+
+async def test_batch_rejected_for_balance_returns_its_tokens(routed, account, redis_client, monkeypatch):
+    async def charge_and_enqueue(account_repo, db, account, count, create_rows):
+        raise HTTPException(status_code=402, detail="Insufficient balance")
+
+    monkeypatch.setattr(sms_router, "charge_and_enqueue", charge_and_enqueue)
+    burst = routed.burst_for(50)
+    batch = SMSBatchSendRequest(
+        messages=[SMSSendRequest(phone_number="+15550100000", message="hello", sms_type=SMSType.EXPRESS)] * burst
+    )
+
+    with pytest.raises(HTTPException) as error:
+        await sms_router.send_sms_batch(batch, account, db=None)
+
+    assert error.value.status_code == 402
+    assert await tokens_left(redis_client, account, SMSType.EXPRESS) == pytest.approx(burst, abs=1)
+    assert await routed.acquire(account, SMSType.EXPRESS, burst) is None
@@ -0,0 +1,97 @@
+import importlib
+from datetime import datetime
+from uuid import uuid4
+import pytest
+from sqlalchemy import delete, select
+
+from config.database import async_session_maker
+from config.settings import settings
+from core.consts import BalanceEngine
+from core.models import Account, BalanceReservation
+from app.repositories import account_repository
+from app.schemas.sms_schema import SMSBatchSendRequest, SMSSendRequest
+from app.services.account_cache import AccountSnapshot
+from app.services.balance_ledger import RedisBalanceLedger, balance_key
+from app.services.balance_quota import QuotaManager
+
+# app.routers re-exports the APIRouter under the module's name
+sms_router = importlib.import_module("app.routers.sms_router")
+
+CREDITS = 100
+
+
+@pytest.fixture
+async def account(database, monkeypatch):
+    async def publish_change(account_id, balance=None):
+        pass
+
+    monkeypatch.setattr(sms_router.account_cache, "publish_change", publish_change)
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+
+    account_id = uuid4()
+    async with async_session_maker() as session:
+        session.add(Account(id=account_id, api_key=f"test-{account_id.hex}", balance=CREDITS))
+        await session.commit()
+
+    yield AccountSnapshot(
+        id=account_id, api_key=f"test-{account_id.hex}", balance=CREDITS, created_at=datetime.utcnow()
+    )
+
+    async with async_session_maker() as session:
+        await session.execute(delete(BalanceReservation).where(BalanceReservation.account_id == account_id))
+        await session.execute(delete(Account).where(Account.id == account_id))
+        await session.commit()
+
+
+@pytest.fixture
+def engines(redis_client, monkeypatch):
+    """Balance engines for the repository, the ledger on fakeredis and a fresh quota manager."""
+    ledger = RedisBalanceLedger(redis_client)
+    manager = QuotaManager(block_size=10, refill_watermark=2, idle_timeout=60.0, sweep_interval=60.0, stale_after=60.0)
+
+    async def get_balance_ledger():
+        return ledger
+
+    monkeypatch.setattr(account_repository, "get_balance_ledger", get_balance_ledger)
+    monkeypatch.setattr(account_repository, "quota_manager", manager)
+    return ledger, manager
+
+
+async def failing_commit():
+    raise RuntimeError("commit failed")
+
+
+async def balance_after(engine: str, account: AccountSnapshot, engines) -> int:
+    ledger, manager = engines
+    if engine == BalanceEngine.REDIS:
+        return int(await ledger.redis.get(balance_key(account.id)))
+    # Returns whatever the block still holds to the row
+    await manager.stop()
+    async with async_session_maker() as session:
+        return await session.scalar(select(Account.balance).where(Account.id == account.id))
+
+
+@pytest.mark.parametrize("engine", [BalanceEngine.POSTGRES, BalanceEngine.REDIS, BalanceEngine.QUOTA])
+async def test_send_that_fails_to_commit_leaves_the_balance_unchanged(engine, account, engines, monkeypatch):
+    monkeypatch.setattr(settings, "BALANCE_ENGINE", engine)
+    request = SMSSendRequest(phone_number="+15550100000", message="hello")
+
+    async with async_session_maker() as session:
+        monkeypatch.setattr(session, "commit", failing_commit)
+        with pytest.raises(RuntimeError):
+            await sms_router.create_sms(request, account, session)
+
+    assert await balance_after(engine, account, engines) == CREDITS
+
+
+@pytest.mark.parametrize("engine", [BalanceEngine.POSTGRES, BalanceEngine.REDIS, BalanceEngine.QUOTA])
+async def test_batch_that_fails_to_commit_leaves_the_balance_unchanged(engine, account, engines, monkeypatch):
+    monkeypatch.setattr(settings, "BALANCE_ENGINE", engine)
+    batch = SMSBatchSendRequest(messages=[SMSSendRequest(phone_number="+15550100000", message="hello")] * 5)
+
+    async with async_session_maker() as session:
+        monkeypatch.setattr(session, "commit", failing_commit)
+        with pytest.raises(RuntimeError):
+            await sms_router.send_sms_batch(batch, account, session)
+
+    assert await balance_after(engine, account, engines) == CREDITS
@@ -0,0 +1,94 @@
+import base64
+import importlib
+import json
+from datetime import datetime
+from uuid import uuid4
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import delete
+
+from config.database import async_session_maker
+from core.consts import SMSStatus, SMSType
+from core.ids import uuid7
+from core.models import SMS, Account
+from app.repositories.sms_repository import SMSRepository
+from app.services.account_cache import AccountSnapshot
+from app.services.sms_service import SMSService
+
+# app.routers re-exports the APIRouter under the module's name
+sms_router = importlib.import_module("app.routers.sms_router")
+
+
+def cursor_of(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def test_cursor_round_trip():
+    sms = SMS(id=uuid7(), created_at=datetime(2026, 3, 1, 12, 0, 0, 123456))
+
+    assert SMSService.decode_cursor(SMSService.encode_cursor(sms)) == (sms.created_at, sms.id)
+
+
+@pytest.mark.parametrize("cursor", [
+    "garbage",
+    "!!!",
+    "é",
+    cursor_of(None),
+    cursor_of(5),
+    cursor_of({"created_at": "2026-03-01T12:00:00"}),
+    cursor_of(["2026-03-01T12:00:00"]),
+    cursor_of(["2026-03-01T12:00:00", "not-a-uuid"]),
+    cursor_of(["yesterday", str(uuid4())]),
+    cursor_of([1, 2]),
+    cursor_of(["2026-03-01T12:00:00+02:00", str(uuid4())]),
+])
+async def test_tampered_cursor_is_a_bad_request(cursor):
+    account = AccountSnapshot(id=uuid4(), api_key="test", balance=0, created_at=datetime.utcnow())
+
+    with pytest.raises(HTTPException) as error:
+        await sms_router.list_sms(
+            account, db=None, status=None, sms_type=None, start_date=None, end_date=None,
+            cursor=cursor, page_size=50, total=None
+        )
+
+    assert error.value.status_code == 400
+
+
+async def test_pages_walk_rows_that_share_a_created_at(database):
+    account_id = uuid4()
+    created_at = datetime.utcnow().replace(microsecond=0)
+    async with async_session_maker() as session:
+        session.add(Account(id=account_id, api_key=f"test-{account_id.hex}", balance=0))
+        await session.flush()
+        session.add_all(
+            SMS(
+                id=uuid7(created_at),
+                account_id=account_id,
+                phone_number="+15550100000",
+                message="tie",
+                sms_type=SMSType.REGULAR,
+                status=SMSStatus.PENDING,
+                created_at=created_at
+            )
+            for _ in range(5)
+        )
+        await session.commit()
+
+    try:
+        seen, after = [], None
+        async with async_session_maker() as session:
+            repo = SMSRepository(session)
+            while True:
+                page = await repo.list_by_account(account_id, after=after, limit=2)
+                if not page:
+                    break
+                seen.extend(sms.id for sms in page)
+                after = SMSService.decode_cursor(SMSService.encode_cursor(page[-1]))
+
+        assert len(seen) == 5
+        assert seen == sorted(set(seen), reverse=True)
+    finally:
+        async with async_session_maker() as session:
+            await session.execute(delete(SMS).where(SMS.account_id == account_id))
+            await session.execute(delete(Account).where(Account.id == account_id))
+            await session.commit()
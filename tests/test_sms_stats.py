@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+import pytest
+from sqlalchemy import delete
+
+from config.database import async_session_maker
+from core.consts import SMSStatus, SMSType
+from core.ids import uuid7
+from core.models import SMS, Account, SMSStatsHourly
+from app.repositories.sms_repository import SMSRepository
+from app.repositories.stats_repository import StatsRepository, hour_bucket
+from app.services import sms_stats
+from app.services.sms_stats import SMSStatsService, stats_cache_key
+
+
+@pytest.fixture
+async def settled_sms(database, redis_client, monkeypatch):
+    """A PENDING message from a settled hour, with stats cached through fakeredis."""
+    async def get_redis():
+        return redis_client
+
+    monkeypatch.setattr(sms_stats, "get_redis", get_redis)
+
+    account_id = uuid4()
+    created_at = datetime.utcnow() - timedelta(hours=5)
+    sms = SMS(
+        id=uuid7(created_at),
+        account_id=account_id,
+        phone_number="+15550100000",
+        message="late",
+        sms_type=SMSType.REGULAR,
+        status=SMSStatus.PENDING,
+        created_at=created_at
+    )
+    async with async_session_maker() as session:
+        session.add(Account(id=account_id, api_key=f"test-{account_id.hex}", balance=0))
+        await session.flush()
+        session.add(sms)
+        await StatsRepository(session).record_created([sms])
+        await session.commit()
+
+    yield sms
+
+    async with async_session_maker() as session:
+        await session.execute(delete(SMSStatsHourly).where(SMSStatsHourly.account_id == account_id))
+        await session.execute(delete(SMS).where(SMS.account_id == account_id))
+        await session.execute(delete(Account).where(Account.id == account_id))
+        await session.commit()
+
+
+async def hourly_stats(sms: SMS) -> list:
+    async with async_session_maker() as session:
+        rows = await SMSStatsService.get_stats(
+            session, sms.account_id, sms.created_at - timedelta(hours=1), datetime.utcnow(), "hour"
+        )
+    # Rollup rows drained to zero by transitions stay behind
+    return [row for row in rows if row[3]]
+
+
+async def test_late_status_update_is_visible_in_a_cached_hour(settled_sms, redis_client):
+    bucket = hour_bucket(settled_sms.created_at)
+    assert await hourly_stats(settled_sms) == [(bucket, SMSType.REGULAR, SMSStatus.PENDING, 1)]
+    assert await redis_client.exists(stats_cache_key(settled_sms.account_id, bucket))
+
+    async with async_session_maker() as session:
+        await SMSRepository(session).batch_update_status([
+            (settled_sms.id, settled_sms.created_at, SMSStatus.SENT, datetime.utcnow(), "operator-a", "m-1")
+        ])
+
+    assert await hourly_stats(settled_sms) == [(bucket, SMSType.REGULAR, SMSStatus.SENT, 1)]
+
+
+async def test_settled_hours_are_cached_with_a_ttl(settled_sms, redis_client):
+    await hourly_stats(settled_sms)
+
+    ttl = await redis_client.ttl(stats_cache_key(settled_sms.account_id, hour_bucket(settled_sms.created_at)))
+
+    assert 0 < ttl <= 3600
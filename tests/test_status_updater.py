@@ -0,0 +1,69 @@
+import json
+from uuid import uuid4
+import pytest
+
+from core.consts import SMSStatus
+from workers.services import status_updater
+from workers.services.status_updater import LEGACY_DEAD_LIST, LEGACY_RESULTS_LIST, StatusUpdater
+
+
+def legacy_result() -> str:
+    return json.dumps({"sms_id": str(uuid4()), "status": SMSStatus.SENT, "sent_at": None})
+
+
+@pytest.fixture
+def applied(redis_client, monkeypatch):
+    """Batches the updater applied; a callable in `failures` can make an apply raise."""
+    batches = []
+    failures = []
+
+    async def apply(updates):
+        if failures:
+            failures.pop(0)()
+        batches.append(updates)
+
+    monkeypatch.setattr(StatusUpdater, "_apply", staticmethod(apply))
+    monkeypatch.setattr(status_updater, "LEGACY_RETRY_DELAY", 0)
+    return batches, failures
+
+
+def updater(redis_client) -> StatusUpdater:
+    return StatusUpdater(redis_client, consumer_name="test", batch_size=2)
+
+
+def fail():
+    raise ConnectionError("database unavailable")
+
+
+async def test_results_stay_listed_until_their_batch_is_applied(redis_client, applied):
+    batches, failures = applied
+    await redis_client.rpush(LEGACY_RESULTS_LIST, *(legacy_result() for _ in range(3)))
+    failures.append(fail)
+
+    assert await updater(redis_client).drain_legacy_list() == 3
+
+    assert [len(batch) for batch in batches] == [2, 1]
+    assert await redis_client.llen(LEGACY_RESULTS_LIST) == 0
+    assert await redis_client.llen(LEGACY_DEAD_LIST) == 0
+
+
+async def test_unreadable_results_are_dead_lettered(redis_client, applied):
+    batches, _ = applied
+    await redis_client.rpush(LEGACY_RESULTS_LIST, "not json", legacy_result())
+
+    assert await updater(redis_client).drain_legacy_list() == 1
+
+    assert await redis_client.lrange(LEGACY_DEAD_LIST, 0, -1) == ["not json"]
+    assert len(batches[0]) == 1
+
+
+async def test_a_batch_that_keeps_failing_is_dead_lettered(redis_client, applied):
+    _, failures = applied
+    results = [legacy_result() for _ in range(2)]
+    await redis_client.rpush(LEGACY_RESULTS_LIST, *results)
+    failures.extend([fail] * status_updater.LEGACY_MAX_ATTEMPTS)
+
+    assert await updater(redis_client).drain_legacy_list() == 0
+
+    assert await redis_client.lrange(LEGACY_DEAD_LIST, 0, -1) == results
+    assert await redis_client.llen(LEGACY_RESULTS_LIST) == 0
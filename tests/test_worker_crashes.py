@@ -0,0 +1,122 @@
+import asyncio
+from collections import Counter
+from datetime import datetime
+from uuid import uuid4
+import pytest
+
+from config.settings import settings
+from core.consts import SMSType
+from core.ids import uuid7
+from app.services.send_dedup import SendDedup
+from workers.operator_client import OperatorClient
+from workers.services import sms_processor
+
+CLAIM_TTL = 0.05
+MESSAGES = 30
+
+
+class Crashes:
+    """Workers that die at a given point of their first delivery and hang there forever."""
+
+    def __init__(self, point: str, sms_ids):
+        self.pending = {sms_id: point for sms_id in sms_ids}
+        self.crashed = {sms_id: asyncio.Event() for sms_id in sms_ids}
+
+    async def at(self, sms_id: str, point: str) -> None:
+        if self.pending.get(sms_id) == point:
+            del self.pending[sms_id]
+            self.crashed[sms_id].set()
+            await asyncio.Event().wait()
+
+
+class Operators:
+    """Operators that honour Idempotency-Key: a repeated key is answered without a second send."""
+
+    def __init__(self, crashes: Crashes):
+        self.crashes = crashes
+        self.sends: Counter = Counter()
+        self.accepted = {}
+
+    async def attempt(self, router, operator, phone_number, message, idempotency_key):
+        await self.crashes.at(idempotency_key, "before_send")
+        if (operator.name, idempotency_key) not in self.accepted:
+            self.sends[idempotency_key] += 1
+            self.accepted[operator.name, idempotency_key] = uuid4().hex
+        await self.crashes.at(idempotency_key, "after_send")
+        return True, self.accepted[operator.name, idempotency_key], None
+
+
+@pytest.fixture
+def dedup(redis_client, monkeypatch):
+    dedup = SendDedup(redis_client, claim_ttl=CLAIM_TTL, ttl=600)
+
+    async def get_send_dedup():
+        return dedup
+
+    async def get_redis():
+        return redis_client
+
+    monkeypatch.setattr(sms_processor, "get_send_dedup", get_send_dedup)
+    monkeypatch.setattr(sms_processor, "get_redis", get_redis)
+    monkeypatch.setattr(settings, "SMS_DEDUP_ENABLED", True)
+    monkeypatch.setattr(settings, "OPERATOR_ROUTING_ADAPTIVE", True)
+    return dedup
+
+
+def crash_after(dedup: SendDedup, crashes: Crashes, monkeypatch) -> None:
+    mark_sent, mark_recorded = dedup.mark_sent, dedup.mark_recorded
+
+    async def crashing_mark_sent(claim, operator, message_id):
+        await mark_sent(claim, operator, message_id)
+        await crashes.at(claim.key.split(":", 1)[1], "after_mark_sent")
+
+    async def crashing_mark_recorded(claim):
+        await mark_recorded(claim)
+        await crashes.at(claim.key.split(":", 1)[1], "after_record")
+
+    monkeypatch.setattr(dedup, "mark_sent", crashing_mark_sent)
+    monkeypatch.setattr(dedup, "mark_recorded", crashing_mark_recorded)
+
+
+def task_kwargs() -> dict:
+    return {
+        "sms_id": str(uuid7()),
+        "phone_number": "+15550100000",
+        "message": "crash",
+        "created_at": datetime.utcnow().isoformat(),
+        "sms_type": SMSType.REGULAR,
+        "account_id": str(uuid4()),
+    }
+
+
+@pytest.mark.parametrize("point", ["before_send", "after_send", "after_mark_sent", "after_record"])
+async def test_redelivery_after_a_crash_reaches_an_operator_once(point, dedup, monkeypatch):
+    messages = [task_kwargs() for _ in range(MESSAGES)]
+    crashes = Crashes(point, [kwargs["sms_id"] for kwargs in messages])
+    operators = Operators(crashes)
+    monkeypatch.setattr(OperatorClient, "_attempt", staticmethod(operators.attempt))
+    crash_after(dedup, crashes, monkeypatch)
+
+    hung = []
+
+    async def deliver(kwargs: dict) -> None:
+        task = asyncio.create_task(sms_processor.process_sms_message(**kwargs))
+        crashed = asyncio.create_task(crashes.crashed[kwargs["sms_id"]].wait())
+        await asyncio.wait({task, crashed}, return_when=asyncio.FIRST_COMPLETED)
+        crashed.cancel()
+        if not task.done():
+            hung.append(task)
+            # acks_late: the broker hands the unacked message to another worker
+            await asyncio.sleep(CLAIM_TTL * 2)
+            await sms_processor.process_sms_message(**kwargs)
+        else:
+            task.result()
+
+    try:
+        await asyncio.gather(*(deliver(kwargs) for kwargs in messages))
+    finally:
+        for task in hung:
+            task.cancel()
+
+    assert len(hung) == MESSAGES
+    assert all(operators.sends[kwargs["sms_id"]] == 1 for kwargs in messages)
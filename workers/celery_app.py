@@ -9,4 +9,9 @@ celery_app = Celery(
 
 celery_app.config_from_object("config.celery")
 
-celery_app.autodiscover_tasks(['workers.tasks.sms_tasks'])
+celery_app.autodiscover_tasks([
+    'workers.tasks.sms_tasks',
+    'workers.tasks.balance_tasks',
+    'workers.tasks.partition_tasks',
+    'workers.tasks.dlq_tasks'
+])
@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import signal
+import traceback
+from datetime import datetime
+from functools import partial
+from typing import Optional, Set
+import aio_pika
+
+from config.database import engine
+from config.rabbitmq import (
+    TASK_QUEUES,
+    get_rabbitmq_connection,
+    close_rabbitmq,
+    parse_task_kwargs,
+    publish_task,
+    setup_rabbitmq_queues
+)
+from config.redis import close_redis
+from config.settings import settings
+from core.consts import QueueName
+from app.services.sms_service import PROCESS_SMS_TASK
+from workers.operator_client import OperatorClient
+from workers.operator_router import get_operator_router
+from workers.services.sms_processor import process_sms_message
+
+logger = logging.getLogger(__name__)
+
+
+class SMSConsumer:
+    """
+    asyncio consumer for the express and regular queues.
+
+    Reads the Celery messages published by SMSService directly from RabbitMQ and keeps
+    up to `concurrency` operator sends in flight per queue, acking each message only
+    after its result has been recorded.
+    """
+
+    def __init__(self, express_concurrency: int, regular_concurrency: int):
+        self.concurrency = {
+            QueueName.EXPRESS: express_concurrency,
+            QueueName.REGULAR: regular_concurrency,
+        }
+        self._semaphores = {
+            queue_name: asyncio.Semaphore(limit)
+            for queue_name, limit in self.concurrency.items()
+        }
+        self._consumers: list[tuple[aio_pika.abc.AbstractQueue, str]] = []
+        self._in_flight: Set[asyncio.Task] = set()
+        self._metrics: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        await setup_rabbitmq_queues()
+        connection = await get_rabbitmq_connection()
+
+        for queue_name, limit in self.concurrency.items():
+            # One channel per queue: express keeps its own prefetch window and never
+            # waits behind a full regular window
+            channel = await connection.channel()
+            await channel.set_qos(prefetch_count=limit)
+            queue = await channel.declare_queue(
+                queue_name,
+                durable=True,
+                arguments=TASK_QUEUES[queue_name] or None
+            )
+            consumer_tag = await queue.consume(partial(self._on_message, queue_name))
+            self._consumers.append((queue, consumer_tag))
+            logger.info(f"Consuming {queue_name} with concurrency {limit}")
+
+        self._metrics = asyncio.create_task(self._report_metrics())
+
+    async def stop(self) -> None:
+        for queue, consumer_tag in self._consumers:
+            await queue.cancel(consumer_tag)
+        self._consumers = []
+        if self._metrics:
+            self._metrics.cancel()
+
+        if self._in_flight:
+            logger.info(f"Waiting for {len(self._in_flight)} in-flight messages")
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+    async def _report_metrics(self) -> None:
+        router = get_operator_router()
+        while True:
+            await asyncio.sleep(settings.OPERATOR_METRICS_INTERVAL)
+            for name, stats in router.snapshot().items():
+                logger.info(f"Operator {name}: {stats}")
+
+            hedging = OperatorClient.hedge_metrics
+            if hedging["messages"]:
+                logger.info(
+                    f"Hedging: {hedging['hedged']}/{hedging['messages']} express messages hedged, "
+                    f"{hedging['hedge_won']} won by the hedge, "
+                    f"{hedging['sends'] / hedging['messages']:.3f} operator calls per message"
+                )
+
+            calls = OperatorClient.call_metrics
+            if calls["batch_calls"]:
+                logger.info(
+                    f"Batching: {calls['batched_messages']} messages in {calls['batch_calls']} batch calls "
+                    f"({calls['batched_messages'] / calls['batch_calls']:.1f} per call), "
+                    f"{calls['calls']} single calls"
+                )
+
+    async def _on_message(self, queue_name: str, message: aio_pika.abc.AbstractIncomingMessage) -> None:
+        task = asyncio.create_task(self._handle(queue_name, message))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def _handle(self, queue_name: str, message: aio_pika.abc.AbstractIncomingMessage) -> None:
+        task_name = (message.headers or {}).get("task")
+        if task_name != PROCESS_SMS_TASK:
+            logger.error(f"Unexpected task {task_name} on {queue_name}, rejecting")
+            await message.reject(requeue=False)
+            return
+
+        async with self._semaphores[queue_name]:
+            try:
+                kwargs = parse_task_kwargs(message)
+                await process_sms_message(
+                    sms_id=kwargs["sms_id"],
+                    phone_number=kwargs["phone_number"],
+                    message=kwargs["message"],
+                    created_at=kwargs.get("created_at"),
+                    sms_type=kwargs.get("sms_type"),
+                    account_id=kwargs.get("account_id"),
+                    attempt=kwargs.get("attempt", 0),
+                    last_operator=kwargs.get("last_operator"),
+                    # Regular sends are not latency critical and share operator batch calls
+                    batch=queue_name == QueueName.REGULAR
+                )
+            except Exception as e:
+                await self._on_failure(message, e)
+                return
+
+        await message.ack()
+
+    async def _on_failure(self, message: aio_pika.abc.AbstractIncomingMessage, exc: Exception) -> None:
+        # First failure is redelivered once; a second one goes to the DLQ like SMSTask does
+        if not message.redelivered:
+            logger.warning(f"Processing {message.correlation_id} failed, requeueing: {exc}")
+            await message.nack(requeue=True)
+            return
+
+        logger.error(f"Processing {message.correlation_id} failed again, sending to DLQ: {exc}")
+        try:
+            await publish_task(
+                'workers.tasks.dlq_tasks.store_failed_task',
+                kwargs={
+                    'task_name': PROCESS_SMS_TASK,
+                    'task_id': message.correlation_id,
+                    'args': [],
+                    'kwargs': parse_task_kwargs(message),
+                    'exception': str(exc),
+                    'traceback': traceback.format_exc(),
+                    'error_class': type(exc).__name__,
+                    'failed_at': datetime.utcnow().isoformat()
+                },
+                queue=QueueName.DLQ
+            )
+        except Exception as e:
+            # Left unacked it would sit on the channel until it closes; back to the queue
+            logger.error(f"Failed to dead-letter {message.correlation_id}, requeueing: {e}")
+            await message.nack(requeue=True)
+            return
+        await message.reject(requeue=False)
+
+
+async def main() -> None:
+    consumer = SMSConsumer(
+        express_concurrency=settings.CONSUMER_EXPRESS_CONCURRENCY,
+        regular_concurrency=settings.CONSUMER_REGULAR_CONCURRENCY
+    )
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    await consumer.start()
+    await stop_event.wait()
+
+    logger.info("Shutting down consumer")
+    await consumer.stop()
+    await OperatorClient.close()
+    await close_rabbitmq()
+    await close_redis()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=settings.LOG_LEVEL)
+    asyncio.run(main())
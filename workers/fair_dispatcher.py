@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import signal
+import time
+from typing import Dict
+from sqlalchemy import select
+
+from config.database import async_session_maker, engine
+from config.rabbitmq import close_rabbitmq, get_queue_depth
+from config.redis import get_redis, close_redis
+from config.settings import settings
+from core.consts import QueueName
+from core.models import Account
+from app.services.fair_scheduler import DeficitRoundRobin, FairQueue, get_fair_queue
+from app.services.sms_service import SMSService
+
+logger = logging.getLogger(__name__)
+
+LEADER_LOCK_KEY = "fair:regular:dispatcher"
+LEADER_LOCK_TIMEOUT = 10
+# LPOP count is unpacked onto the Lua stack, which holds ~8000 values
+TAKE_CHUNK = 1000
+
+
+class FairDispatcher:
+    """
+    Feeds the regular queue from the per-account backlogs with deficit round-robin.
+
+    The regular queue is kept around target_depth ready messages, so a new account's
+    tasks wait behind at most that many instead of behind another account's whole
+    flood. Regular dispatch pauses while the express queue has more than
+    express_backlog ready messages, which keeps express strictly ahead. One process
+    dispatches at a time (Redis lock); others stand by.
+    """
+
+    def __init__(
+        self,
+        quantum: int,
+        target_depth: int,
+        express_backlog: int,
+        poll_interval: float,
+        weight_refresh_interval: float
+    ):
+        self.target_depth = target_depth
+        self.express_backlog = express_backlog
+        self.poll_interval = poll_interval
+        self.weight_refresh_interval = weight_refresh_interval
+        self.dispatched = 0
+        self._drr = DeficitRoundRobin(quantum)
+        self._weights: Dict[str, int] = {}
+        self._weights_loaded_at = 0.0
+        self._stopping = asyncio.Event()
+
+    async def dispatch_once(self, fair_queue: FairQueue) -> int:
+        if await get_queue_depth(QueueName.EXPRESS) > self.express_backlog:
+            return 0
+
+        budget = self.target_depth - await get_queue_depth(QueueName.REGULAR)
+        if budget <= 0:
+            return 0
+
+        backlogs = await fair_queue.backlogs()
+        if not backlogs:
+            return 0
+
+        await self._refresh_weights(set(backlogs))
+        tasks = []
+        for account_id, allocated in self._drr.allocate(backlogs, budget, lambda a: self._weights.get(a, 1)):
+            taken = 0
+            while taken < allocated:
+                count = min(TAKE_CHUNK, allocated - taken)
+                chunk = await fair_queue.take(account_id, count)
+                tasks.extend(chunk)
+                taken += len(chunk)
+                if len(chunk) < count:
+                    break
+
+        if tasks:
+            await SMSService.publish_to_queues([(QueueName.REGULAR, kwargs) for kwargs in tasks])
+        await fair_queue.ack_in_flight()
+
+        self.dispatched += len(tasks)
+        return len(tasks)
+
+    async def recover(self, fair_queue: FairQueue) -> None:
+        # Taken by a dispatcher that died before the broker confirmed them. Some may
+        # have been published already: delivery is at-least-once, as with the outbox relay.
+        tasks = await fair_queue.in_flight()
+        if tasks:
+            logger.warning(f"Republishing {len(tasks)} tasks left in flight by a previous dispatcher")
+            await SMSService.publish_to_queues([(QueueName.REGULAR, kwargs) for kwargs in tasks])
+        await fair_queue.ack_in_flight()
+
+    async def run(self) -> None:
+        redis_client = await get_redis()
+        fair_queue = await get_fair_queue()
+        lock = redis_client.lock(LEADER_LOCK_KEY, timeout=LEADER_LOCK_TIMEOUT)
+
+        while not self._stopping.is_set():
+            if not await lock.acquire(blocking=False):
+                await self._sleep(LEADER_LOCK_TIMEOUT / 2)
+                continue
+
+            logger.info("Fair dispatcher is leading")
+            try:
+                await self.recover(fair_queue)
+                await self._lead(lock, fair_queue)
+            except Exception as e:
+                logger.error(f"Fair dispatcher stopped leading: {e}")
+                await self._sleep(self.poll_interval)
+            finally:
+                try:
+                    await lock.release()
+                except Exception:
+                    pass
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    async def _lead(self, lock, fair_queue: FairQueue) -> None:
+        renewed_at = time.monotonic()
+        while not self._stopping.is_set():
+            if time.monotonic() - renewed_at > LEADER_LOCK_TIMEOUT / 3:
+                # Raises LockNotOwnedError if another process took over
+                await lock.reacquire()
+                renewed_at = time.monotonic()
+
+            try:
+                dispatched = await self.dispatch_once(fair_queue)
+            except Exception as e:
+                # Whatever was taken stays in flight and is republished on recovery
+                logger.error(f"Fair dispatch failed, will retry: {e}")
+                await self.recover(fair_queue)
+                dispatched = 0
+
+            if dispatched == 0:
+                await self._sleep(self.poll_interval)
+
+    async def _refresh_weights(self, active: set[str]) -> None:
+        now = time.monotonic()
+        if now - self._weights_loaded_at < self.weight_refresh_interval and active.issubset(self._weights):
+            return
+
+        async with async_session_maker() as session:
+            result = await session.execute(
+                select(Account.id, Account.scheduling_weight).where(Account.id.in_(active))
+            )
+            # Accounts missing from the table keep weight 1 rather than being looked up every loop
+            self._weights = dict.fromkeys(active, 1)
+            self._weights.update((str(account_id), weight) for account_id, weight in result.all())
+        self._weights_loaded_at = now
+
+    async def _sleep(self, seconds: float) -> None:
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def main() -> None:
+    dispatcher = FairDispatcher(
+        quantum=settings.FAIR_QUANTUM,
+        target_depth=settings.FAIR_TARGET_DEPTH,
+        express_backlog=settings.FAIR_EXPRESS_BACKLOG,
+        poll_interval=settings.FAIR_POLL_INTERVAL,
+        weight_refresh_interval=settings.FAIR_WEIGHT_REFRESH_INTERVAL
+    )
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, dispatcher.stop)
+
+    await dispatcher.run()
+    await close_rabbitmq()
+    await close_redis()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=settings.LOG_LEVEL)
+    asyncio.run(main())
@@ -1,6 +1,10 @@
+import asyncio
+import os
 import random
 import time
-from fastapi import FastAPI, HTTPException
+from collections import OrderedDict
+from typing import Optional
+from fastapi import FastAPI, Header, HTTPException
 from pydantic import BaseModel, Field
 import uvicorn
 
@@ -19,13 +23,98 @@ class SMSResponse(BaseModel):
     error: str = None
 
 
+class BatchSMSItem(SMSRequest):
+    idempotency_key: Optional[str] = Field(default=None, max_length=255)
+
+
+class BatchSMSRequest(BaseModel):
+    messages: list[BatchSMSItem] = Field(..., min_length=1, max_length=1000)
+
+
+class BatchSMSResponse(BaseModel):
+    # One result per message, in request order
+    results: list[SMSResponse]
+
+
+class OperatorProfile(BaseModel):
+    """Behaviour of this mock; set with MOCK_* env vars or PUT /profile at runtime."""
+    latency_min_ms: float = Field(default=float(os.getenv("MOCK_LATENCY_MIN_MS", "50")), ge=0)
+    latency_max_ms: float = Field(default=float(os.getenv("MOCK_LATENCY_MAX_MS", "200")), ge=0)
+    # Replies "failed" with HTTP 200
+    failure_rate: float = Field(default=float(os.getenv("MOCK_FAILURE_RATE", "0.05")), ge=0, le=1)
+    # Replies HTTP 503
+    error_rate: float = Field(default=float(os.getenv("MOCK_ERROR_RATE", "0")), ge=0, le=1)
+    # Hangs for hang_seconds, past the client timeout
+    hang_rate: float = Field(default=float(os.getenv("MOCK_HANG_RATE", "0")), ge=0, le=1)
+    hang_seconds: float = Field(default=float(os.getenv("MOCK_HANG_SECONDS", "30")), ge=0)
+    # Added to a batch call's latency for every message in it
+    batch_latency_per_message_ms: float = Field(
+        default=float(os.getenv("MOCK_BATCH_LATENCY_PER_MESSAGE_MS", "0.5")), ge=0
+    )
+
+
+profile = OperatorProfile()
+
+# Idempotency-Key -> response of the send it identified; a repeated key is answered
+# from here without sending the SMS again
+IDEMPOTENCY_CACHE_SIZE = 100_000
+_responses: "OrderedDict[str, SMSResponse]" = OrderedDict()
+
+
 @app.post("/send", response_model=SMSResponse)
-async def send_sms(request: SMSRequest) -> SMSResponse:
-    # Simulate network delay (50-200ms)
-    time.sleep(random.uniform(0.05, 0.2))
+async def send_sms(
+    request: SMSRequest,
+    idempotency_key: Optional[str] = Header(default=None)
+) -> SMSResponse:
+    if idempotency_key and idempotency_key in _responses:
+        print(f"= Duplicate send to {request.phone_number} ignored [key: {idempotency_key}]")
+        return _responses[idempotency_key]
+
+    await _delay(0)
+    response = _deliver(request)
+    _remember(idempotency_key, response)
+    return response
+
+
+@app.post("/send-batch", response_model=BatchSMSResponse)
+async def send_sms_batch(request: BatchSMSRequest) -> BatchSMSResponse:
+    # One round trip for the whole batch; hangs and 503s hit every message in it
+    await _delay(len(request.messages))
 
-    # 95% success rate, 5% failure
-    success = random.random() < 0.95
+    results = []
+    for item in request.messages:
+        if item.idempotency_key and item.idempotency_key in _responses:
+            print(f"= Duplicate send to {item.phone_number} ignored [key: {item.idempotency_key}]")
+            results.append(_responses[item.idempotency_key])
+            continue
+
+        response = _deliver(item)
+        _remember(item.idempotency_key, response)
+        results.append(response)
+    return BatchSMSResponse(results=results)
+
+
+def _remember(idempotency_key: Optional[str], response: SMSResponse) -> None:
+    if idempotency_key and response.status == "sent":
+        _responses[idempotency_key] = response
+        if len(_responses) > IDEMPOTENCY_CACHE_SIZE:
+            _responses.popitem(last=False)
+
+
+async def _delay(batch_size: int) -> None:
+    if random.random() < profile.hang_rate:
+        await asyncio.sleep(profile.hang_seconds)
+
+    # Simulate network delay without blocking other requests
+    latency_ms = random.uniform(profile.latency_min_ms, profile.latency_max_ms)
+    await asyncio.sleep((latency_ms + batch_size * profile.batch_latency_per_message_ms) / 1000)
+
+    if random.random() < profile.error_rate:
+        raise HTTPException(status_code=503, detail="Service unavailable")
+
+
+def _deliver(request: SMSRequest) -> SMSResponse:
+    success = random.random() >= profile.failure_rate
 
     if success:
         message_id = f"msg_{int(time.time())}_{random.randint(1000, 9999)}"
@@ -49,6 +138,18 @@ async def send_sms(request: SMSRequest) -> SMSResponse:
         )
 
 
+@app.get("/profile", response_model=OperatorProfile)
+async def get_profile() -> OperatorProfile:
+    return profile
+
+
+@app.put("/profile", response_model=OperatorProfile)
+async def set_profile(new_profile: OperatorProfile) -> OperatorProfile:
+    global profile
+    profile = new_profile
+    return profile
+
+
 @app.get("/health")
 async def health():
     return {"status": "healthy", "service": "mock_operator"}
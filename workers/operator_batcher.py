@@ -0,0 +1,101 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from config.operator_config import OperatorConfig
+
+logger = logging.getLogger(__name__)
+
+SendResult = Tuple[bool, Optional[str], Optional[str]]
+
+# Resends of a batch whose results can't be matched to its messages
+MISMATCH_RETRIES = 2
+
+
+@dataclass
+class BatchItem:
+    phone_number: str
+    message: str
+    idempotency_key: Optional[str]
+    future: asyncio.Future
+
+
+class OperatorBatcher:
+    """
+    Gathers concurrent sends to the same operator into one batch call.
+
+    A batch goes out as soon as it holds the operator's max_batch_size messages, or
+    `max_wait` seconds after its first message arrived. `submit` makes the call and
+    returns one (success, message_id, error) per item, in order; each caller of send()
+    gets its own result back. A response with the wrong number of results says nothing
+    about which messages were accepted, so the batch is resent to the same operator
+    under the same idempotency keys before its messages fail. Only useful where many sends are in flight at once, as in
+    the native consumer: a caller on its own just waits `max_wait` for a batch of one.
+    """
+
+    def __init__(
+        self,
+        submit: Callable[[OperatorConfig, List[BatchItem]], Awaitable[List[SendResult]]],
+        max_wait: float
+    ):
+        self.submit = submit
+        self.max_wait = max_wait
+        self._pending: Dict[str, List[BatchItem]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._in_flight: Set[asyncio.Task] = set()
+
+    async def send(
+        self,
+        operator: OperatorConfig,
+        phone_number: str,
+        message: str,
+        idempotency_key: Optional[str] = None
+    ) -> SendResult:
+        loop = asyncio.get_running_loop()
+        item = BatchItem(phone_number, message, idempotency_key, loop.create_future())
+        items = self._pending.setdefault(operator.name, [])
+        items.append(item)
+
+        if len(items) >= operator.max_batch_size:
+            self._flush(operator)
+        elif len(items) == 1:
+            self._timers[operator.name] = loop.call_later(self.max_wait, self._flush, operator)
+
+        # A caller that gives up leaves its message in the batch; the result is dropped
+        return await asyncio.shield(item.future)
+
+    def _flush(self, operator: OperatorConfig) -> None:
+        timer = self._timers.pop(operator.name, None)
+        if timer:
+            timer.cancel()
+
+        items = self._pending.pop(operator.name, None)
+        if not items:
+            return
+
+        task = asyncio.create_task(self._submit(operator, items))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def _submit(self, operator: OperatorConfig, items: List[BatchItem]) -> None:
+        for _ in range(MISMATCH_RETRIES + 1):
+            try:
+                results = await self.submit(operator, items)
+            except Exception as e:
+                logger.warning(f"Batch of {len(items)} to operator {operator.name} failed: {e}")
+                results = [(False, None, str(e))] * len(items)
+
+            if len(results) == len(items):
+                break
+
+            logger.warning(f"Operator {operator.name} answered {len(results)} results for {len(items)} messages")
+            results = [(False, None, "Malformed batch response")] * len(items)
+            # Some messages may have been accepted, so failing over would send them twice;
+            # the same operator answers a resend under the same keys without delivering again
+            if not all(item.idempotency_key for item in items):
+                break
+
+        for item, result in zip(items, results):
+            if not item.future.done():
+                item.future.set_result(result)
@@ -1,76 +1,335 @@
 import logging
 import httpx
 import asyncio
-from typing import Optional, Tuple
+import time
+from collections import Counter
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 from config.operator_config import OPERATORS, OperatorConfig
+from config.settings import settings
+from workers.operator_batcher import BatchItem, OperatorBatcher
+from workers.operator_router import OperatorRouter, get_operator_router
 
 logger = logging.getLogger(__name__)
 
 
 class OperatorClient:
+    # One keep-alive connection pool per operator, shared by every send in the process
+    _clients: Dict[str, httpx.AsyncClient] = {}
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    # messages: hedge-eligible sends; sends: operator calls they made; hedged: messages
+    # that fired a hedge; hedge_won: hedges that answered first; cancelled: losing calls
+    hedge_metrics: Counter = Counter()
+    # calls: single-SMS operator calls; batch_calls: batch calls, carrying batched_messages
+    call_metrics: Counter = Counter()
+    _batcher: Optional[OperatorBatcher] = None
+    _closer: Optional[asyncio.Task] = None
+
+    @classmethod
+    def _bind_loop(cls) -> None:
+        loop = asyncio.get_running_loop()
+        if cls._loop is not loop:
+            # Pooled connections and pending batches belong to the loop that opened them.
+            # aclose() can't run once that loop has ended, so each loop gets a task that
+            # closes its pools when cancelled at shutdown, as asyncio.run() does
+            cls._clients = {}
+            cls._batcher = None
+            cls._loop = loop
+            cls._closer = loop.create_task(cls._close_on_shutdown(cls._clients))
+
+    @staticmethod
+    async def _close_on_shutdown(clients: Dict[str, httpx.AsyncClient]) -> None:
+        try:
+            await asyncio.get_running_loop().create_future()
+        finally:
+            for client in clients.values():
+                await client.aclose()
+
+    @classmethod
+    def get_client(cls, operator: OperatorConfig) -> httpx.AsyncClient:
+        cls._bind_loop()
+        client = cls._clients.get(operator.name)
+        if client is None:
+            client = httpx.AsyncClient(
+                timeout=operator.timeout,
+                http2=operator.http2,
+                limits=httpx.Limits(
+                    max_connections=operator.max_connections,
+                    max_keepalive_connections=operator.max_keepalive_connections,
+                    keepalive_expiry=operator.keepalive_expiry
+                )
+            )
+            cls._clients[operator.name] = client
+        return client
+
+    @classmethod
+    def get_batcher(cls) -> OperatorBatcher:
+        cls._bind_loop()
+        if cls._batcher is None:
+            cls._batcher = OperatorBatcher(OperatorClient._submit_batch, settings.OPERATOR_BATCH_MAX_WAIT)
+        return cls._batcher
+
+    @classmethod
+    async def close(cls) -> None:
+        for client in cls._clients.values():
+            await client.aclose()
+        if cls._closer is not None and cls._loop is asyncio.get_running_loop():
+            cls._closer.cancel()
+        cls._clients = {}
+        cls._batcher = None
+        cls._closer = None
+        cls._loop = None
+
     @staticmethod
-    async def _send_with_backoff(
+    async def _send(
         operator: OperatorConfig,
         phone_number: str,
         message: str,
-        max_retries: int = 3
+        idempotency_key: Optional[str] = None
     ) -> Tuple[bool, Optional[str], Optional[str]]:
         """
-        Send SMS to operator with exponential backoff retry.
-        Backoff: 1s, 2s, 4s
+        One call to the operator. Failures are not retried here: backing off in-process
+        would hold the worker slot, so the caller fails over to the next operator and
+        the whole message is retried later through a delay queue.
         """
-        for attempt in range(max_retries):
-            try:
-                async with httpx.AsyncClient(timeout=operator.timeout) as client:
-                    response = await client.post(
-                        operator.url,
-                        json={
-                            "phone_number": phone_number,
-                            "message": message
-                        }
-                    )
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else None
+        OperatorClient.call_metrics["calls"] += 1
+        try:
+            client = OperatorClient.get_client(operator)
+            response = await client.post(
+                operator.url,
+                json={
+                    "phone_number": phone_number,
+                    "message": message
+                },
+                headers=headers
+            )
+            if response.status_code != 200:
+                logger.warning(f"Operator {operator.name} HTTP {response.status_code}")
+                return False, None, f"HTTP error {response.status_code}"
 
-                    if response.status_code == 200:
-                        data = response.json()
-                        if data.get("status") == "sent":
-                            return True, data.get("message_id"), None
-                        else:
-                            error = data.get("error", "Unknown error")
-                            logger.warning(f"Operator {operator.name} failed: {error}")
-                            return False, None, error
-                    else:
-                        logger.warning(f"Operator {operator.name} HTTP {response.status_code}, attempt {attempt + 1}/{max_retries}")
-                        if attempt < max_retries - 1:
-                            backoff_time = 2 ** attempt  # 1s, 2s, 4s
-                            await asyncio.sleep(backoff_time)
-                            continue
-                        else:
-                            return False, None, f"HTTP error {response.status_code}"
-
-            except Exception as e:
-                logger.warning(f"Operator {operator.name} exception: {str(e)}, attempt {attempt + 1}/{max_retries}")
-                if attempt < max_retries - 1:
-                    backoff_time = 2 ** attempt  # 1s, 2s, 4s
-                    await asyncio.sleep(backoff_time)
-                    continue
-                else:
-                    return False, None, str(e)
+            # A garbled body is this operator's failure, not the whole send's
+            data = response.json()
+            if not isinstance(data, dict):
+                raise ValueError(f"unexpected response body {response.text[:100]!r}")
+        except Exception as e:
+            logger.warning(f"Operator {operator.name} exception: {str(e)}")
+            return False, None, str(e)
 
-        return False, None, "Max retries exceeded"
+        if data.get("status") == "sent":
+            return True, data.get("message_id"), None
+
+        error = data.get("error", "Unknown error")
+        logger.warning(f"Operator {operator.name} failed: {error}")
+        return False, None, error
 
     @staticmethod
-    async def send_sms(phone_number: str, message: str) -> Tuple[bool, Optional[str], Optional[str]]:
-        for operator in sorted(OPERATORS, key=lambda x: x.priority):
-            logger.info(f"Trying operator {operator.name} (priority {operator.priority})")
-            success, message_id, error = await OperatorClient._send_with_backoff(
-                operator, phone_number, message
+    async def _send_batch(
+        operator: OperatorConfig,
+        items: List[BatchItem]
+    ) -> List[Tuple[bool, Optional[str], Optional[str]]]:
+        """One batch call to the operator; a failed call fails every message in it."""
+        OperatorClient.call_metrics["batch_calls"] += 1
+        OperatorClient.call_metrics["batched_messages"] += len(items)
+        try:
+            client = OperatorClient.get_client(operator)
+            response = await client.post(
+                operator.batch_url,
+                json={"messages": [
+                    {
+                        "phone_number": item.phone_number,
+                        "message": item.message,
+                        "idempotency_key": item.idempotency_key
+                    }
+                    for item in items
+                ]}
+            )
+            if response.status_code != 200:
+                logger.warning(f"Operator {operator.name} batch HTTP {response.status_code}")
+                return [(False, None, f"HTTP error {response.status_code}")] * len(items)
+
+            # As for single sends, a garbled body fails this call rather than the caller
+            body = response.json()
+            entries = body.get("results") if isinstance(body, dict) else None
+            if not isinstance(entries, list) or not all(isinstance(data, dict) for data in entries):
+                raise ValueError(f"unexpected batch response body {response.text[:100]!r}")
+        except Exception as e:
+            logger.warning(f"Operator {operator.name} batch exception: {str(e)}")
+            return [(False, None, str(e))] * len(items)
+
+        results = []
+        for data in entries:
+            if data.get("status") == "sent":
+                results.append((True, data.get("message_id"), None))
+            else:
+                results.append((False, None, data.get("error", "Unknown error")))
+        return results
+
+    @staticmethod
+    async def _submit_batch(
+        operator: OperatorConfig,
+        items: List[BatchItem]
+    ) -> List[Tuple[bool, Optional[str], Optional[str]]]:
+        # One sample per call, as for single sends: counting every message would let one
+        # failed batch fill the breaker window and crowd single calls out of the latencies
+        # the hedge delay is taken from. The call failed if the operator accepted nothing
+        router = get_operator_router()
+        router.begin(operator)
+        started = time.monotonic()
+        results = await OperatorClient._send_batch(operator, items)
+        router.record(operator, time.monotonic() - started, any(success for success, _, _ in results))
+        return results
+
+    @staticmethod
+    async def send_sms(
+        phone_number: str,
+        message: str,
+        hedge: bool = False,
+        idempotency_key: Optional[str] = None,
+        avoid: Optional[str] = None,
+        batch: bool = False,
+        prefer: Optional[List[str]] = None,
+        on_call: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> Tuple[bool, Optional[str], Optional[str], Optional[str]]:
+        """
+        Returns (success, message_id, error, operator name); on failure the operator is
+        the last one tried. `avoid` names an operator to try last, e.g. the one that
+        failed the previous attempt. `prefer` names operators to try first, in order,
+        e.g. ones that may already hold the message under this idempotency key, and
+        `on_call` is awaited with each operator's name before it is called. With
+        `batch`, operators that have a batch_url get the message in a batch call shared
+        with concurrent sends.
+        """
+        router = get_operator_router()
+        if settings.OPERATOR_ROUTING_ADAPTIVE:
+            operators = router.rank()
+        else:
+            operators = sorted(OPERATORS, key=lambda x: x.priority)
+        if avoid:
+            operators = [op for op in operators if op.name != avoid] + [op for op in operators if op.name == avoid]
+        if prefer:
+            first = [op for name in prefer for op in operators if op.name == name]
+            operators = first + [op for op in operators if op not in first]
+
+        if hedge and settings.OPERATOR_HEDGING_ENABLED:
+            return await OperatorClient._send_hedged(
+                router, operators, phone_number, message, idempotency_key, on_call
             )
 
+        # One attempt per operator: failing over beats backing off on the same one
+        error, last_operator = "No operators configured", None
+        batch = batch and settings.OPERATOR_BATCHING_ENABLED
+        for operator in operators:
+            if on_call:
+                await on_call(operator.name)
+            if batch and operator.batch_url:
+                success, message_id, error = await OperatorClient.get_batcher().send(
+                    operator, phone_number, message, idempotency_key
+                )
+            else:
+                success, message_id, error = await OperatorClient._attempt(
+                    router, operator, phone_number, message, idempotency_key
+                )
+            last_operator = operator.name
+
             if success:
                 logger.info(f"SMS sent via {operator.name}, message_id: {message_id}")
-                return True, message_id, None
-            else:
-                logger.warning(f"Operator {operator.name} failed: {error}, trying next operator")
-                continue
+                return True, message_id, None, operator.name
+            logger.warning(f"Operator {operator.name} failed: {error}, trying next operator")
+
+        return False, None, error, last_operator
+
+    @staticmethod
+    async def _send_hedged(
+        router: OperatorRouter,
+        operators: List[OperatorConfig],
+        phone_number: str,
+        message: str,
+        idempotency_key: Optional[str],
+        on_call: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> Tuple[bool, Optional[str], Optional[str], Optional[str]]:
+        """
+        Like the adaptive walk, but if the first operator has not answered within its
+        OPERATOR_HEDGE_PERCENTILE latency the message also goes to the next one. The
+        first success wins and the other call is cancelled. At most one hedge per
+        message, so the extra cost is bounded by the share of slow responses.
+        """
+        metrics = OperatorClient.hedge_metrics
+        metrics["messages"] += 1
+        remaining = list(operators)
+        pending: Dict[asyncio.Task, OperatorConfig] = {}
+        hedge: Optional[OperatorConfig] = None
+        last_error, last_operator = "No operators configured", None
+
+        async def attempt(operator: OperatorConfig) -> Tuple[bool, Optional[str], Optional[str]]:
+            if on_call:
+                await on_call(operator.name)
+            return await OperatorClient._attempt(router, operator, phone_number, message, idempotency_key)
+
+        def launch() -> None:
+            operator = remaining.pop(0)
+            metrics["sends"] += 1
+            pending[asyncio.create_task(attempt(operator))] = operator
+
+        try:
+            if remaining:
+                launch()
+            while pending:
+                timeout = None
+                if hedge is None and remaining and len(pending) == 1:
+                    timeout = router.hedge_delay(
+                        next(iter(pending.values())),
+                        settings.OPERATOR_HEDGE_PERCENTILE
+                    )
+                    if timeout is None:
+                        timeout = settings.OPERATOR_HEDGE_DEFAULT_DELAY
+                    timeout = max(timeout, settings.OPERATOR_HEDGE_MIN_DELAY)
+
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedge = remaining[0]
+                    metrics["hedged"] += 1
+                    launch()
+                    continue
+
+                for task in done:
+                    operator = pending.pop(task)
+                    success, message_id, error = task.result()
+                    if success:
+                        if operator is hedge:
+                            metrics["hedge_won"] += 1
+                        logger.info(f"SMS sent via {operator.name}, message_id: {message_id}")
+                        return True, message_id, None, operator.name
+                    logger.warning(f"Operator {operator.name} failed: {error}, trying next operator")
+                    last_error, last_operator = error, operator.name
+
+                if not pending and remaining:
+                    launch()
+
+            return False, None, last_error, last_operator
+        finally:
+            for task in pending:
+                if not task.done():
+                    task.cancel()
+                    metrics["cancelled"] += 1
+
+    @staticmethod
+    async def _attempt(
+        router: OperatorRouter,
+        operator: OperatorConfig,
+        phone_number: str,
+        message: str,
+        idempotency_key: Optional[str]
+    ) -> Tuple[bool, Optional[str], Optional[str]]:
+        router.begin(operator)
+        started = time.monotonic()
+        try:
+            success, message_id, error = await OperatorClient._send(
+                operator, phone_number, message, idempotency_key
+            )
+        except asyncio.CancelledError:
+            # Lost a hedge race; the elapsed time still says how slow this operator is
+            router.record_cancelled(operator, time.monotonic() - started)
+            raise
 
-        return False, None, "All operators failed after retries"
+        router.record(operator, time.monotonic() - started, success)
+        return success, message_id, error
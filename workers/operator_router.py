@@ -0,0 +1,232 @@
+import logging
+import random
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
+
+from config.operator_config import OPERATORS, OperatorConfig
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Opens when at least failure_rate of the last `window` calls failed. An open
+    operator is skipped for `cooldown` seconds; after that a single probe call decides
+    whether it closes again or stays open for another cooldown.
+    """
+
+    def __init__(self, name: str, window: int, failure_rate: float, cooldown: float, clock: Callable[[], float]):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.cooldown = cooldown
+        self.clock = clock
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._probe_started: Optional[float] = None
+
+    def available(self) -> bool:
+        if self.state == CLOSED:
+            return True
+
+        now = self.clock()
+        if self.state == OPEN:
+            if now - self.opened_at < self.cooldown:
+                return False
+            self.state = HALF_OPEN
+            self._probe_started = None
+
+        # One probe at a time; a probe that never reported back is abandoned after a cooldown
+        return self._probe_started is None or now - self._probe_started >= self.cooldown
+
+    def on_attempt(self) -> None:
+        if self.state == HALF_OPEN:
+            self._probe_started = self.clock()
+
+    def record(self, success: bool) -> None:
+        if self.state == HALF_OPEN:
+            if success:
+                logger.info(f"Operator {self.name} circuit closed")
+                self.state = CLOSED
+                self._outcomes.clear()
+            else:
+                self._open()
+            return
+
+        if self.state == OPEN:
+            # Result of a call that started before the circuit opened
+            return
+
+        self._outcomes.append(success)
+        if len(self._outcomes) == self._outcomes.maxlen:
+            failures = self._outcomes.count(False)
+            if failures >= self.failure_rate * len(self._outcomes):
+                self._open()
+
+    def _open(self) -> None:
+        logger.warning(f"Operator {self.name} circuit open for {self.cooldown}s")
+        self.state = OPEN
+        self.opened_at = self.clock()
+        self._probe_started = None
+
+
+class OperatorStats:
+    """
+    Latency and outcome of an operator's last `window` calls within `max_age` seconds.
+    Aged-out samples matter: an operator that was bad gets little traffic, so without
+    them its old samples would never be replaced once it recovers.
+    """
+
+    def __init__(self, window: int, max_age: float, clock: Callable[[], float]):
+        self.max_age = max_age
+        self.clock = clock
+        # (time, latency, success); success is None for calls cancelled before answering
+        self._samples: Deque[tuple[float, float, Optional[bool]]] = deque(maxlen=window)
+        self._sorted_latencies: Optional[List[float]] = None
+
+    def __len__(self) -> int:
+        self._expire()
+        return len(self._samples)
+
+    def record(self, latency: float, success: Optional[bool]) -> None:
+        self._samples.append((self.clock(), latency, success))
+        self._sorted_latencies = None
+
+    @property
+    def success_rate(self) -> float:
+        outcomes = [success for _, _, success in self._samples if success is not None]
+        if not outcomes:
+            return 1.0
+        return outcomes.count(True) / len(outcomes)
+
+    def latency_percentile(self, q: float) -> float:
+        if self._sorted_latencies is None:
+            self._sorted_latencies = sorted(latency for _, latency, _ in self._samples)
+        index = min(len(self._sorted_latencies) - 1, int(len(self._sorted_latencies) * q))
+        return self._sorted_latencies[index]
+
+    def _expire(self) -> None:
+        cutoff = self.clock() - self.max_age
+        while self._samples and self._samples[0][0] < cutoff:
+            self._samples.popleft()
+            self._sorted_latencies = None
+
+
+class OperatorRouter:
+    """
+    Orders operators per message by their recent behaviour instead of static priority.
+
+    An operator's score is its success rate divided by its p90 latency over its recent
+    calls. The first operator is drawn at random with probability proportional to
+    score ** exponent, so traffic spreads over healthy operators and keeps every
+    operator's statistics fresh; the rest follow by score as failover. Operators with
+    an open circuit are skipped. Until an operator has min_samples calls it is scored
+    like the best known one, so a new or recovered operator gets traffic.
+    """
+
+    def __init__(
+        self,
+        operators: List[OperatorConfig],
+        window: int,
+        max_age: float,
+        min_samples: int,
+        exponent: float,
+        breaker_window: int,
+        breaker_failure_rate: float,
+        breaker_cooldown: float,
+        clock: Callable[[], float] = time.monotonic,
+        rng: Optional[random.Random] = None
+    ):
+        self.operators = sorted(operators, key=lambda x: x.priority)
+        self.min_samples = min_samples
+        self.exponent = exponent
+        self.rng = rng or random.Random()
+        self._stats: Dict[str, OperatorStats] = {op.name: OperatorStats(window, max_age, clock) for op in operators}
+        self._breakers: Dict[str, CircuitBreaker] = {
+            op.name: CircuitBreaker(op.name, breaker_window, breaker_failure_rate, breaker_cooldown, clock)
+            for op in operators
+        }
+
+    def rank(self) -> List[OperatorConfig]:
+        available = [op for op in self.operators if self._breakers[op.name].available()]
+        scores = self._scores()
+        if not available:
+            # Every circuit is open: trying them beats failing without a single attempt
+            return sorted(self.operators, key=lambda op: scores[op.name], reverse=True)
+
+        weights = [scores[op.name] ** self.exponent for op in available]
+        if sum(weights) > 0:
+            first = self.rng.choices(available, weights)[0]
+        else:
+            first = available[0]
+        rest = sorted((op for op in available if op is not first), key=lambda op: scores[op.name], reverse=True)
+        return [first, *rest]
+
+    def begin(self, operator: OperatorConfig) -> None:
+        self._breakers[operator.name].on_attempt()
+
+    def record(self, operator: OperatorConfig, latency: float, success: bool) -> None:
+        self._stats[operator.name].record(latency, success)
+        self._breakers[operator.name].record(success)
+
+    def record_cancelled(self, operator: OperatorConfig, elapsed: float) -> None:
+        # A lower bound on the latency, and no outcome; the breaker is left alone
+        self._stats[operator.name].record(elapsed, None)
+
+    def hedge_delay(self, operator: OperatorConfig, percentile: float) -> Optional[float]:
+        """The operator's latency at `percentile`, or None until it has min_samples calls."""
+        stats = self._stats[operator.name]
+        if len(stats) < self.min_samples:
+            return None
+        return stats.latency_percentile(percentile)
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        summary = {}
+        for op in self.operators:
+            stats = self._stats[op.name]
+            summary[op.name] = {
+                "state": self._breakers[op.name].state,
+                "samples": len(stats),
+                "success_rate": stats.success_rate if len(stats) else None,
+                "p50": stats.latency_percentile(0.5) if len(stats) else None,
+                "p90": stats.latency_percentile(0.9) if len(stats) else None,
+                "p99": stats.latency_percentile(0.99) if len(stats) else None,
+            }
+        return summary
+
+    def _scores(self) -> Dict[str, float]:
+        scores = {}
+        for op in self.operators:
+            stats = self._stats[op.name]
+            if len(stats) >= self.min_samples:
+                scores[op.name] = stats.success_rate / max(stats.latency_percentile(0.9), 0.001)
+
+        best = max(scores.values(), default=1.0)
+        for op in self.operators:
+            scores.setdefault(op.name, best)
+        return scores
+
+
+_operator_router: Optional[OperatorRouter] = None
+
+
+def get_operator_router() -> OperatorRouter:
+    global _operator_router
+    if _operator_router is None:
+        _operator_router = OperatorRouter(
+            OPERATORS,
+            window=settings.OPERATOR_STATS_WINDOW,
+            max_age=settings.OPERATOR_STATS_MAX_AGE,
+            min_samples=settings.OPERATOR_MIN_SAMPLES,
+            exponent=settings.OPERATOR_ROUTING_EXPONENT,
+            breaker_window=settings.OPERATOR_BREAKER_WINDOW,
+            breaker_failure_rate=settings.OPERATOR_BREAKER_FAILURE_RATE,
+            breaker_cooldown=settings.OPERATOR_BREAKER_COOLDOWN
+        )
+    return _operator_router
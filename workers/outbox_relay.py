@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import signal
+import time
+from datetime import datetime
+
+from config.database import async_session_maker, engine
+from config.rabbitmq import close_rabbitmq
+from config.settings import settings
+from app.repositories.outbox_repository import OutboxRepository
+from app.services.sms_service import SMSService
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxRelay:
+    """
+    Moves committed sms_outbox rows to RabbitMQ.
+
+    Each loop claims a batch with FOR UPDATE SKIP LOCKED, publishes it with publisher
+    confirms (or, for fair-scheduled tasks, an fsynced Redis push) and deletes it in the
+    same transaction, so any number of relay loops and processes can run side by side.
+    A crash after publishing but before the commit republishes the batch (at-least-once).
+    """
+
+    def __init__(self, batch_size: int, concurrency: int, poll_interval: float):
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.published = 0
+        self.lag_seconds = 0.0
+        self._stopping = asyncio.Event()
+
+    async def relay_once(self) -> int:
+        async with async_session_maker() as session:
+            repo = OutboxRepository(session)
+            rows = await repo.claim_batch(self.batch_size)
+            if not rows:
+                await session.rollback()
+                return 0
+
+            await SMSService.publish_messages([(row.queue, row.payload) for row in rows], durable=True)
+            await repo.delete([row.id for row in rows])
+            await session.commit()
+
+        self.published += len(rows)
+        self.lag_seconds = (datetime.utcnow() - rows[0].created_at).total_seconds()
+        return len(rows)
+
+    async def run(self) -> None:
+        loops = [asyncio.create_task(self._loop()) for _ in range(self.concurrency)]
+        metrics = asyncio.create_task(self._report_metrics())
+
+        await self._stopping.wait()
+        await asyncio.gather(*loops, return_exceptions=True)
+        metrics.cancel()
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    async def _loop(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                relayed = await self.relay_once()
+            except Exception as e:
+                logger.error(f"Outbox relay batch failed, will retry: {e}")
+                relayed = 0
+
+            # A full batch means there is more waiting; otherwise back off briefly
+            if relayed < self.batch_size:
+                if relayed == 0:
+                    self.lag_seconds = 0.0
+                await self._sleep(self.poll_interval)
+
+    async def _report_metrics(self) -> None:
+        last_published = 0
+        last_time = time.monotonic()
+
+        while True:
+            await asyncio.sleep(settings.OUTBOX_METRICS_INTERVAL)
+            now = time.monotonic()
+            rate = (self.published - last_published) / (now - last_time)
+            logger.info(
+                f"Outbox relay: {rate:.0f} msg/s, lag {self.lag_seconds:.3f}s, "
+                f"{self.published} published total"
+            )
+            last_published, last_time = self.published, now
+
+    async def _sleep(self, seconds: float) -> None:
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def main() -> None:
+    relay = OutboxRelay(
+        batch_size=settings.OUTBOX_BATCH_SIZE,
+        concurrency=settings.OUTBOX_RELAY_CONCURRENCY,
+        poll_interval=settings.OUTBOX_POLL_INTERVAL
+    )
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, relay.stop)
+
+    await relay.run()
+    await close_rabbitmq()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=settings.LOG_LEVEL)
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+import asyncio
+import logging
+import threading
+from typing import Any, Coroutine, Optional, TypeVar
+from celery.signals import worker_process_init, worker_process_shutdown
+
+from config.database import engine
+from config.redis import close_redis
+from workers.operator_client import OperatorClient
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class WorkerRuntime:
+    """
+    One event loop per worker process, running in a background thread.
+
+    Tasks submit coroutines to it instead of calling asyncio.run(), so the Redis
+    client, the SQLAlchemy engine pool and the operator HTTP pools are created once
+    and shared by every task the process executes.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> Optional[asyncio.AbstractEventLoop]:
+        return self._loop
+
+    def start(self) -> None:
+        with self._lock:
+            if self._loop is not None:
+                return
+
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="worker-runtime", daemon=True)
+            thread.start()
+            self._loop = loop
+            self._thread = thread
+
+    def run(self, coro: Coroutine[Any, Any, T], timeout: Optional[float] = None) -> T:
+        if self._loop is None:
+            # Pools without worker_process_init (solo, threads) start lazily
+            self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    def stop(self) -> None:
+        if self._loop is None:
+            return
+
+        try:
+            self.run(self._close_resources(), timeout=10)
+        except Exception as e:
+            logger.warning(f"Failed to close worker runtime resources: {e}")
+
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop.close()
+        self._loop = None
+        self._thread = None
+
+    @staticmethod
+    async def _close_resources() -> None:
+        await OperatorClient.close()
+        await close_redis()
+        await engine.dispose()
+
+
+runtime = WorkerRuntime()
+
+
+@worker_process_init.connect
+def start_worker_runtime(**kwargs) -> None:
+    # Connections inherited from the parent must not be shared with the child
+    engine.sync_engine.dispose(close=False)
+    runtime.start()
+
+
+@worker_process_shutdown.connect
+def stop_worker_runtime(**kwargs) -> None:
+    runtime.stop()
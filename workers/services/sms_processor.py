@@ -0,0 +1,184 @@
+import logging
+from datetime import datetime
+from functools import partial
+from typing import Optional
+from uuid import UUID, uuid4
+from workers.operator_client import OperatorClient
+from workers.services.status_updater import result_fields
+from core.consts import QueueName, SMSStatus, SMSType
+from config.database import async_session_maker
+from config.rabbitmq import publish_task, retry_queue_name
+from config.redis import get_redis
+from config.settings import settings
+from app.repositories.sms_repository import SMSRepository
+from app.services.send_dedup import BUSY, RECORDED, SENT, STALE, get_send_dedup
+from app.services.sms_service import PROCESS_SMS_TASK
+
+logger = logging.getLogger(__name__)
+
+
+async def process_sms_message(
+    sms_id: str,
+    phone_number: str,
+    message: str,
+    created_at: Optional[str] = None,
+    sms_type: Optional[int] = None,
+    account_id: Optional[str] = None,
+    attempt: int = 0,
+    last_operator: Optional[str] = None,
+    batch: bool = False
+) -> None:
+    """
+    Send one SMS and record its result, or park it for a retry. `batch` lets the
+    operator call share a batch with concurrent sends; only worth it where many
+    messages are in flight, as in the native consumer.
+    """
+    kwargs = {
+        "sms_id": sms_id,
+        "account_id": account_id,
+        "phone_number": phone_number,
+        "message": message,
+        "created_at": created_at,
+        "sms_type": sms_type,
+        "attempt": attempt,
+        "last_operator": last_operator,
+    }
+
+    # acks_late redelivers whatever a dead worker had prefetched; the send state keeps
+    # those copies from reaching an operator again
+    dedup = await get_send_dedup() if settings.SMS_DEDUP_ENABLED else None
+    claim = await dedup.claim(sms_id, attempt) if dedup else None
+
+    if claim and claim.state in (RECORDED, STALE):
+        logger.info(f"SMS {sms_id} attempt {attempt} already handled, dropping duplicate delivery")
+        return
+    if claim and claim.state == BUSY:
+        # Another worker is sending it; look again once it is done or its claim expired
+        if not await schedule_retry(kwargs, settings.SMS_RETRY_DELAYS[0]):
+            raise RuntimeError(f"SMS {sms_id} is claimed by another worker and could not be parked")
+        logger.info(f"SMS {sms_id} is being sent by another worker, parked")
+        return
+
+    if claim and claim.state == SENT:
+        logger.warning(f"SMS {sms_id} was already sent via {claim.operator}, recording the result only")
+        success, message_id, error, operator = True, claim.message_id, None, claim.operator
+    else:
+        try:
+            # Express has a sub-second SLA, so a slow operator is hedged rather than waited on.
+            # Operators a dead worker called may hold the message already; the last one called
+            # is the likeliest, and the same Idempotency-Key makes it answer without resending
+            success, message_id, error, operator = await OperatorClient.send_sms(
+                phone_number,
+                message,
+                hedge=sms_type == SMSType.EXPRESS,
+                idempotency_key=sms_id,
+                avoid=last_operator,
+                batch=batch and sms_type != SMSType.EXPRESS,
+                prefer=claim.called[::-1] if claim else None,
+                on_call=partial(dedup.note_call, claim) if claim else None
+            )
+        except BaseException:
+            if claim:
+                await dedup.release(claim)
+            raise
+
+        if success and claim:
+            await dedup.mark_sent(claim, operator, message_id)
+
+    if not success and attempt < len(settings.SMS_RETRY_DELAYS):
+        retry_kwargs = dict(kwargs, attempt=attempt + 1, last_operator=operator)
+        if await schedule_retry(retry_kwargs, settings.SMS_RETRY_DELAYS[attempt]):
+            if claim:
+                await dedup.mark_retry(claim, attempt + 1)
+            logger.warning(f"SMS {sms_id} failed ({error}), retry {attempt + 1} scheduled")
+            return
+
+    status = SMSStatus.SENT if success else SMSStatus.FAILED
+    sent_at = datetime.utcnow() if success else None
+
+    if not success:
+        await dead_letter(sms_id, account_id, phone_number, message, created_at, sms_type, operator, error)
+
+    try:
+        redis_client = await get_redis()
+        await redis_client.xadd(settings.STATUS_STREAM, result_fields(
+            sms_id, status, sent_at, created_at, operator, message_id
+        ))
+
+        if success:
+            logger.info(f"SMS {sms_id} sent successfully, queued for batch update")
+        else:
+            logger.error(f"SMS {sms_id} failed: {error}, queued for batch update")
+
+    except Exception as redis_error:
+        logger.warning(f"Redis failed, falling back to direct DB update: {redis_error}")
+
+        async with async_session_maker() as session:
+            repo = SMSRepository(session)
+            await repo.update_status(
+                sms_id=UUID(sms_id),
+                status=status,
+                sent_at=sent_at,
+                created_at=datetime.fromisoformat(created_at) if created_at else None,
+                operator=operator,
+                operator_message_id=message_id
+            )
+
+        if success:
+            logger.info(f"SMS {sms_id} sent successfully, updated DB directly")
+        else:
+            logger.error(f"SMS {sms_id} failed: {error}, updated DB directly")
+
+    if claim:
+        await dedup.mark_recorded(claim)
+
+
+async def schedule_retry(kwargs: dict, delay: int) -> bool:
+    """Park the task in the `delay` seconds queue of its tier. False if it could not be published."""
+    queue = QueueName.EXPRESS if kwargs["sms_type"] == SMSType.EXPRESS else QueueName.REGULAR
+    try:
+        await publish_task(PROCESS_SMS_TASK, kwargs=kwargs, queue=retry_queue_name(queue, delay))
+    except Exception as e:
+        logger.error(f"Failed to schedule retry of SMS {kwargs['sms_id']}, recording failure: {e}")
+        return False
+    return True
+
+
+async def dead_letter(
+    sms_id: str,
+    account_id: Optional[str],
+    phone_number: str,
+    message: str,
+    created_at: Optional[str],
+    sms_type: Optional[int],
+    operator: Optional[str],
+    error: Optional[str]
+) -> None:
+    """Record a message that every operator and retry tier failed, so it can be replayed later."""
+    try:
+        await publish_task(
+            'workers.tasks.dlq_tasks.store_failed_task',
+            kwargs={
+                'task_name': PROCESS_SMS_TASK,
+                # A replayed message can exhaust its retries again, so every failure is its own letter
+                'task_id': str(uuid4()),
+                'args': [],
+                'kwargs': {
+                    "sms_id": sms_id,
+                    "account_id": account_id,
+                    "phone_number": phone_number,
+                    "message": message,
+                    "created_at": created_at,
+                    "sms_type": sms_type,
+                    "last_operator": operator,
+                },
+                'exception': error or "",
+                'traceback': "",
+                'error_class': "AllOperatorsFailed",
+                'operator': operator,
+                'failed_at': datetime.utcnow().isoformat()
+            },
+            queue=QueueName.DLQ
+        )
+    except Exception as e:
+        logger.error(f"Failed to dead-letter SMS {sms_id}: {e}")
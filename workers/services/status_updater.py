@@ -0,0 +1,204 @@
+import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import Optional
+from uuid import UUID, uuid4
+import redis.asyncio as redis
+from redis.exceptions import ResponseError
+
+from config.database import async_session_maker
+from config.settings import settings
+from app.repositories.sms_repository import SMSRepository
+
+logger = logging.getLogger(__name__)
+
+# Results written by workers before the move to the stream
+LEGACY_RESULTS_LIST = "sms_results"
+# Legacy results that could not be parsed or applied, kept for inspection
+LEGACY_DEAD_LIST = "sms_results:dead"
+LEGACY_ATTEMPTS_KEY = "sms_results:attempts"
+LEGACY_DRAIN_LOCK = "sms_results:drain:lock"
+LEGACY_DRAIN_LOCK_TTL_MS = 60000
+LEGACY_MAX_ATTEMPTS = 5
+LEGACY_RETRY_DELAY = 1.0
+
+# KEYS: lock | ARGV: owner token
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+StatusUpdate = tuple[UUID, Optional[datetime], int, Optional[datetime], Optional[str], Optional[str]]
+
+
+def result_fields(
+    sms_id: str,
+    status: int,
+    sent_at: Optional[datetime],
+    created_at: Optional[str] = None,
+    operator: Optional[str] = None,
+    operator_message_id: Optional[str] = None
+) -> dict:
+    return {
+        "sms_id": sms_id,
+        "created_at": created_at or "",
+        "status": status,
+        "sent_at": sent_at.isoformat() if sent_at else "",
+        "operator": operator or "",
+        "operator_message_id": operator_message_id or ""
+    }
+
+
+def parse_result(fields: dict) -> StatusUpdate:
+    # Results queued before created_at was carried through have no partition key
+    created_at = fields.get("created_at")
+    sent_at = fields.get("sent_at")
+    return (
+        UUID(fields["sms_id"]),
+        datetime.fromisoformat(created_at) if created_at else None,
+        int(fields["status"]),
+        datetime.fromisoformat(sent_at) if sent_at else None,
+        fields.get("operator") or None,
+        fields.get("operator_message_id") or None
+    )
+
+
+class StatusUpdater:
+    """
+    Applies SMS results from the Redis stream to the database.
+
+    Every updater is a consumer in one consumer group. Entries are acknowledged (and
+    deleted) only after the DB commit, so a crash leaves them pending; entries pending
+    longer than claim_idle_ms are reclaimed from dead consumers.
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        consumer_name: str,
+        batch_size: Optional[int] = None,
+        claim_idle_ms: Optional[int] = None
+    ):
+        self.redis = redis_client
+        self.consumer_name = consumer_name
+        self.batch_size = batch_size or settings.STATUS_BATCH_SIZE
+        self.claim_idle_ms = claim_idle_ms or settings.STATUS_CLAIM_IDLE_MS
+        self.stream = settings.STATUS_STREAM
+        self.group = settings.STATUS_CONSUMER_GROUP
+        self._release_lock = redis_client.register_script(RELEASE_LOCK_SCRIPT)
+
+    async def ensure_group(self) -> None:
+        try:
+            await self.redis.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def run_once(self, block_ms: Optional[int] = None) -> int:
+        entries = await self._claim_stale()
+        if not entries:
+            response = await self.redis.xreadgroup(
+                self.group,
+                self.consumer_name,
+                {self.stream: ">"},
+                count=self.batch_size,
+                block=block_ms
+            )
+            entries = response[0][1] if response else []
+
+        if not entries:
+            return 0
+
+        await self._apply([parse_result(fields) for _, fields in entries])
+
+        entry_ids = [entry_id for entry_id, _ in entries]
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.xack(self.stream, self.group, *entry_ids)
+            pipe.xdel(self.stream, *entry_ids)
+            await pipe.execute()
+
+        return len(entries)
+
+    async def drain_legacy_list(self) -> int:
+        """
+        Apply the results left in the pre-stream list. Each batch is read, applied and
+        only trimmed from the list after the commit, so a crash re-applies it instead of
+        losing it; one updater drains at a time, so no one trims a batch it didn't apply.
+        Entries that can't be parsed, and batches that failed LEGACY_MAX_ATTEMPTS times,
+        are moved to LEGACY_DEAD_LIST.
+        """
+        token = uuid4().hex
+        if not await self.redis.set(LEGACY_DRAIN_LOCK, token, nx=True, px=LEGACY_DRAIN_LOCK_TTL_MS):
+            logger.info("Another status updater is draining the legacy results list")
+            return 0
+
+        drained = 0
+        try:
+            while True:
+                items = await self.redis.lrange(LEGACY_RESULTS_LIST, 0, self.batch_size - 1)
+                if not items:
+                    return drained
+
+                updates, dead = [], []
+                for item in items:
+                    try:
+                        data = json.loads(item)
+                        data["sent_at"] = data.get("sent_at") or ""
+                        updates.append(parse_result(data))
+                    except (ValueError, KeyError, TypeError, AttributeError) as e:
+                        logger.error(f"Unreadable legacy SMS result {item!r}, dead-lettering: {e}")
+                        dead.append(item)
+
+                if updates and not await self._apply_legacy(updates):
+                    dead, updates = items, []
+
+                async with self.redis.pipeline(transaction=True) as pipe:
+                    if dead:
+                        pipe.rpush(LEGACY_DEAD_LIST, *dead)
+                    pipe.ltrim(LEGACY_RESULTS_LIST, len(items), -1)
+                    pipe.delete(LEGACY_ATTEMPTS_KEY)
+                    pipe.pexpire(LEGACY_DRAIN_LOCK, LEGACY_DRAIN_LOCK_TTL_MS)
+                    await pipe.execute()
+                drained += len(updates)
+        finally:
+            await self._release_lock(keys=[LEGACY_DRAIN_LOCK], args=[token])
+
+    async def _apply_legacy(self, updates: list[StatusUpdate]) -> bool:
+        """False once the batch has failed LEGACY_MAX_ATTEMPTS times, counted across restarts."""
+        while True:
+            try:
+                await self._apply(updates)
+                return True
+            except Exception as e:
+                attempts = await self.redis.incr(LEGACY_ATTEMPTS_KEY)
+                if attempts >= LEGACY_MAX_ATTEMPTS:
+                    logger.error(f"Legacy SMS results failed {attempts} times, dead-lettering {len(updates)}: {e}")
+                    return False
+                logger.warning(f"Applying legacy SMS results failed (attempt {attempts}), retrying: {e}")
+                await asyncio.sleep(LEGACY_RETRY_DELAY * 2 ** (attempts - 1))
+
+    async def _claim_stale(self) -> list:
+        result = await self.redis.xautoclaim(
+            self.stream,
+            self.group,
+            self.consumer_name,
+            min_idle_time=self.claim_idle_ms,
+            start_id="0-0",
+            count=self.batch_size
+        )
+        entries = [entry for entry in result[1] if entry[1]]
+        if entries:
+            logger.warning(f"Reclaimed {len(entries)} pending SMS results from dead consumers")
+        return entries
+
+    @staticmethod
+    async def _apply(updates: list[StatusUpdate]) -> None:
+        async with async_session_maker() as session:
+            repo = SMSRepository(session)
+            sent_count, failed_count = await repo.batch_update_status(updates)
+
+        logger.info(f"Batch updated {sent_count} SMS to SENT, {failed_count} to FAILED in single transaction")
@@ -0,0 +1,45 @@
+import asyncio
+import logging
+import os
+import signal
+import socket
+
+from config.database import engine
+from config.redis import get_redis, close_redis
+from config.settings import settings
+from workers.services.status_updater import StatusUpdater
+
+logger = logging.getLogger(__name__)
+
+
+async def main() -> None:
+    updater = StatusUpdater(
+        await get_redis(),
+        consumer_name=f"{socket.gethostname()}-{os.getpid()}"
+    )
+    await updater.ensure_group()
+
+    drained = await updater.drain_legacy_list()
+    if drained:
+        logger.info(f"Applied {drained} results left in the legacy sms_results list")
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    # Blocks on XREADGROUP while idle and flushes immediately under load
+    while not stop_event.is_set():
+        try:
+            await updater.run_once(block_ms=settings.STATUS_BLOCK_MS)
+        except Exception as e:
+            logger.error(f"Status update batch failed, entries stay pending: {e}")
+            await asyncio.sleep(1)
+
+    await close_redis()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=settings.LOG_LEVEL)
+    asyncio.run(main())
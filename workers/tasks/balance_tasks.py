@@ -0,0 +1,47 @@
+import logging
+from workers.celery_app import celery_app
+from workers.runtime import runtime
+from config.database import async_session_maker
+from config.settings import settings
+from core.consts import BalanceEngine
+from app.services.balance_ledger import get_balance_ledger
+
+logger = logging.getLogger(__name__)
+
+
+async def _run_with_ledger(reconcile: bool) -> None:
+    ledger = await get_balance_ledger()
+
+    # Flush and reconcile share one lock so they never see each other's half-applied state
+    token = await ledger.acquire_lock()
+    if token is None:
+        logger.debug("Balance flush already running elsewhere, skipping")
+        return
+
+    try:
+        async with async_session_maker() as session:
+            flushed = await ledger.flush(session)
+            if flushed:
+                logger.info(f"Flushed balance deltas for {flushed} accounts")
+
+            if reconcile:
+                repaired = await ledger.reconcile(session, token)
+                logger.info(f"Balance reconciliation finished, {repaired} accounts repaired")
+    finally:
+        await ledger.release_lock(token)
+
+
+@celery_app.task(name="workers.tasks.balance_tasks.flush_balance_deltas")
+def flush_balance_deltas():
+    if settings.BALANCE_ENGINE != BalanceEngine.REDIS:
+        return
+
+    runtime.run(_run_with_ledger(reconcile=False))
+
+
+@celery_app.task(name="workers.tasks.balance_tasks.reconcile_balances")
+def reconcile_balances():
+    if settings.BALANCE_ENGINE != BalanceEngine.REDIS:
+        return
+
+    runtime.run(_run_with_ledger(reconcile=True))
@@ -1,20 +1,114 @@
 import logging
 from datetime import datetime
+from typing import Optional
 from workers.celery_app import celery_app
+from workers.runtime import runtime
+from config.database import async_session_maker
+from config.rabbitmq import get_rabbitmq_connection, parse_task_kwargs
+from config.redis import get_redis
+from config.settings import settings
+from core.consts import QueueName
+from app.repositories.dead_letter_repository import DeadLetterRepository
+from app.services.dead_letter_service import dead_letter_record
 
 logger = logging.getLogger(__name__)
 
+FLUSH_LOCK_KEY = "dlq:flush"
+STORE_FAILED_TASK = "workers.tasks.dlq_tasks.store_failed_task"
 
-@celery_app.task(name='workers.tasks.dlq_tasks.store_failed_task')
-def store_failed_task(task_name: str, task_id: str, args: tuple, kwargs: dict, exception: str, traceback: str):
+
+async def _store(records: list[dict]) -> None:
+    async with async_session_maker() as session:
+        await DeadLetterRepository(session).add(records)
+        await session.commit()
+
+
+async def _drain_dead_letters() -> int:
+    """
+    Move the dlq queue into dead_letters, DEAD_LETTER_BATCH_SIZE messages per insert.
+
+    Messages are acked only after their batch is committed; a batch redelivered after a
+    crash is skipped row by row on task_id.
+    """
+    redis_client = await get_redis()
+    lock = redis_client.lock(FLUSH_LOCK_KEY, timeout=60)
+    if not await lock.acquire(blocking=False):
+        logger.debug("Dead letter flush already running elsewhere, skipping")
+        return 0
+
+    stored = 0
+    connection = await get_rabbitmq_connection()
+    channel = await connection.channel()
+    try:
+        queue = await channel.declare_queue(QueueName.DLQ, passive=True)
+        while True:
+            messages, records = [], []
+            while len(messages) < settings.DEAD_LETTER_BATCH_SIZE:
+                message = await queue.get(no_ack=False, fail=False)
+                if message is None:
+                    break
+                messages.append(message)
+                task_name = (message.headers or {}).get("task")
+                if task_name != STORE_FAILED_TASK:
+                    logger.error(f"Unexpected task {task_name} on {QueueName.DLQ}, dropping")
+                    continue
+                records.append(dead_letter_record(message.correlation_id, parse_task_kwargs(message)))
+
+            if not messages:
+                break
+
+            await _store(records)
+            await messages[-1].ack(multiple=True)
+            stored += len(records)
+            await lock.reacquire()
+
+            if len(messages) < settings.DEAD_LETTER_BATCH_SIZE:
+                break
+    finally:
+        await channel.close()
+        await lock.release()
+
+    if stored:
+        logger.info(f"Stored {stored} dead letters")
+    return stored
+
+
+@celery_app.task(name="workers.tasks.dlq_tasks.flush_dead_letters")
+def flush_dead_letters():
+    runtime.run(_drain_dead_letters())
+
+
+@celery_app.task(name=STORE_FAILED_TASK)
+def store_failed_task(
+    task_name: str,
+    task_id: str,
+    args: tuple,
+    kwargs: dict,
+    exception: str,
+    traceback: str,
+    error_class: Optional[str] = None,
+    operator: Optional[str] = None,
+    failed_at: Optional[str] = None
+):
+    # Normally drained in batches by flush_dead_letters; this runs only if a worker
+    # is pointed at the dlq queue
     logger.critical(
         f"DEAD LETTER: Task {task_name} [{task_id}] failed permanently\n"
         f"Args: {args}\n"
         f"Kwargs: {kwargs}\n"
         f"Exception: {exception}\n"
         f"Traceback: {traceback}\n"
-        f"Timestamp: {datetime.utcnow().isoformat()}"
+        f"Timestamp: {failed_at or datetime.utcnow().isoformat()}"
     )
 
-    # TODO: In production, store in database
-    return {"status": "logged", "task_id": task_id}
+    record = dead_letter_record(task_id, {
+        "task_name": task_name,
+        "task_id": task_id,
+        "kwargs": kwargs,
+        "exception": exception,
+        "error_class": error_class,
+        "operator": operator,
+        "failed_at": failed_at,
+    })
+    runtime.run(_store([record]))
+    return {"status": "stored", "task_id": task_id}
@@ -0,0 +1,13 @@
+import logging
+from workers.celery_app import celery_app
+from workers.runtime import runtime
+from app.services.partition_manager import get_partition_manager
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(name="workers.tasks.partition_tasks.maintain_sms_partitions")
+def maintain_sms_partitions():
+    plan = runtime.run(get_partition_manager().run())
+    if plan is not None and not plan.describe():
+        logger.debug("SMS partitions up to date")